@@ -0,0 +1,357 @@
+"""cockpit のサーバー拡張に対する負荷試験
+
+Jupyter Server を子プロセスとして起動し、JupyterLab のクライアントを模した N 個の
+並行クライアントから /process と /version を繰り返し取得して、エンドポイントごとの
+スループット（req/s）とレイテンシ（p50 / p90 / p99）を JSON で出力する。
+
+supervisorctl と git は fakebin/ の偽物に置き換え、遅延を指定できる。
+ステータスのキャッシュ（COMFYUI_COCKPIT_STATUS_TTL）を 0 にすると、リクエストごとの
+サブプロセス起動のコストが結果に表れる。
+
+    python benchmarks/load.py --clients 32 --duration 10 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import re
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError, HTTPRequest
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCHMARK_DIR.parent
+FAKEBIN = BENCHMARK_DIR / "fakebin"
+
+# JupyterLab のパネルが取得するエンドポイント（名前 → パス）
+ENDPOINTS = {
+    "process": "process",
+    "version": "version",
+    "version_list": "version?action=list",
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """昇順に並んだ値の q 分位点（最近傍法）"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """レイテンシ（秒）の一覧から req/s と分位点（ミリ秒）を求める"""
+    values = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "mean": ms(sum(values) / len(values)) if values else None,
+            "p50": ms(percentile(values, 0.50)),
+            "p90": ms(percentile(values, 0.90)),
+            "p99": ms(percentile(values, 0.99)),
+            "max": ms(values[-1]) if values else None,
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args: str, cwd: Path) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def create_repository(path: Path, tags: int) -> None:
+    """タグを tags 個持ち、HEAD が最新のタグより1コミット進んだ ComfyUI の代わりのリポジトリ"""
+    path.mkdir(parents=True)
+    _git("init", "-q", cwd=path)
+    _git("config", "user.email", "bench@example.com", cwd=path)
+    _git("config", "user.name", "bench", cwd=path)
+    for index in range(tags):
+        (path / "requirements.txt").write_text(f"torch\nnumpy>=1.{index}\n")
+        _git("add", "-A", cwd=path)
+        _git("commit", "-q", "-m", f"release {index}", cwd=path)
+        _git("tag", f"v0.{index // 10}.{index % 10}", cwd=path)
+    (path / "main.py").write_text("print('comfyui')\n")
+    _git("add", "-A", cwd=path)
+    _git("commit", "-q", "-m", "work in progress", cwd=path)
+
+
+class _SystemStatsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = b'{"system": {}, "devices": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_comfyui(latency: float) -> ThreadingHTTPServer:
+    """readiness の問い合わせ先（/system_stats に応答するだけの HTTP サーバー）"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SystemStatsHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class CockpitServer:
+    """拡張を有効にした Jupyter Server を子プロセスとして起動する"""
+
+    def __init__(self, env: Dict[str, str], workdir: Path):
+        self.port = _free_port()
+        self.token = secrets.token_hex(16)
+        self.base_url = f"http://127.0.0.1:{self.port}/comfyui-cockpit/"
+        self._env = env
+        self._workdir = workdir
+        self._proc: Optional[subprocess.Popen] = None
+        self._log = None
+
+    def start(self, timeout: float = 60.0) -> None:
+        command = [
+            sys.executable, "-m", "jupyter_server",
+            "--no-browser",
+            f"--port={self.port}",
+            "--ip=127.0.0.1",
+            f"--IdentityProvider.token={self.token}",
+            f"--ServerApp.root_dir={self._workdir}",
+            "--ServerApp.jpserver_extensions={'jupyterlab_comfyui_cockpit': True}",
+        ]
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            command.append("--allow-root")
+        self._log = open(self._workdir / "server.log", "wb")
+        self._proc = subprocess.Popen(command, env=self._env, stdout=self._log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"Jupyter Server exited early; see {self._workdir / 'server.log'}")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError("Timed out waiting for Jupyter Server to start")
+
+    def stop(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        if self._log is not None:
+            self._log.close()
+
+
+def parse_subprocess_counts(text: str) -> Dict[str, float]:
+    """/metrics の出力からコマンドごとのサブプロセス起動回数を取り出す"""
+    counts = {}
+    for match in re.finditer(r'^comfyui_cockpit_subprocess_total\{command="([^"]+)"\} (\S+)$', text, re.M):
+        counts[match.group(1)] = float(match.group(2))
+    return counts
+
+
+async def run_clients(
+    server: CockpitServer,
+    endpoints: List[str],
+    clients: int,
+    duration: float,
+    warmup: float,
+    think: float,
+) -> Dict[str, Any]:
+    """clients 個のクライアントが duration 秒の間、endpoints を順に取得し続ける"""
+    AsyncHTTPClient.configure(None, max_clients=clients)
+    http = AsyncHTTPClient()
+    headers = {"Authorization": f"token {server.token}"}
+
+    async def fetch(path: str) -> str:
+        response = await http.fetch(HTTPRequest(server.base_url + path, headers=headers, request_timeout=60))
+        return response.body.decode("utf-8")
+
+    latencies: Dict[str, List[float]] = {name: [] for name in endpoints}
+    errors: Dict[str, int] = {name: 0 for name in endpoints}
+    measuring = False
+
+    async def client(index: int, stop_at: float) -> None:
+        position = index
+        while time.monotonic() < stop_at:
+            name = endpoints[position % len(endpoints)]
+            position += 1
+            started = time.monotonic()
+            try:
+                await fetch(ENDPOINTS[name])
+                ok = True
+            except (HTTPClientError, OSError):
+                ok = False
+            if measuring:
+                if ok:
+                    latencies[name].append(time.monotonic() - started)
+                else:
+                    errors[name] += 1
+            if think > 0:
+                await asyncio.sleep(think)
+
+    if warmup > 0:
+        await asyncio.gather(*(client(i, time.monotonic() + warmup) for i in range(clients)))
+
+    before = parse_subprocess_counts(await fetch("metrics"))
+    measuring = True
+    started = time.monotonic()
+    await asyncio.gather(*(client(i, started + duration) for i in range(clients)))
+    elapsed = time.monotonic() - started
+    measuring = False
+    after = parse_subprocess_counts(await fetch("metrics"))
+
+    results = {name: summarize(latencies[name], errors[name], elapsed) for name in endpoints}
+    total_requests = sum(result["requests"] for result in results.values())
+    forks = {command: after[command] - before.get(command, 0) for command in after}
+    return {
+        "elapsed": round(elapsed, 3),
+        "endpoints": results,
+        "total": summarize([value for name in endpoints for value in latencies[name]], sum(errors.values()), elapsed),
+        "subprocesses": forks,
+        "subprocesses_per_request": {
+            command: round(count / total_requests, 4) if total_requests else None
+            for command, count in forks.items()
+        },
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=16, help="並行クライアント数")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=2.0, help="計測前の暖機時間（秒）")
+    parser.add_argument("--think", type=float, default=0.0, help="クライアントがリクエストの間に待つ秒数")
+    parser.add_argument(
+        "--endpoints",
+        default="process,version",
+        help=f"取得するエンドポイント（カンマ区切り、{', '.join(ENDPOINTS)} から選択）",
+    )
+    parser.add_argument("--programs", default="comfyui", help="COMFYUI_COCKPIT_PROGRAMS")
+    parser.add_argument("--status-ttl", type=float, default=None, help="COMFYUI_COCKPIT_STATUS_TTL（0 でキャッシュ無効）")
+    parser.add_argument("--supervisorctl-latency", type=float, default=0.05, help="偽の supervisorctl の遅延（秒）")
+    parser.add_argument("--git-latency", type=float, default=0.05, help="偽の git の遅延（秒）")
+    parser.add_argument("--comfyui-latency", type=float, default=0.0, help="偽の /system_stats の遅延（秒）")
+    parser.add_argument("--tags", type=int, default=30, help="ベンチマーク用リポジトリのタグ数")
+    parser.add_argument("--dummy", action="store_true", help="ダミーモードで計測する（偽のコマンドを使わない）")
+    parser.add_argument("--label", default="", help="結果に含める任意のラベル（リリース名など）")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル（省略時は標準出力）")
+    args = parser.parse_args(argv)
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    return args
+
+
+def _package_version() -> Optional[str]:
+    # パッケージのバージョンは package.json から決まる
+    try:
+        return json.loads((REPO_ROOT / "package.json").read_text(encoding="utf-8")).get("version")
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    real_git = shutil.which("git")
+    if real_git is None:
+        print("git is required to build the benchmark repository", file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="cockpit-bench-") as tmp:
+        workdir = Path(tmp)
+        repository = workdir / "ComfyUI"
+        create_repository(repository, args.tags)
+        comfyui = start_fake_comfyui(args.comfyui_latency)
+
+        env = {
+            **os.environ,
+            "PATH": f"{FAKEBIN}{os.pathsep}{os.environ.get('PATH', '')}",
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+            "FAKE_GIT_REAL": real_git,
+            "FAKE_GIT_LATENCY": str(args.git_latency),
+            "FAKE_SUPERVISORCTL_LATENCY": str(args.supervisorctl_latency),
+            "FAKE_SUPERVISORCTL_STARTED": str(time.time()),
+            "COMFYUI_PATH": str(repository),
+            "COMFYUI_COCKPIT_DUMMY_MODE": "true" if args.dummy else "false",
+            "COMFYUI_COCKPIT_SUPERVISOR_URL": "supervisorctl",
+            "COMFYUI_COCKPIT_PROGRAMS": args.programs,
+            "COMFYUI_COCKPIT_COMFYUI_URL": f"http://127.0.0.1:{comfyui.server_address[1]}",
+            "COMFYUI_COCKPIT_CACHE_DIR": str(workdir / "cache"),
+            # 資源使用量の採取はリクエストと無関係なので止めておく
+            "COMFYUI_COCKPIT_SAMPLE_INTERVAL": "0",
+        }
+        if args.status_ttl is not None:
+            env["COMFYUI_COCKPIT_STATUS_TTL"] = str(args.status_ttl)
+
+        server = CockpitServer(env, workdir)
+        try:
+            server.start()
+            measured = asyncio.run(
+                run_clients(server, args.endpoints, args.clients, args.duration, args.warmup, args.think)
+            )
+        finally:
+            server.stop()
+            comfyui.shutdown()
+            comfyui.server_close()
+
+    report = {
+        "benchmark": "cockpit-server-load",
+        "label": args.label,
+        "timestamp": time.time(),
+        "package_version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "clients": args.clients,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "think": args.think,
+            "endpoints": args.endpoints,
+            "programs": args.programs,
+            "status_ttl": args.status_ttl,
+            "supervisorctl_latency": args.supervisorctl_latency,
+            "git_latency": args.git_latency,
+            "comfyui_latency": args.comfyui_latency,
+            "dummy": args.dummy,
+        },
+        **measured,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,10 @@
+from tornado.ioloop import IOLoop
+
 from ._version import __version__
-from .config import Config
-from .handlers import setup_handlers
+from .services.startup import load_profile
 
-# 設定を初期化（.envファイルを読み込む）
-_config = Config()
+# 設定（.env）の読み込みやハンドラーの import は、サーバー拡張として読み込まれるまで行わない。
+# jupyter server extension list などで拡張を列挙するだけなら、このモジュールの import は軽く済む。
 
 def _jupyter_labextension_paths():
     return [{
@@ -16,8 +17,29 @@ def _jupyter_server_extension_points():
         "module": "jupyterlab_comfyui_cockpit"
     }]
 
+async def _start_background_services():
+    """サーバーの起動後に、起動時から動かしておく必要のある処理だけを始める
+
+    eventlistener からの接続は起動直後から来るため待ち受けはここで始める。
+    資源使用量の採取は COMFYUI_COCKPIT_SAMPLE_ON_START が有効な場合を除き、最初のリクエストで始まる。
+    """
+    from .config import Config
+    from .handlers.resources import resource_sampler
+    from .services.events import start_event_server
+
+    config = Config()
+    if config.get_bool("COMFYUI_COCKPIT_SAMPLE_ON_START"):
+        resource_sampler.start()
+    await start_event_server(config)
+
 def _load_jupyter_server_extension(server_app):
     """Registers the API handler to receive HTTP requests from the frontend extension.
     """
-    setup_handlers(server_app.web_app)
-    server_app.log.info("Registered ComfyUI Cockpit server extension")
+    load_profile.phases.clear()
+    with load_profile.phase("import"):
+        from .handlers import setup_handlers
+    with load_profile.phase("handlers"):
+        setup_handlers(server_app.web_app)
+    with load_profile.phase("schedule"):
+        IOLoop.current().add_callback(_start_background_services)
+    server_app.log.info(f"Registered ComfyUI Cockpit server extension in {load_profile.summary()}")
@@ -1,9 +1,7 @@
 """環境変数の読み込みと管理を行うクラス"""
 import os
 from pathlib import Path
-from typing import Optional
-
-from dotenv import load_dotenv
+from typing import List, Optional
 
 
 class Config:
@@ -26,6 +24,9 @@ class Config:
     
     def _load_env(self) -> None:
         """プロジェクトルートの.envファイルを読み込む"""
+        # python-dotenv は最初に設定を使うときまで import しない
+        from dotenv import load_dotenv
+
         # プロジェクトルートを探す（__file__から遡る）
         current_file = Path(__file__)
         # config.pyは jupyterlab_comfyui_cockpit/config.py にあるので
@@ -43,6 +44,21 @@ class Config:
         value = os.getenv("COMFYUI_COCKPIT_DUMMY_MODE", "false")
         return value.lower() in ("true", "1", "yes", "on")
     
+    @property
+    def cache_dir(self) -> Path:
+        """キャッシュや状態ファイルを保存するディレクトリ"""
+        value = os.getenv("COMFYUI_COCKPIT_CACHE_DIR")
+        if value:
+            return Path(value)
+        return Path.home() / ".cache" / "comfyui-cockpit"
+    
+    @property
+    def programs(self) -> List[str]:
+        """管理対象の supervisord プログラム名（先頭が主となる ComfyUI）"""
+        value = os.getenv("COMFYUI_COCKPIT_PROGRAMS", "")
+        programs = [name.strip() for name in value.split(",") if name.strip()]
+        return programs or ["comfyui"]
+    
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """環境変数の値を取得する"""
         return os.getenv(key, default)
@@ -63,3 +79,13 @@ class Config:
             return int(value)
         except ValueError:
             return default
+    
+    def get_float(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        """環境変数をfloat値として取得する"""
+        value = os.getenv(key)
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            return default
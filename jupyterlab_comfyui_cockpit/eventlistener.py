@@ -0,0 +1,53 @@
+"""supervisord の eventlistener として起動し、プロセス状態の変化を cockpit へ転送する
+
+supervisord の設定例::
+
+    [eventlistener:comfyui-cockpit]
+    command=python -m jupyterlab_comfyui_cockpit.eventlistener
+    events=PROCESS_STATE
+"""
+import argparse
+import sys
+from typing import BinaryIO, Optional, Sequence
+
+from .config import Config
+from .services.events import (
+    EventForwarder,
+    EventListenerProtocol,
+    build_event,
+    event_socket_path,
+)
+
+
+def run(stdin: BinaryIO, stdout: BinaryIO, forwarder: EventForwarder) -> None:
+    """supervisord から stdin が閉じられるまでイベントを転送し続ける"""
+    protocol = EventListenerProtocol(stdin, stdout)
+    while True:
+        try:
+            headers, payload = protocol.wait()
+        except EOFError:
+            return
+        if headers.get("eventname", "").startswith("PROCESS_STATE_"):
+            forwarder.send(build_event(headers, payload))
+        # 転送に失敗しても OK を返す（supervisord にイベントを溜め込ませない）
+        protocol.ok()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--socket",
+        default=event_socket_path(Config()),
+        help="cockpit が待ち受ける unix ソケットのパス",
+    )
+    args = parser.parse_args(argv)
+
+    forwarder = EventForwarder(args.socket)
+    try:
+        run(sys.stdin.buffer, sys.stdout.buffer, forwarder)
+    finally:
+        forwarder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
 from jupyter_server.utils import url_path_join
-from .process import ProcessHandler
-from .version import VersionHandler
+from .custom_nodes import CustomNodesHandler
+from .environment import EnvironmentDiffHandler, EnvironmentHandler
+from .gallery import GalleryFileHandler, GalleryHandler, GalleryThumbnailHandler
+from .logs import LogHandler, LogStreamHandler
+from .metrics import MetricsHandler
+from .models import ModelDuplicatesHandler, ModelsHandler
+from .process import ProcessHandler, ProcessStreamHandler
+from .prompt_queue import PromptQueueHandler, PromptQueueStreamHandler
+from .resources import ResourceHandler
+from .state import StateHandler
+from .timings import LifecycleTimingsHandler
+from .version import VersionHandler, VersionJobHandler, VersionJobStreamHandler, VersionStagingHandler
 
 def setup_handlers(web_app):
     host_pattern = ".*$"
@@ -10,8 +20,29 @@ def setup_handlers(web_app):
     namespace = "comfyui-cockpit"
 
     handlers = [
+        (url_path_join(base_url, namespace, "metrics"), MetricsHandler),
+        (url_path_join(base_url, namespace, "custom-nodes"), CustomNodesHandler),
+        (url_path_join(base_url, namespace, "environment"), EnvironmentHandler),
+        (url_path_join(base_url, namespace, "environment", "diff"), EnvironmentDiffHandler),
+        (url_path_join(base_url, namespace, "gallery"), GalleryHandler),
+        (url_path_join(base_url, namespace, "gallery", "files", r"(.+)"), GalleryFileHandler),
+        (url_path_join(base_url, namespace, "gallery", "thumbnails", r"(.+)"), GalleryThumbnailHandler),
+        (url_path_join(base_url, namespace, "models"), ModelsHandler),
+        (url_path_join(base_url, namespace, "models", "duplicates"), ModelDuplicatesHandler),
         (url_path_join(base_url, namespace, "process"), ProcessHandler),
+        (url_path_join(base_url, namespace, "process", "stream"), ProcessStreamHandler),
+        (url_path_join(base_url, namespace, "process", "resources"), ResourceHandler),
+        (url_path_join(base_url, namespace, "process", "timings"), LifecycleTimingsHandler),
+        (url_path_join(base_url, namespace, "queue"), PromptQueueHandler),
+        (url_path_join(base_url, namespace, "queue", "stream"), PromptQueueStreamHandler),
+        (url_path_join(base_url, namespace, "state"), StateHandler),
+        (url_path_join(base_url, namespace, "logs", r"(stdout|stderr)"), LogHandler),
+        (url_path_join(base_url, namespace, "logs", r"(stdout|stderr)", "stream"), LogStreamHandler),
         (url_path_join(base_url, namespace, "version"), VersionHandler),
+        (url_path_join(base_url, namespace, "version", "staging"), VersionStagingHandler),
+        (url_path_join(base_url, namespace, "version", "jobs"), VersionJobHandler),
+        (url_path_join(base_url, namespace, "version", "jobs", r"([0-9a-f]+)"), VersionJobHandler),
+        (url_path_join(base_url, namespace, "version", "jobs", r"([0-9a-f]+)", "stream"), VersionJobStreamHandler),
     ]
 
     web_app.add_handlers(host_pattern, handlers)
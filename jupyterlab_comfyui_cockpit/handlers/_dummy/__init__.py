@@ -1,3 +1,16 @@
-from .dummy_process import dummy_process_state, DummyProcessState
+from .dummy_logs import append_dummy_log, dummy_log_path
+from .dummy_process import dummy_supervisor, DummyProcessState, DummySupervisor
+from .dummy_settings import DummySettings
+from .dummy_version import dummy_versions, DummyVersions, DummyVersionSwitcher
 
-__all__ = ["dummy_process_state", "DummyProcessState"]
+__all__ = [
+  "append_dummy_log",
+  "dummy_log_path",
+  "dummy_supervisor",
+  "DummyProcessState",
+  "DummySupervisor",
+  "DummySettings",
+  "dummy_versions",
+  "DummyVersions",
+  "DummyVersionSwitcher",
+]
@@ -0,0 +1,16 @@
+import tempfile
+import time
+from pathlib import Path
+
+
+def dummy_log_path(stream: str) -> Path:
+  path = Path(tempfile.gettempdir()) / f'comfyui-cockpit-dummy-{stream}.log'
+  if not path.exists():
+    append_dummy_log(stream, 'DUMMY: log started')
+  return path
+
+
+def append_dummy_log(stream: str, line: str) -> None:
+  path = Path(tempfile.gettempdir()) / f'comfyui-cockpit-dummy-{stream}.log'
+  with open(path, 'a', encoding='utf-8') as f:
+    f.write(f'{time.strftime("%Y-%m-%d %H:%M:%S")} {line}\n')
@@ -1,49 +1,77 @@
+import random
 import threading
 import time
-from typing import Dict, Optional, Literal
+from typing import Any, Callable, Dict, List, Optional, Literal, Sequence, Tuple
 
 from tornado.ioloop import IOLoop
 
+from ...config import Config
+from ...services.status import combine_payloads
+from .dummy_logs import append_dummy_log
+from .dummy_settings import DummySettings
+
 ProcessAction = Literal['start', 'stop', 'restart']
 
+# supervisord の状態名から cockpit のステータスへの対応（services.supervisor と同じ）
+_STATUS_BY_STATE = {
+  'RUNNING': 'running',
+  'STARTING': 'starting',
+  'BACKOFF': 'error',
+  'FATAL': 'error',
+}
+
 
 class DummyProcessState:
-  def __init__(self):
+  def __init__(
+    self,
+    name: str = 'comfyui',
+    settings: Optional[DummySettings] = None,
+    pid: int = 12345,
+    clock: Callable[[], float] = time.time,
+    rng: Optional[random.Random] = None,
+    log: Optional[Callable[[str], None]] = None,
+  ):
+    self.name = name
+    self.settings = settings or DummySettings()
+    self._clock = clock
+    self._rng = rng or random.Random(self.settings.seed)
+    self._log = log
     self._lock = threading.Lock()
-    self._status: str = 'running'
-    self._pid: int = 12345
-    self._start_time: Optional[float] = time.time()
+    self._state: str = 'RUNNING'
+    self._pid: int = pid
+    self._start_time: Optional[float] = clock()
+    self._exitstatus: Optional[int] = None
+    self._attempts = 0
     self._pending_handle = None
     self._pending_loop: Optional[IOLoop] = None
 
+  @property
+  def status(self) -> str:
+    return _STATUS_BY_STATE.get(self._state, 'stopped')
+
   def start(self, loop: Optional[IOLoop] = None) -> str:
     loop = loop or IOLoop.current()
     with self._lock:
-      if self._status == 'running':
-        return 'DUMMY: comfyui already running'
-      self._status = 'starting'
-      self._start_time = None
-      self._schedule_running_transition_locked(loop)
-      return 'DUMMY: comfyui starting'
+      if self._state in ('RUNNING', 'STARTING'):
+        return f'DUMMY: {self.name} already {self._state.lower()}'
+      self._spawn_locked(loop)
+      return f'DUMMY: {self.name} starting'
 
   def stop(self, loop: Optional[IOLoop] = None) -> str:
     del loop
     with self._lock:
       self._cancel_pending_transition_locked()
-      if self._status == 'stopped':
-        return 'DUMMY: comfyui already stopped'
-      self._status = 'stopped'
+      if self._state in ('STOPPED', 'EXITED', 'FATAL'):
+        return f'DUMMY: {self.name} already stopped'
+      self._state = 'STOPPED'
       self._start_time = None
-      return 'DUMMY: comfyui stopped'
+      return f'DUMMY: {self.name} stopped'
 
   def restart(self, loop: Optional[IOLoop] = None) -> str:
     loop = loop or IOLoop.current()
     with self._lock:
-      self._cancel_pending_transition_locked()
-      self._status = 'starting'
-      self._start_time = None
-      self._schedule_running_transition_locked(loop)
-      return 'DUMMY: comfyui restarting'
+      self._spawn_locked(loop)
+      return f'DUMMY: {self.name} restarting'
 
   def perform_action(self, action: ProcessAction, loop: Optional[IOLoop] = None) -> str:
     if action == 'start':
@@ -54,25 +82,86 @@ class DummyProcessState:
       return self.restart(loop)
     raise ValueError(f'Unsupported dummy action: {action}')
 
-  def get_status_payload(self) -> Dict[str, str]:
+  def get_status_payload(self) -> Dict[str, Any]:
     with self._lock:
+      running = self._state == 'RUNNING'
+      ready = running and self._start_time is not None and self._clock() - self._start_time >= self.settings.load_seconds
       return {
-        'status': self._status,
+        'status': self.status,
         'message': self._build_message_locked(),
+        'state': self._state,
+        'pid': self._pid if running else None,
+        'start': self._start_time if running else None,
+        'exitstatus': self._exitstatus,
+        'ready': ready,
+        'ready_message': 'DUMMY: loading custom nodes' if running and not ready else '',
       }
 
-  def _schedule_running_transition_locked(self, loop: IOLoop) -> None:
+  def _spawn_locked(self, loop: IOLoop) -> None:
+    self._cancel_pending_transition_locked()
+    self._state = 'STARTING'
+    self._start_time = None
+    self._attempts = 0
+    self._schedule_attempt_locked(loop)
+
+  def _schedule_attempt_locked(self, loop: IOLoop) -> None:
+    jitter = self.settings.start_jitter
+    delay = self.settings.start_seconds * (1 + self._rng.uniform(-jitter, jitter)) if jitter else self.settings.start_seconds
+    self._schedule_locked(loop, max(0.0, delay), lambda: self._finish_attempt(loop))
+
+  def _finish_attempt(self, loop: IOLoop) -> None:
+    with self._lock:
+      if self._rng.random() >= self.settings.start_failure_rate:
+        self._state = 'RUNNING'
+        self._pid += 1
+        self._start_time = self._clock()
+        self._exitstatus = None
+        if self.settings.crash_interval > 0:
+          delay = self._rng.expovariate(1 / self.settings.crash_interval)
+          self._schedule_locked(loop, delay, lambda: self._crash(loop))
+        return
+
+      # startsecs より前に終了した：再試行するたびに待ち時間を1秒ずつ延ばし、上限を超えたら FATAL
+      self._attempts += 1
+      self._exitstatus = 1
+      if self._attempts > self.settings.start_retries:
+        self._state = 'FATAL'
+        self._emit(f'DUMMY: {self.name} gave up: entered FATAL state, too many start retries too quickly')
+        return
+      self._state = 'BACKOFF'
+      self._emit(f'DUMMY: {self.name} exited too quickly (attempt {self._attempts})')
+      self._schedule_locked(loop, float(self._attempts), lambda: self._retry(loop))
+
+  def _retry(self, loop: IOLoop) -> None:
+    with self._lock:
+      self._state = 'STARTING'
+      self._schedule_attempt_locked(loop)
+
+  def _crash(self, loop: IOLoop) -> None:
+    with self._lock:
+      self._exitstatus = 1
+      self._emit(f'DUMMY: {self.name} exited unexpectedly (exit status 1); restarting')
+      # autorestart により EXITED から直ちに STARTING へ移る
+      self._state = 'STARTING'
+      self._start_time = None
+      self._attempts = 0
+      self._schedule_attempt_locked(loop)
+
+  def _emit(self, line: str) -> None:
+    if self._log is not None:
+      self._log(line)
+
+  def _schedule_locked(self, loop: IOLoop, delay: float, callback: Callable[[], None]) -> None:
     self._cancel_pending_transition_locked()
 
-    def mark_running():
+    def fire():
       with self._lock:
         self._pending_handle = None
         self._pending_loop = None
-        self._status = 'running'
-        self._start_time = time.time()
+      callback()
 
     self._pending_loop = loop
-    self._pending_handle = loop.call_later(1.0, mark_running)
+    self._pending_handle = loop.call_later(delay, fire)
 
   def _cancel_pending_transition_locked(self) -> None:
     if self._pending_handle and self._pending_loop:
@@ -84,23 +173,70 @@ class DummyProcessState:
     self._pending_loop = None
 
   def _build_message_locked(self) -> str:
-    status = self._status.upper()
-    if self._status == 'running':
+    if self._state == 'RUNNING':
       uptime = self._format_uptime_locked()
-      return f'DUMMY: comfyui {status}   pid {self._pid}, uptime {uptime}'
-    if self._status == 'starting':
-      return f'DUMMY: comfyui {status}'
-    if self._status == 'stopped':
-      return 'DUMMY: comfyui STOPPED'
-    return f'DUMMY: comfyui {status}'
+      return f'DUMMY: {self.name} RUNNING   pid {self._pid}, uptime {uptime}'
+    if self._state == 'BACKOFF':
+      return f'DUMMY: {self.name} BACKOFF   Exited too quickly (process log may have details)'
+    if self._state == 'FATAL':
+      return f'DUMMY: {self.name} FATAL     Exited too quickly (process log may have details)'
+    return f'DUMMY: {self.name} {self._state}'
 
   def _format_uptime_locked(self) -> str:
     if not self._start_time:
       return '0:00:00'
-    elapsed = max(0, int(time.time() - self._start_time))
+    elapsed = max(0, int(self._clock() - self._start_time))
     hours, remainder = divmod(elapsed, 3600)
     minutes, seconds = divmod(remainder, 60)
     return f'{hours}:{minutes:02d}:{seconds:02d}'
 
 
-dummy_process_state = DummyProcessState()
+class DummySupervisor:
+  def __init__(
+    self,
+    programs: Optional[Sequence[str]] = None,
+    settings: Optional[DummySettings] = None,
+    clock: Callable[[], float] = time.time,
+  ):
+    self._programs = list(programs) if programs else None
+    self._settings = settings
+    self._clock = clock
+    self._rng: Optional[random.Random] = None
+    self._states: Dict[str, DummyProcessState] = {}
+
+  @property
+  def settings(self) -> DummySettings:
+    if self._settings is None:
+      self._settings = DummySettings.from_config(Config())
+    return self._settings
+
+  @property
+  def programs(self) -> List[str]:
+    return self._programs or Config().programs
+
+  def state(self, name: str) -> DummyProcessState:
+    if name not in self._states:
+      if self._rng is None:
+        self._rng = random.Random(self.settings.seed)
+      self._states[name] = DummyProcessState(
+        name,
+        self.settings,
+        pid=12345 + 1000 * len(self._states),
+        clock=self._clock,
+        rng=self._rng,
+        log=lambda line: append_dummy_log('stderr', line),
+      )
+    return self._states[name]
+
+  async def perform_action(self, action: str, name: str) -> Tuple[bool, str]:
+    if name not in self.programs:
+      return False, f'DUMMY: {name}: ERROR (no such process)'
+    message = self.state(name).perform_action(action)
+    append_dummy_log('stdout', message)
+    return True, message
+
+  def get_status_payload(self) -> Dict[str, Any]:
+    return combine_payloads([{'name': name, **self.state(name).get_status_payload()} for name in self.programs])
+
+
+dummy_supervisor = DummySupervisor()
@@ -0,0 +1,41 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from ...config import Config
+
+DEFAULT_TAGS = ['1.0.0-dummy', '0.9.0-dummy', '0.8.0-dummy']
+
+
+@dataclass
+class DummySettings:
+  # STARTING から RUNNING になるまでの秒数と、その揺らぎ（±割合）
+  start_seconds: float = 1.0
+  start_jitter: float = 0.0
+  # RUNNING になってから HTTP API が応答するまで（カスタムノードの読み込み）の秒数
+  load_seconds: float = 3.0
+  # 起動の試行が startsecs 以内に終了する確率と、FATAL になるまでの再試行回数（supervisord の startretries）
+  start_failure_rate: float = 0.0
+  start_retries: int = 3
+  # RUNNING 中に異常終了するまでの平均秒数（0 で異常終了しない）。終了後は autorestart で再起動する
+  crash_interval: float = 0.0
+  seed: Optional[int] = None
+  # バージョン切り替えで使うタグ（新しい順）と各ステップの秒数
+  tags: List[str] = field(default_factory=lambda: list(DEFAULT_TAGS))
+  checkout_seconds: float = 0.0
+  deps_seconds: float = 0.0
+
+  @classmethod
+  def from_config(cls, config: Config) -> 'DummySettings':
+    tags = [tag.strip() for tag in (config.get('COMFYUI_COCKPIT_DUMMY_TAGS') or '').split(',') if tag.strip()]
+    return cls(
+      start_seconds=config.get_float('COMFYUI_COCKPIT_DUMMY_START_SECONDS', 1.0),
+      start_jitter=config.get_float('COMFYUI_COCKPIT_DUMMY_START_JITTER', 0.0),
+      load_seconds=config.get_float('COMFYUI_COCKPIT_DUMMY_LOAD_SECONDS', 3.0),
+      start_failure_rate=config.get_float('COMFYUI_COCKPIT_DUMMY_START_FAILURE_RATE', 0.0),
+      start_retries=config.get_int('COMFYUI_COCKPIT_DUMMY_START_RETRIES', 3),
+      crash_interval=config.get_float('COMFYUI_COCKPIT_DUMMY_CRASH_INTERVAL', 0.0),
+      seed=config.get_int('COMFYUI_COCKPIT_DUMMY_SEED'),
+      tags=tags or list(DEFAULT_TAGS),
+      checkout_seconds=config.get_float('COMFYUI_COCKPIT_DUMMY_CHECKOUT_SECONDS', 0.0),
+      deps_seconds=config.get_float('COMFYUI_COCKPIT_DUMMY_DEPS_SECONDS', 0.0),
+    )
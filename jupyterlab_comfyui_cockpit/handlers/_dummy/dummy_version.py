@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from ...services.version_jobs import restart_programs
+from .dummy_process import DummySupervisor, dummy_supervisor
+
+
+class DummyVersions:
+  def __init__(self, supervisor: DummySupervisor):
+    self._supervisor = supervisor
+    self._current: Optional[str] = None
+
+  @property
+  def tags(self) -> List[str]:
+    return self._supervisor.settings.tags
+
+  @property
+  def current(self) -> str:
+    return self._current or self.tags[0]
+
+  def tag_exists(self, tag: str) -> bool:
+    return tag in self.tags
+
+  def checkout(self, tag: str) -> None:
+    self._current = tag
+
+
+dummy_versions = DummyVersions(dummy_supervisor)
+
+
+class DummyVersionSwitcher:
+
+  def __init__(self, versions: DummyVersions = dummy_versions, supervisor: DummySupervisor = dummy_supervisor):
+    self.versions = versions
+    self.supervisor = supervisor
+    self.service_names = list(supervisor.programs)
+
+  async def run(self, job) -> Dict[str, Any]:
+    settings = self.supervisor.settings
+
+    async with job.step('checkout') as step:
+      await asyncio.sleep(settings.checkout_seconds)
+      self.versions.checkout(job.target_version)
+      step.message = 'DUMMY'
+
+    async with job.step('deps') as step:
+      await asyncio.sleep(settings.deps_seconds)
+      step.message = 'DUMMY'
+
+    async with job.step('restart') as step:
+      for _, _, message in await restart_programs(job, self.supervisor, self.service_names):
+        job.log(message)
+      step.message = 'DUMMY'
+
+    return {
+      'success': True,
+      'message': f'Successfully switched to version {job.target_version} (dummy mode)',
+      'version': job.target_version,
+    }
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+from typing import Dict, Tuple
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+from tornado.ioloop import IOLoop
+
+from ..config import Config
+from ..services.custom_nodes import get_custom_node_inventory, parse_import_times
+from ..services.logs import read_chunk
+from .logs import resolve_log_path
+
+# 起動ログの "Import times for custom nodes:" を探す範囲（各ログの末尾から）
+IMPORT_TIMES_WINDOW = 1024 * 1024
+
+
+async def _read_import_times(config: Config) -> Dict[str, Tuple[float, bool]]:
+    """stdout / stderr のログから直近の起動時のノードごとの読み込み時間を取り出す"""
+    times: Dict[str, Tuple[float, bool]] = {}
+    for stream in ("stdout", "stderr"):
+        try:
+            path = await resolve_log_path(config, stream)
+            if path is None:
+                continue
+            chunk = await IOLoop.current().run_in_executor(None, read_chunk, path, -IMPORT_TIMES_WINDOW, IMPORT_TIMES_WINDOW)
+        except Exception:
+            continue
+        times.update(parse_import_times(chunk.data))
+    return times
+
+
+class CustomNodesHandler(APIHandler):
+    """custom_nodes 配下のノードの一覧（git の状態・依存関係・サイズ・起動時の読み込み時間）を返すハンドラー
+
+    refresh=true でキャッシュを使わずに調べ直す。
+    """
+
+    def initialize(self, *args, **kwargs):
+        super().initialize(*args, **kwargs)
+        self.cockpit_config = Config()
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        inventory = get_custom_node_inventory()
+        started = time.monotonic()
+        try:
+            nodes, import_times = await asyncio.gather(
+                inventory.collect(force=self.get_argument('refresh', '') == 'true'),
+                _read_import_times(self.cockpit_config),
+            )
+        except Exception as e:
+            self.log.error(f"Error in CustomNodesHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        payload = []
+        for node in nodes:
+            import_time, import_failed = import_times.get(node.name, (None, False))
+            payload.append({**node.to_dict(), "import_time": import_time, "import_failed": import_failed})
+
+        self.finish(json.dumps({
+            "path": str(inventory.root),
+            "exists": inventory.root.is_dir(),
+            "elapsed": round(time.monotonic() - started, 3),
+            "nodes": payload,
+        }))
@@ -0,0 +1,86 @@
+import json
+import time
+from pathlib import Path
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from ..config import Config
+from ..services.environment import check_requirements, get_environment_inventory, summarize_checks
+from ..services.git_refs import get_version_metadata
+from ..services.requirements import RequirementSet
+
+
+class EnvironmentHandler(APIHandler):
+    """ComfyUI の Python 環境にインストールされたパッケージの一覧を返すハンドラー（pip は起動しない）"""
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        inventory = get_environment_inventory()
+        started = time.monotonic()
+        try:
+            packages = await inventory.get()
+        except Exception as e:
+            self.log.error(f"Error in EnvironmentHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        self.finish(json.dumps({
+            "site_packages": [str(path) for path in inventory.site_dirs],
+            "elapsed": round(time.monotonic() - started, 4),
+            "packages": [package.to_dict() for _, package in sorted(packages.items())],
+        }))
+
+
+class EnvironmentDiffHandler(APIHandler):
+    """インストール済みのパッケージと、指定したバージョンの requirements.txt を比較するハンドラー
+
+    version を省略すると、現在の COMFYUI_PATH の requirements.txt と比較する。
+    """
+
+    def initialize(self, *args, **kwargs):
+        super().initialize(*args, **kwargs)
+        self.cockpit_config = Config()
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        version = self.get_argument('version', None)
+        comfyui_path = Path(self.cockpit_config.get("COMFYUI_PATH", "/opt/app/ComfyUI"))
+        started = time.monotonic()
+        try:
+            if version:
+                metadata = get_version_metadata(comfyui_path)
+                if not metadata.tag_exists(version):
+                    self.set_status(404)
+                    self.finish(json.dumps({"status": "error", "message": f"Unknown version: {version}"}))
+                    return
+                content = await metadata.read_file(version, "requirements.txt")
+                requirements = RequirementSet.parse(content) if content is not None else None
+            else:
+                requirements = RequirementSet.from_file(comfyui_path / "requirements.txt")
+
+            if requirements is None:
+                self.set_status(404)
+                self.finish(json.dumps({"status": "error", "message": f"requirements.txt not found at {version or comfyui_path}"}))
+                return
+
+            results = check_requirements(await get_environment_inventory().get(), requirements)
+        except Exception as e:
+            self.log.error(f"Error in EnvironmentDiffHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        self.finish(json.dumps({
+            "version": version,
+            "digest": requirements.digest,
+            "options": requirements.options,
+            "elapsed": round(time.monotonic() - started, 4),
+            "summary": summarize_checks(results),
+            "requirements": results,
+        }))
@@ -0,0 +1,126 @@
+import json
+import os
+from typing import Optional
+from urllib.parse import quote
+
+import tornado
+from jupyter_server.base.handlers import APIHandler, AuthenticatedFileHandler
+
+from ..services.gallery import get_output_index, get_thumbnail_cache, media_kind
+
+
+class GalleryHandler(APIHandler):
+    """output ディレクトリの生成物を新しい順にページ単位で返すハンドラー
+
+    各項目には元のファイルとサムネイルの URL（相対パス）を付け、そのページのサムネイルを裏で作り始める。
+    サムネイルを作れない形式（動画・音声、Pillow がない場合は画像も）は thumbnail_url が null になる。
+    """
+
+    MAX_LIMIT = 500
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            offset = int(self.get_argument('offset', '0'))
+            limit = int(self.get_argument('limit', '100'))
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "offset and limit must be integers"}))
+            return
+
+        if offset < 0 or limit <= 0:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "offset must not be negative and limit must be positive"}))
+            return
+
+        index = get_output_index()
+        cache = get_thumbnail_cache()
+        try:
+            if self.get_argument('refresh', '') == 'true':
+                await index.refresh()
+            payload = await index.list(
+                folder=self.get_argument('folder', None),
+                search=self.get_argument('q', None),
+                sort=self.get_argument('sort', '-mtime'),
+                offset=offset,
+                limit=min(limit, self.MAX_LIMIT),
+            )
+        except ValueError as e:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+        except Exception as e:
+            self.log.error(f"Error in GalleryHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        items = payload.pop("models")
+        for item in items:
+            item["kind"] = media_kind(item["name"])
+            item["url"] = f"gallery/files/{quote(item['path'])}"
+            item["thumbnail_url"] = None
+            if cache.supported(item["name"]):
+                key = cache.key(item["path"], item["size"], item["mtime"])
+                item["thumbnail_url"] = f"gallery/thumbnails/{quote(item['path'])}?v={key}"
+        cache.prefetch(index.root, [item["path"] for item in items])
+
+        self.finish(json.dumps({**payload, "items": items}))
+
+
+class GalleryFileHandler(AuthenticatedFileHandler):
+    """output ディレクトリのファイルをそのまま返すハンドラー（Range リクエストと 304 は tornado が処理する）"""
+
+    def initialize(self, **kwargs):
+        super().initialize(path=str(get_output_index().root), **kwargs)
+
+    def compute_etag(self) -> Optional[str]:
+        """inode・サイズ・mtime から作る強い ETag（ファイルの内容を読まずに済む）"""
+        try:
+            stat = os.stat(self.absolute_path)
+        except (OSError, TypeError):
+            return None
+        return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+class GalleryThumbnailHandler(AuthenticatedFileHandler):
+    """output ディレクトリの画像のサムネイルを返すハンドラー
+
+    サムネイルがなければ作ってから返す。一覧が返す URL には ?v=<キー> が付いており、
+    元のファイルが変わると URL も変わるため、ブラウザには長期間キャッシュさせる。
+    """
+
+    def initialize(self, **kwargs):
+        super().initialize(path=str(get_thumbnail_cache().directory), **kwargs)
+
+    @tornado.web.authenticated
+    async def get(self, path: str, include_body: bool = True):
+        # キーは一覧と同じく output ディレクトリからの相対パスで作る
+        relative = os.path.normpath(path).replace(os.sep, "/")
+        root = os.path.realpath(get_output_index().root)
+        source = os.path.realpath(os.path.join(root, relative))
+        if (
+            os.path.commonpath([root, source]) != root
+            or any(part.startswith(".") for part in relative.split("/"))
+            or not os.path.isfile(source)
+        ):
+            raise tornado.web.HTTPError(404)
+
+        cache = get_thumbnail_cache()
+        try:
+            name = await cache.get(source, relative)
+        except Exception as e:
+            self.log.warning(f"Failed to create a thumbnail for {path}: {e}")
+            raise tornado.web.HTTPError(500)
+        if name is None:
+            raise tornado.web.HTTPError(404)
+
+        self._thumbnail_name = name
+        await AuthenticatedFileHandler.get(self, name, include_body=include_body)
+
+    def compute_etag(self) -> Optional[str]:
+        """サムネイルのファイル名はキーそのもの（元のファイルのパス・サイズ・mtime から決まる）"""
+        name = getattr(self, "_thumbnail_name", None)
+        return f'"{name[:-len(get_thumbnail_cache().SUFFIX)]}"' if name else None
@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+from tornado.ioloop import IOLoop
+
+from ..config import Config
+from ..services.logs import DEFAULT_CHUNK, get_log_tailer, read_chunk
+from ..services.supervisor import get_supervisor
+from ._dummy import dummy_log_path
+from .stream import EventStreamHandler
+
+# supervisord から取得したログファイルのパス（プロセスの設定が変わらない限り同じ）
+_supervisor_log_paths: Dict[str, Path] = {}
+
+
+async def resolve_log_path(config: Config, stream: str) -> Optional[Path]:
+    """stdout / stderr のログファイルのパスを求める
+
+    COMFYUI_COCKPIT_STDOUT_LOG / COMFYUI_COCKPIT_STDERR_LOG が設定されていればそれを使い、
+    なければ supervisord の XML-RPC から stdout_logfile / stderr_logfile を取得する。
+    """
+    if config.dummy_mode:
+        return dummy_log_path(stream)
+
+    configured = config.get(f"COMFYUI_COCKPIT_{stream.upper()}_LOG")
+    if configured:
+        return Path(configured)
+
+    if stream not in _supervisor_log_paths:
+        info = await get_supervisor().get_process_info(config.programs[0])
+        logfile = info.stdout_logfile if stream == "stdout" else info.stderr_logfile
+        if not logfile:
+            return None
+        _supervisor_log_paths[stream] = Path(logfile)
+    return _supervisor_log_paths[stream]
+
+
+def _get_offset(handler: APIHandler) -> Optional[int]:
+    offset = handler.get_argument('offset', None)
+    return int(offset) if offset is not None else None
+
+
+class LogHandler(APIHandler):
+    """ログファイルの一部をバイトオフセットで指定して返すハンドラー
+
+    offset を省略するか負の値を指定すると末尾から読み、
+    レスポンスの next_offset を次の offset に指定すると続きだけを取得できる。
+    """
+
+    def initialize(self, *args, **kwargs):
+        super().initialize(*args, **kwargs)
+        self.cockpit_config = Config()
+
+    @tornado.web.authenticated
+    async def get(self, stream: str):
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            offset = _get_offset(self)
+            limit = int(self.get_argument('limit', str(DEFAULT_CHUNK)))
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "offset and limit must be integers"}))
+            return
+
+        try:
+            path = await resolve_log_path(self.cockpit_config, stream)
+            if path is None:
+                self.set_status(404)
+                self.finish(json.dumps({"status": "error", "message": f"No {stream} log file is configured"}))
+                return
+
+            chunk = await IOLoop.current().run_in_executor(
+                None, read_chunk, path, -DEFAULT_CHUNK if offset is None else offset, limit
+            )
+        except FileNotFoundError:
+            self.set_status(404)
+            self.finish(json.dumps({"status": "error", "message": f"Log file not found: {path}"}))
+            return
+        except Exception as e:
+            self.log.error(f"Error in LogHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        self.finish(json.dumps({"stream": stream, "path": str(path), **chunk.to_dict()}))
+
+
+class LogStreamHandler(EventStreamHandler):
+    """ログファイルへの追記を Server-Sent Events で配信するハンドラー"""
+
+    @tornado.web.authenticated
+    async def get(self, stream: str):
+        try:
+            offset = _get_offset(self)
+        except ValueError:
+            self.set_status(400)
+            self.set_header('Content-Type', 'application/json')
+            self.finish(json.dumps({"status": "error", "message": "offset must be an integer"}))
+            return
+
+        path = await resolve_log_path(Config(), stream)
+        if path is None:
+            self.set_status(404)
+            self.set_header('Content-Type', 'application/json')
+            self.finish(json.dumps({"status": "error", "message": f"No {stream} log file is configured"}))
+            return
+
+        await self.stream(get_log_tailer(path).subscribe(offset), lambda item: (item["event"], item["data"]))
@@ -0,0 +1,43 @@
+import tornado
+from jupyter_server.base.handlers import JupyterHandler
+
+from ..services.metrics import metrics
+
+_request_total = metrics.counter(
+    "comfyui_cockpit_http_requests_total",
+    "Requests served by cockpit API handlers, by handler, method and status code.",
+    ("handler", "method", "code"),
+)
+_request_duration = metrics.histogram(
+    "comfyui_cockpit_http_request_duration_seconds",
+    "Time to serve cockpit API requests, by handler and method.",
+    ("handler", "method"),
+)
+
+
+class RequestMetricsMixin:
+    """リクエスト数と処理時間を記録するハンドラー用の mixin
+
+    metrics_name をラベルとして、レスポンスを返し終えた時に1回だけ記録する。
+    """
+
+    metrics_name = ""
+
+    def on_finish(self):
+        method = self.request.method
+        _request_total.inc(self.metrics_name, method, str(self.get_status()))
+        _request_duration.observe(self.request.request_time(), self.metrics_name, method)
+        super().on_finish()
+
+
+class MetricsHandler(JupyterHandler):
+    """メトリクスを Prometheus のテキスト形式で返すハンドラー
+
+    定期的な収集で Jupyter Server のアイドル判定が延びないよう、APIHandler は使わない。
+    """
+
+    @tornado.web.authenticated
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.set_header('Cache-Control', 'no-store')
+        self.finish(metrics.render())
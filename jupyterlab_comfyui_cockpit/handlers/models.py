@@ -0,0 +1,96 @@
+import json
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+from tornado.ioloop import IOLoop
+
+from ..services.model_hashes import get_model_hasher
+from ..services.models import get_model_index
+
+
+class ModelsHandler(APIHandler):
+    """models ディレクトリのファイル一覧を索引からページ単位で返すハンドラー
+
+    folder（checkpoints / loras など）と q（パスの部分一致）で絞り込み、sort で並べ替える。
+    refresh=true で差分の再走査を、refresh=full で全ディレクトリの再走査を待ってから返す。
+    """
+
+    MAX_LIMIT = 1000
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            offset = int(self.get_argument('offset', '0'))
+            limit = int(self.get_argument('limit', '100'))
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "offset and limit must be integers"}))
+            return
+
+        if offset < 0 or limit <= 0:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "offset must not be negative and limit must be positive"}))
+            return
+
+        refresh = self.get_argument('refresh', '')
+        index = get_model_index()
+        try:
+            if refresh in ('true', 'full'):
+                await index.refresh(full=refresh == 'full')
+            payload = await index.list(
+                folder=self.get_argument('folder', None),
+                search=self.get_argument('q', None),
+                sort=self.get_argument('sort', 'name'),
+                offset=offset,
+                limit=min(limit, self.MAX_LIMIT),
+            )
+        except ValueError as e:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+        except Exception as e:
+            self.log.error(f"Error in ModelsHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        self.finish(json.dumps(payload))
+
+
+class ModelDuplicatesHandler(APIHandler):
+    """内容が同じモデルファイルの一覧（GET）と、SHA-256 の計算の開始（POST）を行うハンドラー"""
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        hasher = get_model_hasher()
+        try:
+            report = await IOLoop.current().run_in_executor(None, hasher.duplicates)
+        except Exception as e:
+            self.log.error(f"Error in ModelDuplicatesHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        self.finish(json.dumps({"progress": hasher.progress.to_dict(), **report}))
+
+    @tornado.web.authenticated
+    def post(self):
+        """ハッシュの計算を裏で始める（all=true でサイズが重複しないファイルも計算する）"""
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            data = self.get_json_body() or {}
+        except Exception:
+            data = None
+        if not isinstance(data, dict):
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "Invalid JSON data"}))
+            return
+
+        progress = get_model_hasher().start(all_files=bool(data.get("all")))
+        self.set_status(202)
+        self.finish(json.dumps({"progress": progress.to_dict()}))
@@ -1,52 +1,57 @@
 import json
-import subprocess
 import tornado
 from jupyter_server.base.handlers import APIHandler
 
 from ..config import Config
-from ._dummy import dummy_process_state
+from ..services.actions import process_actions
+from ..services.events import process_event_store
+from ..services.readiness import add_readiness, get_readiness_prober
+from ..services.status import process_status_cache
+from ..services.supervisor import get_supervisor
+from ..services.timings import StartupTracker, lifecycle_timings
+from ..services.watcher import ProcessStatusWatcher
+from ._dummy import dummy_supervisor
+from .metrics import RequestMetricsMixin
+from .stream import EventStreamHandler
 
 
-class ProcessHandler(APIHandler):
+async def fetch_status_payload():
+    """全プログラムの状態（ready を含む）"""
+    if Config().dummy_mode:
+        return dummy_supervisor.get_status_payload()
+    # RUNNING になっても ComfyUI がリクエストを受け付けるまでは ready を False とする
+    return await add_readiness(await process_status_cache.get(), get_readiness_prober())
+
+
+# 全クライアントで共有する状態監視（ストリーム購読者がいる間だけ動く）
+process_status_watcher = ProcessStatusWatcher(fetch_status_payload)
+# eventlistener から状態遷移が届いたら即座に配信する
+process_event_store.add_listener(lambda name: process_status_watcher.poke())
+# start / restart から ready までの所要時間の計測（同時に計測するのは直近の操作だけ）
+startup_tracker = StartupTracker(lifecycle_timings)
+
+
+class ProcessHandler(RequestMetricsMixin, APIHandler):
+    metrics_name = "process"
+
     def initialize(self, *args, **kwargs):
         super().initialize(*args, **kwargs)
         self.cockpit_config = Config()
     
     @tornado.web.authenticated
-    def get(self):
+    async def get(self):
         self.set_header('Content-Type', 'application/json')
 
-        if self.cockpit_config.dummy_mode:
-            self.finish(json.dumps(dummy_process_state.get_status_payload()))
-            return
-        
-        service_name = "comfyui"
-        cmd = ["supervisorctl", "status", service_name]
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            # supervisorctl status output example: "comfyui RUNNING   pid 12345, uptime 0:00:10"
-            # or "comfyui STOPPED   Dec 05 12:00 PM"
-            
-            output = result.stdout.strip()
-            status = "stopped"
-            if "RUNNING" in output:
-                status = "running"
-            elif "STARTING" in output:
-                status = "starting"
-            elif "BACKOFF" in output or "FATAL" in output:
-                status = "error"
-            
-            self.finish(json.dumps({
-                "status": status,
-                "message": output
-            }))
+            payload = await fetch_status_payload()
+            self.finish(json.dumps(payload))
         except Exception as e:
             self.log.error(f"Error in ProcessHandler.get: {e}", exc_info=True)
             self.set_status(500)
             self.finish(json.dumps({"status": "error", "message": str(e)}))
 
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         self.set_header('Content-Type', 'application/json')
         try:
             input_data = self.get_json_body()
@@ -60,46 +65,59 @@ class ProcessHandler(APIHandler):
             self.finish(json.dumps({"status": "error", "message": "Invalid JSON data"}))
             return
         
-        if self.cockpit_config.dummy_mode:
-            action = input_data.get("action")
-            
-            if action not in ["start", "stop", "restart"]:
-                self.set_status(400)
-                self.finish(json.dumps({"status": "error", "message": "Invalid action"}))
-                return
-            
-            result_message = dummy_process_state.perform_action(action)
-            self.finish(json.dumps({
-                "status": "success",
-                "message": result_message
-            }))
-            return
-        
         action = input_data.get("action")
 
         if action not in ["start", "stop", "restart"]:
              self.set_status(400)
              self.finish(json.dumps({"status": "error", "message": "Invalid action"}))
              return
-        
-        service_name = "comfyui"
-        cmd = ["supervisorctl", action, service_name]
 
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+        # targets を省略した場合は管理対象の全プログラムを操作する
+        programs = self.cockpit_config.programs
+        targets = input_data.get("targets") or programs
+        if not isinstance(targets, list) or any(target not in programs for target in targets):
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": f"Invalid targets. Must be a subset of {programs}"}))
+            return
 
-            if result.returncode == 0:
-                self.finish(json.dumps({
-                    "status": "success",
-                    "message": result.stdout.strip()
-                }))
+        try:
+            # 主となる ComfyUI の起動を伴う操作は、ready になるまでの所要時間を計測する
+            primary = programs[0]
+            if action in ("start", "restart") and primary in targets:
+                await startup_tracker.begin(action, fetch_status_payload)
             else:
+                startup_tracker.cancel()
+
+            # 各プログラムへの操作は並行して実行する（ダミーモードでは疑似的な supervisord を操作する）。
+            # 同じ操作が実行中・待機中なら合流し、異なる操作やバージョン切り替えの再起動の後に順番に実行する
+            supervisor = dummy_supervisor if self.cockpit_config.dummy_mode else get_supervisor()
+            results = await process_actions.perform(supervisor, action, targets)
+            # 操作後は古いステータスを返さないようにキャッシュを破棄する
+            process_status_cache.invalidate()
+            process_status_watcher.poke()
+
+            if any(name == primary and not success for name, success, _ in results):
+                startup_tracker.cancel()
+            ok = all(success for _, success, _ in results)
+            if not ok:
                 self.set_status(500)
-                self.finish(json.dumps({
-                    "status": "error",
-                    "message": result.stderr.strip() or result.stdout.strip()
-                }))
+            self.finish(json.dumps({
+                "status": "success" if ok else "error",
+                "message": "\n".join(message for _, _, message in results),
+                "results": [
+                    {"name": name, "success": success, "message": message}
+                    for name, success, message in results
+                ],
+            }))
         except Exception as e:
             self.log.error(f"Error in ProcessHandler.post: {e}", exc_info=True)
             self.set_status(500)
             self.finish(json.dumps({"status": "error", "message": str(e)}))
+
+
+class ProcessStreamHandler(EventStreamHandler):
+    """プロセス状態の変化を Server-Sent Events で配信するハンドラー"""
+
+    @tornado.web.authenticated
+    async def get(self):
+        await self.stream(process_status_watcher.subscribe(), lambda payload: ("status", payload))
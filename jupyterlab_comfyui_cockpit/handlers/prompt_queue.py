@@ -0,0 +1,28 @@
+import json
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from ..services.prompt_queue import get_prompt_queue_monitor
+from .stream import EventStreamHandler
+
+
+class PromptQueueHandler(APIHandler):
+    """ComfyUI のキュー（実行中・待機中）と直近の実行履歴を返すハンドラー
+
+    ComfyUI には直接問い合わせず、サーバー内で共有している監視結果を返す。
+    ComfyUI に接続できない場合も 200 で connected: false と error を返す。
+    """
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(await get_prompt_queue_monitor().get()))
+
+
+class PromptQueueStreamHandler(EventStreamHandler):
+    """キューの変化（queue）と実行中のプロンプトの進捗（progress）を Server-Sent Events で配信するハンドラー"""
+
+    @tornado.web.authenticated
+    async def get(self):
+        await self.stream(get_prompt_queue_monitor().subscribe(), lambda item: item)
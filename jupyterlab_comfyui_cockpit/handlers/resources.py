@@ -0,0 +1,59 @@
+import json
+import math
+import os
+from typing import Optional
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from ..config import Config
+from ..services.resources import ResourceSampler
+from ..services.status import process_status_cache
+
+
+async def _fetch_comfyui_pid() -> Optional[int]:
+    if Config().dummy_mode:
+        # ダミーモードでは Jupyter Server 自身のプロセスを採取する
+        return os.getpid()
+    payload = await process_status_cache.get()
+    return payload.get("pid")
+
+
+# 最初のリクエストで開始し（COMFYUI_COCKPIT_SAMPLE_ON_START ならサーバー起動時）、サーバー内で1つだけ動く採取ループ
+resource_sampler = ResourceSampler(_fetch_comfyui_pid)
+
+
+class ResourceHandler(APIHandler):
+    """ComfyUI のプロセスツリーの資源使用量（直近の値と間引いた時系列）を返すハンドラー"""
+
+    MAX_POINTS = 1000
+
+    @tornado.web.authenticated
+    def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            window = float(self.get_argument('window', '900'))
+            points = int(self.get_argument('points', '60'))
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "window and points must be numbers"}))
+            return
+
+        # float() は "nan" / "inf" も受け付けるため、有限値かどうかも確認する
+        if not math.isfinite(window) or window <= 0 or points <= 0:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "window and points must be positive finite numbers"}))
+            return
+
+        # 採取はパネルを開くまで始めない（開始済みなら何もしない）
+        resource_sampler.start()
+
+        self.finish(json.dumps({
+            "enabled": resource_sampler.running,
+            "interval": resource_sampler.interval,
+            "pid": resource_sampler.pid,
+            "latest": resource_sampler.buffer.latest(),
+            "window": window,
+            "series": resource_sampler.series(window, min(points, self.MAX_POINTS)),
+        }))
@@ -0,0 +1,52 @@
+import json
+from typing import Any, Dict, Optional
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from ..config import Config
+from ..services.status import state_etag
+from .metrics import RequestMetricsMixin
+from .process import fetch_status_payload
+from .version import get_available_versions, get_current_version
+
+
+class StateHandler(RequestMetricsMixin, APIHandler):
+    """パネルが使うプロセスの状態・現在のバージョン・利用可能なバージョンを1回で返すハンドラー
+
+    応答には内容から計算した ETag を付け、If-None-Match が一致すれば本文なしの 304 を返す
+    （304 の判定は tornado の finish() が compute_etag() を使って行う）。
+    """
+
+    metrics_name = "state"
+
+    def initialize(self, *args, **kwargs):
+        super().initialize(*args, **kwargs)
+        self.cockpit_config = Config()
+        self._state: Optional[Dict[str, Any]] = None
+
+    def compute_etag(self) -> Optional[str]:
+        """uptime の表示だけが変わった場合は同じ値になる ETag"""
+        if self._state is None:
+            return None
+        return state_etag(self._state)
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.set_header('Content-Type', 'application/json')
+        # キャッシュしてよいが、使う前に必ず ETag で再検証させる
+        self.set_header('Cache-Control', 'no-cache')
+
+        try:
+            self._state = {
+                "process": await fetch_status_payload(),
+                "version": {"comfyui_version": await get_current_version(self.cockpit_config)},
+                "available_versions": get_available_versions(self.cockpit_config),
+            }
+        except Exception as e:
+            self.log.error(f"Error in StateHandler.get: {e}", exc_info=True)
+            self.set_status(500)
+            self.finish(json.dumps({"status": "error", "message": str(e)}))
+            return
+
+        self.finish(json.dumps(self._state))
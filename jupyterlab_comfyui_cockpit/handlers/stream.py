@@ -0,0 +1,41 @@
+import json
+from typing import Any, Callable, Tuple
+
+from jupyter_server.base.handlers import APIHandler
+from tornado.iostream import StreamClosedError
+
+from ..services.broadcast import Subscription
+
+
+class EventStreamHandler(APIHandler):
+    """購読したイベントを Server-Sent Events で配信するハンドラーの基底クラス"""
+
+    def initialize(self, *args, **kwargs):
+        super().initialize(*args, **kwargs)
+        self._subscription = None
+
+    async def stream(self, subscription: Subscription, to_event: Callable[[Any], Tuple[str, Any]]) -> None:
+        """購読が終わるかクライアントが切断するまでイベントを送り続ける"""
+        self.set_header('Content-Type', 'text/event-stream')
+        self.set_header('Cache-Control', 'no-cache')
+        # リバースプロキシでのバッファリングを無効化する
+        self.set_header('X-Accel-Buffering', 'no')
+
+        self._subscription = subscription
+        try:
+            while True:
+                item = await subscription.get()
+                if item is None:
+                    break
+                event, data = to_event(item)
+                self.write(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+                await self.flush()
+        except StreamClosedError:
+            pass
+        finally:
+            subscription.close()
+
+    def on_connection_close(self):
+        super().on_connection_close()
+        if self._subscription is not None:
+            self._subscription.close()
@@ -0,0 +1,25 @@
+import json
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from ..services.timings import lifecycle_timings
+
+
+class LifecycleTimingsHandler(APIHandler):
+    """start / restart / バージョン切り替えの段階ごとの所要時間の分布と直近の記録を返すハンドラー"""
+
+    MAX_HISTORY = 200
+
+    @tornado.web.authenticated
+    def get(self):
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            history = int(self.get_argument('history', '20'))
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"status": "error", "message": "history must be an integer"}))
+            return
+
+        self.finish(json.dumps(lifecycle_timings.summary(min(max(history, 0), self.MAX_HISTORY))))
@@ -1,15 +1,60 @@
 import json
-import subprocess
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 import tornado
 from jupyter_server.base.handlers import APIHandler
 
 from ..config import Config
+from ..services.git_refs import VersionMetadata, get_version_metadata
+from ..services.requirements import PipInstaller
+from ..services.staging import StagePreparer, StagedVersionSwitcher, StagingArea
+from ..services.version_jobs import JobConflict, VersionSwitcher, version_job_manager
+from ._dummy import DummyVersionSwitcher, dummy_versions
+from .metrics import RequestMetricsMixin
+from .stream import EventStreamHandler
+
+
+async def get_current_version(config: Config) -> Optional[str]:
+    """ComfyUIのバージョンを取得（ダミーモードでは疑似的に切り替えたバージョン）"""
+    if config.dummy_mode:
+        return dummy_versions.current
+    return await get_version_metadata(Path(config.get("COMFYUI_PATH", "/opt/app/ComfyUI"))).current_version()
+
+
+def get_available_versions(config: Config) -> list[str]:
+    """利用可能なComfyUIバージョンの一覧を取得"""
+    # 最大10個に制限（gitが使えない場合は空のリスト）
+    if config.dummy_mode:
+        return dummy_versions.tags[:10]
+    return get_version_metadata(Path(config.get("COMFYUI_PATH", "/opt/app/ComfyUI"))).available_versions(limit=10)
+
+
+def _submit_job(handler: APIHandler, target_version: str, switcher: Any, message: str) -> Tuple[int, Dict[str, Any]]:
+    """ジョブを登録して 202 のレスポンスを返す（別のジョブが実行中なら 409）"""
+    try:
+        job = version_job_manager.submit(target_version, switcher)
+    except JobConflict as e:
+        return 409, {
+            "success": False,
+            "message": str(e),
+            "version": None,
+            "job_id": e.active.id,
+        }
+
+    handler.log.info(f"Started version {job.kind} job {job.id} for {target_version}")
+    return 202, {
+        "success": True,
+        "message": message,
+        "version": target_version,
+        "job_id": job.id,
+        "job": job.to_dict(),
+    }
 
 
-class VersionHandler(APIHandler):
+class VersionHandler(RequestMetricsMixin, APIHandler):
     """ComfyUIのバージョン情報を取得するハンドラー"""
+
+    metrics_name = "version"
     
     def initialize(self, *args, **kwargs):
         super().initialize(*args, **kwargs)
@@ -21,163 +66,48 @@ class VersionHandler(APIHandler):
         comfyui_path = self.cockpit_config.get("COMFYUI_PATH", "/opt/app/ComfyUI")
         return Path(comfyui_path)
     
-    def _get_comfyui_version(self) -> Optional[str]:
-        """ComfyUIのバージョンを取得"""
-        comfyui_path = self._get_comfyui_path()
-
-        # __version__.py から取得を試みる
-        version_file = comfyui_path / "comfyui_version.py"
-        if version_file.exists():
-            try:
-                with open(version_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    # __version__ = "1.0.0" のような形式を探す
-                    import re
-                    match = re.search(r'__version__\s*=\s*["\']([^"\']+)["\']', content)
-                    if match:
-                        return match.group(1)
-            except Exception as e:
-                self.log.warning(f"Failed to read __version__.py: {e}")
-
-        # git から取得を試みる
-        try:
-            result = subprocess.run(
-                ["git", "-C", str(comfyui_path), "describe", "--tags", "--always"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except Exception as e:
-            self.log.debug(f"Failed to get git version: {e}")
-
-        return None
-
-    def _get_available_versions(self) -> list[str]:
-        """利用可能なComfyUIバージョンの一覧を取得"""
-        comfyui_path = self._get_comfyui_path()
-
-        try:
-            # gitタグ一覧を取得
-            result = subprocess.run(
-                ["git", "-C", str(comfyui_path), "tag", "--sort=-version:refname"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                tags = result.stdout.strip().split('\n')
-                # 空の行を除去し、最大10個に制限
-                return [tag for tag in tags if tag][:10]
-        except Exception as e:
-            self.log.debug(f"Failed to get git tags: {e}")
-
-        # gitが使えない場合は空のリストを返す
-        return []
+    def _get_version_metadata(self) -> VersionMetadata:
+        """git の参照ファイルから読み取るバージョン情報（mtime で無効化されるキャッシュ）"""
+        return get_version_metadata(self._get_comfyui_path())
 
     def _tag_exists(self, tag: str) -> bool:
-        comfyui_path = self._get_comfyui_path()
-        try:
-            result = subprocess.run(
-                ["git", "-C", str(comfyui_path), "tag", "--list", tag],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            if result.returncode != 0:
-                return False
-            return any(line.strip() == tag for line in result.stdout.splitlines())
-        except Exception:
-            return False
-
-    def _switch_version(self, target_version: str) -> Dict[str, Any]:
-        """ComfyUIのバージョンを切り替え（完全自動化）"""
-        comfyui_path = self._get_comfyui_path()
-
-        try:
-            if not target_version or any(ch.isspace() for ch in target_version):
-                return {
-                    "success": False,
-                    "message": "Invalid version",
-                    "version": None,
-                }
-
-            if not self._tag_exists(target_version):
-                return {
-                    "success": False,
-                    "message": f"Unknown version: {target_version}",
-                    "version": None,
-                }
-
-            # ステップ1: git checkout
-            self.log.info(f"Switching to version {target_version}...")
-            result = subprocess.run(
-                ["git", "-C", str(comfyui_path), "checkout", target_version],
-                capture_output=True,
-                text=True,
-                timeout=60  # タイムアウトを延長
-            )
-
-            if result.returncode != 0:
-                return {
-                    "success": False,
-                    "message": f"Failed to checkout version: {result.stderr.strip()}",
-                    "version": None
-                }
-
-            # ステップ2: Python依存関係の更新
-            self.log.info("Updating Python dependencies...")
-            requirements_file = comfyui_path / "requirements.txt"
-            if requirements_file.exists():
-                pip_result = subprocess.run(
-                    ["pip", "install", "-r", str(requirements_file)],
-                    capture_output=True,
-                    text=True,
-                    timeout=300  # 5分タイムアウト
-                )
-                if pip_result.returncode != 0:
-                    self.log.warning(f"Pip install failed: {pip_result.stderr.strip()}")
-
-            # ステップ3: ComfyUIプロセス再起動
-            self.log.info("Restarting ComfyUI process...")
-            restart_result = subprocess.run(
-                ["supervisorctl", "restart", "comfyui"],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            if restart_result.returncode != 0:
-                return {
-                    "success": False,
-                    "message": f"Failed to restart ComfyUI: {restart_result.stderr.strip()}",
-                    "version": target_version
-                }
-
-            return {
-                "success": True,
-                "message": f"Successfully switched to version {target_version} and restarted ComfyUI",
-                "version": target_version
-            }
+        if self.cockpit_config.dummy_mode:
+            return dummy_versions.tag_exists(tag)
+        return self._get_version_metadata().tag_exists(tag)
 
-        except subprocess.TimeoutExpired:
-            return {
+    def _start_switch(self, target_version: str) -> Tuple[int, Dict[str, Any]]:
+        """バージョン切り替えジョブを開始する（完了は待たない）"""
+        if not target_version or any(ch.isspace() for ch in target_version):
+            return 200, {
                 "success": False,
-                "message": f"Version switch timed out for {target_version}",
-                "version": None
+                "message": "Invalid version",
+                "version": None,
             }
-        except Exception as e:
-            self.log.error(f"Error switching version: {e}")
-            return {
+
+        if not self._tag_exists(target_version):
+            return 200, {
                 "success": False,
-                "message": f"Error switching version: {str(e)}",
-                "version": None
+                "message": f"Unknown version: {target_version}",
+                "version": None,
             }
-    
-    
+
+        if self.cockpit_config.dummy_mode:
+            switcher = DummyVersionSwitcher()
+        else:
+            installer = PipInstaller.from_config(self.cockpit_config)
+            staging = StagingArea.from_config(self.cockpit_config)
+            if staging is not None and staging.enabled:
+                # ステージングモード：worktree を用意してからリンクを張り替える
+                switcher = StagedVersionSwitcher(staging, installer)
+            else:
+                if staging is not None:
+                    self.log.warning("COMFYUI_PATH is not a symlink; switching versions in place")
+                switcher = VersionSwitcher(self._get_comfyui_path(), installer)
+
+        return _submit_job(self, target_version, switcher, f"Switching to version {target_version}")
+
     @tornado.web.authenticated
-    def get(self):
+    async def get(self):
         """バージョン情報を取得"""
         self.set_header('Content-Type', 'application/json')
 
@@ -186,28 +116,14 @@ class VersionHandler(APIHandler):
 
         if action == 'list':
             # 利用可能なバージョン一覧を取得
-            if self.cockpit_config.dummy_mode:
-                available_versions = ["1.0.0-dummy", "0.9.0-dummy", "0.8.0-dummy"]
-            else:
-                available_versions = self._get_available_versions()
-
             self.finish(json.dumps({
-                "available_versions": available_versions,
+                "available_versions": get_available_versions(self.cockpit_config),
             }))
             return
 
         # 現在のバージョン情報を取得
-        if self.cockpit_config.dummy_mode:
-            # ダミーモードの場合は固定値を返す
-            self.finish(json.dumps({
-                "comfyui_version": "1.0.0-dummy",
-            }))
-            return
-
-        comfyui_version = self._get_comfyui_version()
-
         response: Dict[str, Optional[str]] = {
-            "comfyui_version": comfyui_version,
+            "comfyui_version": await get_current_version(self.cockpit_config),
         }
 
         self.finish(json.dumps(response))
@@ -246,16 +162,8 @@ class VersionHandler(APIHandler):
                 }))
                 return
 
-            if self.cockpit_config.dummy_mode:
-                # ダミーモードではモックレスポンス
-                result = {
-                    "success": True,
-                    "message": f"Successfully switched to version {target_version} (dummy mode)",
-                    "version": target_version
-                }
-            else:
-                result = self._switch_version(target_version)
-
+            status_code, result = self._start_switch(target_version)
+            self.set_status(status_code)
             self.finish(json.dumps(result))
         except Exception as e:
             self.log.error(f"Error in POST version: {e}")
@@ -265,3 +173,138 @@ class VersionHandler(APIHandler):
                 "message": f"Internal server error: {str(e)}"
             }))
 
+
+class VersionJobHandler(APIHandler):
+    """バージョン切り替えジョブの状態とログを返すハンドラー"""
+
+    @tornado.web.authenticated
+    def get(self, job_id: Optional[str] = None):
+        self.set_header('Content-Type', 'application/json')
+
+        if job_id is None:
+            active = version_job_manager.active
+            self.finish(json.dumps({
+                "active_job_id": active.id if active else None,
+                "jobs": [job.to_dict() for job in version_job_manager.list()],
+            }))
+            return
+
+        job = version_job_manager.get(job_id)
+        if job is None:
+            self.set_status(404)
+            self.finish(json.dumps({"success": False, "message": f"Unknown job: {job_id}"}))
+            return
+
+        self.finish(json.dumps(job.to_dict(include_log=True)))
+
+
+class VersionJobStreamHandler(EventStreamHandler):
+    """バージョン切り替えジョブの進捗を Server-Sent Events で配信するハンドラー"""
+
+    @tornado.web.authenticated
+    async def get(self, job_id: str):
+        job = version_job_manager.get(job_id)
+        if job is None:
+            self.set_status(404)
+            self.set_header('Content-Type', 'application/json')
+            self.finish(json.dumps({"success": False, "message": f"Unknown job: {job_id}"}))
+            return
+
+        await self.stream(job.subscribe(), lambda item: (item["event"], item["data"]))
+
+
+class VersionStagingHandler(APIHandler):
+    """ステージ済みバージョンの一覧取得・事前準備・ロールバックを行うハンドラー"""
+
+    def initialize(self, *args, **kwargs):
+        super().initialize(*args, **kwargs)
+        self.cockpit_config = Config()
+
+    def _get_staging(self) -> Optional[StagingArea]:
+        if self.cockpit_config.dummy_mode:
+            return None
+        staging = StagingArea.from_config(self.cockpit_config)
+        if staging is None or not staging.enabled:
+            return None
+        return staging
+
+    def _error(self, status_code: int, message: str) -> None:
+        self.set_status(status_code)
+        self.finish(json.dumps({"success": False, "message": message}))
+
+    @tornado.web.authenticated
+    def get(self):
+        """ステージングの状態を取得"""
+        self.set_header('Content-Type', 'application/json')
+
+        staging = self._get_staging()
+        if staging is None:
+            self.finish(json.dumps({
+                "enabled": False,
+                "current": None,
+                "previous": None,
+                "staged": [],
+            }))
+            return
+
+        current = staging.current_target()
+        previous = staging.previous_target()
+        self.finish(json.dumps({
+            "enabled": True,
+            "current": staging.version_of(current) if current else None,
+            "previous": staging.version_of(previous) if previous else None,
+            "staged": [staged.to_dict() for staged in staging.staged()],
+        }))
+
+    @tornado.web.authenticated
+    async def post(self):
+        """stage / rollback / remove を実行"""
+        self.set_header('Content-Type', 'application/json')
+
+        try:
+            data = self.get_json_body()
+        except Exception:
+            data = None
+        if not isinstance(data, dict):
+            self._error(400, "Invalid JSON data")
+            return
+
+        staging = self._get_staging()
+        if staging is None:
+            self._error(400, "Staging mode is not enabled (set COMFYUI_COCKPIT_STAGING_DIR and make COMFYUI_PATH a symlink)")
+            return
+
+        action = data.get('action')
+        target_version = data.get('version')
+        installer = PipInstaller.from_config(self.cockpit_config)
+
+        if action == 'rollback':
+            previous = staging.previous_target()
+            if previous is None:
+                self._error(400, "No previous version to roll back to")
+                return
+            previous_version = staging.version_of(previous)
+            switcher = StagedVersionSwitcher(staging, installer, target_path=previous)
+            status_code, result = _submit_job(self, previous_version, switcher, f"Rolling back to version {previous_version}")
+        elif action in ('stage', 'remove'):
+            if not target_version or any(ch.isspace() for ch in target_version):
+                self._error(400, "Version parameter is required")
+                return
+            if action == 'remove':
+                success, message = await staging.remove(target_version)
+                status_code, result = 200, {"success": success, "message": message, "version": target_version}
+            elif not get_version_metadata(staging.comfyui_path).tag_exists(target_version):
+                status_code, result = 200, {
+                    "success": False,
+                    "message": f"Unknown version: {target_version}",
+                    "version": None,
+                }
+            else:
+                switcher = StagePreparer(staging, installer)
+                status_code, result = _submit_job(self, target_version, switcher, f"Staging version {target_version}")
+        else:
+            self._error(400, "Invalid action. Must be 'stage', 'rollback', or 'remove'")
+            return
+
+        self.set_status(status_code)
+        self.finish(json.dumps(result))
@@ -0,0 +1,155 @@
+"""プログラムごとの start / stop / restart の待ち行列"""
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Sequence, Tuple
+
+from .metrics import metrics
+from .supervisor import perform_actions
+
+ActionResult = Tuple[str, bool, str]  # (名前, 成功したか, メッセージ)
+
+action_requests = metrics.counter(
+    "comfyui_cockpit_process_actions_total",
+    "Process actions requested, by whether they ran or joined an in-flight or queued action.",
+    ("action", "result"),
+)
+
+
+def _satisfies(queued: str, requested: str) -> bool:
+    """待ち行列の末尾の操作が、要求された操作を兼ねられるか
+
+    restart の後は起動しているため、start は実行中・待機中の restart で満たされる。
+    """
+    return queued == requested or (requested == "start" and queued == "restart")
+
+
+class _Operation:
+    """待ち行列に入った1回の操作（合流した全呼び出し元が同じ結果を受け取る）"""
+
+    def __init__(self, name: str, action: str, run: Callable[["_Operation"], Awaitable[ActionResult]]):
+        self.name = name
+        self.action = action
+        self.run = run
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.callers = 1
+        self.supervisor: Any = None
+
+
+class ActionReservation:
+    """バージョン切り替えなどが後で行う操作のために待ち行列に確保した枠
+
+    枠にはそれまでに要求された操作の後に並び、perform() が呼ばれるまで後ろの操作を待たせる。
+    その間に要求された同じ操作は枠に合流し、切り替えの最後の再起動の結果を受け取る。
+    """
+
+    def __init__(self, names: Sequence[str], action: str):
+        self.names = list(names)
+        self.action = action
+        self.operations: List[_Operation] = []
+        self._go = asyncio.Event()
+        self._perform = True
+        self._supervisor: Any = None
+
+    async def perform(self, supervisor: Any) -> List[ActionResult]:
+        """確保した枠で操作を実行し、結果を返す"""
+        self._supervisor = supervisor
+        self._go.set()
+        return list(await asyncio.gather(*(operation.future for operation in self.operations)))
+
+    def release(self) -> None:
+        """枠を解放する（perform() 済みなら何もしない）
+
+        切り替えが途中で失敗しても、枠に合流した呼び出し元がいればその操作は実行する。
+        """
+        if not self._go.is_set():
+            self._perform = False
+            self._go.set()
+
+    async def _run(self, operation: _Operation) -> ActionResult:
+        await self._go.wait()
+        supervisor = self._supervisor or operation.supervisor
+        if not self._perform and (operation.callers == 1 or supervisor is None):
+            return operation.name, True, f"{operation.name}: {self.action} skipped"
+        return (await perform_actions(supervisor, self.action, [operation.name]))[0]
+
+
+class ProcessActionScheduler:
+    """プログラムごとに操作を1つずつ実行する
+
+    - 同じ操作が実行中・待機中（待ち行列の末尾）なら新たに実行せず、その結果を共有する
+    - 異なる操作は要求された順に実行する（restart の最中の stop は restart の完了後に行う）
+    - プログラムどうしは並行して操作する
+    同時に何度 restart が押されても、ComfyUI の再起動（とモデルの読み込み）は1回で済む。
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, Deque[_Operation]] = {}
+
+    def pending(self, name: str) -> List[str]:
+        """実行中・待機中の操作（先頭が実行中）"""
+        return [operation.action for operation in self._queues.get(name, ())]
+
+    def _submit(
+        self,
+        name: str,
+        action: str,
+        run: Callable[[_Operation], Awaitable[ActionResult]],
+        supervisor: Any,
+    ) -> _Operation:
+        queue = self._queues.get(name)
+        if queue and _satisfies(queue[-1].action, action):
+            operation = queue[-1]
+            operation.callers += 1
+            operation.supervisor = operation.supervisor or supervisor
+            action_requests.inc(action, "coalesced")
+            return operation
+
+        operation = _Operation(name, action, run)
+        operation.supervisor = supervisor
+        self._enqueue(operation)
+        action_requests.inc(action, "queued")
+        return operation
+
+    def _enqueue(self, operation: _Operation) -> None:
+        queue = self._queues.get(operation.name)
+        if queue is None:
+            queue = self._queues[operation.name] = deque()
+            asyncio.ensure_future(self._drain(operation.name, queue))
+        queue.append(operation)
+
+    async def _drain(self, name: str, queue: Deque[_Operation]) -> None:
+        try:
+            while queue:
+                operation = queue[0]
+                try:
+                    result = await operation.run(operation)
+                except Exception as e:
+                    result = name, False, f"{name}: ERROR ({e})"
+                operation.future.set_result(result)
+                queue.popleft()
+        finally:
+            if self._queues.get(name) is queue:
+                del self._queues[name]
+
+    async def perform(self, supervisor: Any, action: str, names: Sequence[str]) -> List[ActionResult]:
+        """複数のプログラムに操作を要求し、[(名前, 成功したか, メッセージ)] を返す"""
+
+        async def run(operation: _Operation) -> ActionResult:
+            return (await perform_actions(operation.supervisor, operation.action, [operation.name]))[0]
+
+        operations = [self._submit(name, action, run, supervisor) for name in names]
+        # 呼び出し元の切断などでキャンセルされても、共有している操作は継続させる
+        return list(await asyncio.shield(asyncio.gather(*(operation.future for operation in operations))))
+
+    def reserve(self, names: Sequence[str], action: str = "restart") -> ActionReservation:
+        """後で行う操作のための枠を各プログラムの待ち行列の末尾に確保する"""
+        reservation = ActionReservation(names, action)
+        for name in names:
+            operation = _Operation(name, action, reservation._run)
+            self._enqueue(operation)
+            reservation.operations.append(operation)
+        return reservation
+
+
+# サーバー内で共有する操作の待ち行列（ProcessHandler とバージョン切り替えが使う）
+process_actions = ProcessActionScheduler()
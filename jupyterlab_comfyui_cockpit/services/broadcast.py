@@ -0,0 +1,71 @@
+"""複数クライアントへのイベント配信"""
+import asyncio
+from typing import Any, Callable, Optional, Set
+
+
+class Subscription:
+    """購読者ごとの受信キュー
+
+    キューが溢れた場合は最も古いイベントを捨てるため、
+    読み出しが遅いクライアントが配信元を詰まらせることはない。
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", maxsize: int):
+        self._broadcaster = broadcaster
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def put(self, item: Any) -> None:
+        if self.closed:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(item)
+
+    async def get(self) -> Optional[Any]:
+        """次のイベントを待つ（購読終了後は None を返す）"""
+        if self.closed and self._queue.empty():
+            return None
+        return await self._queue.get()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._broadcaster._remove(self)
+        self.closed = True
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class Broadcaster:
+    """1つの配信元から全購読者へイベントを配信する"""
+
+    def __init__(self, maxsize: int = 16, on_idle: Optional[Callable[[], None]] = None):
+        self._maxsize = maxsize
+        self._on_idle = on_idle
+        self._subscriptions: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self, self._maxsize)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def publish(self, item: Any) -> None:
+        for subscription in list(self._subscriptions):
+            subscription.put(item)
+
+    def close_all(self) -> None:
+        """全購読を終了する"""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    def _remove(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        if not self._subscriptions and self._on_idle is not None:
+            self._on_idle()
+
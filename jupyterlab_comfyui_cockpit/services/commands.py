@@ -0,0 +1,122 @@
+"""イベントループをブロックせずに外部コマンドを実行するヘルパー"""
+import asyncio
+import os
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .metrics import metrics
+
+# 1行の最大長（pip などの長い出力行でも読み取れるようにする）
+_LINE_LIMIT = 1024 * 1024
+
+_commands_total = metrics.counter(
+    "comfyui_cockpit_subprocess_total",
+    "External commands started, by command.",
+    ("command",),
+)
+_command_failures = metrics.counter(
+    "comfyui_cockpit_subprocess_failures_total",
+    "External commands that exited non-zero or could not be started, by command.",
+    ("command",),
+)
+_command_timeouts = metrics.counter(
+    "comfyui_cockpit_subprocess_timeouts_total",
+    "External commands killed after timing out, by command.",
+    ("command",),
+)
+_command_duration = metrics.histogram(
+    "comfyui_cockpit_subprocess_duration_seconds",
+    "Wall-clock duration of external commands, by command.",
+    ("command",),
+)
+
+
+def command_label(cmd: Sequence[str]) -> str:
+    """メトリクスのラベルに使うコマンド名（python -m pip は pip とする）"""
+    name = os.path.basename(cmd[0]) if cmd else ""
+    if name.startswith("python") and len(cmd) > 2 and cmd[1] == "-m":
+        return cmd[2]
+    return name
+
+
+@dataclass
+class CommandResult:
+    """外部コマンドの実行結果"""
+
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+async def _communicate_lines(
+    proc: asyncio.subprocess.Process,
+    on_line: Callable[[str], None],
+) -> Tuple[bytes, bytes]:
+    async def pump(stream: asyncio.StreamReader, chunks: List[bytes]) -> None:
+        async for line in stream:
+            chunks.append(line)
+            on_line(line.decode("utf-8", errors="replace").rstrip("\r\n"))
+
+    stdout: List[bytes] = []
+    stderr: List[bytes] = []
+    await asyncio.gather(pump(proc.stdout, stdout), pump(proc.stderr, stderr))
+    await proc.wait()
+    return b"".join(stdout), b"".join(stderr)
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    """プロセスを kill して終了を待つ（ゾンビを残さない）"""
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+async def run_command(
+    cmd: Sequence[str],
+    timeout: Optional[float] = None,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> CommandResult:
+    """コマンドを非同期サブプロセスとして実行する
+
+    on_line を指定すると、出力を1行ずつ受け取れる（進捗表示用）。
+    タイムアウトした場合はプロセスを kill し、subprocess.TimeoutExpired を送出する。
+    呼び出し元がキャンセルされた場合もプロセスを kill してから CancelledError を伝える。
+    """
+    label = command_label(cmd)
+    _commands_total.inc(label)
+    started = time.monotonic()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_LINE_LIMIT,
+        )
+    except OSError:
+        _command_failures.inc(label)
+        raise
+    try:
+        if on_line is None:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        else:
+            stdout, stderr = await asyncio.wait_for(_communicate_lines(proc, on_line), timeout)
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        _command_timeouts.inc(label)
+        raise subprocess.TimeoutExpired(list(cmd), timeout)
+    finally:
+        # キャンセルや on_line の例外で抜けた場合も子プロセスを残さない
+        if proc.returncode is None:
+            await _kill(proc)
+        _command_duration.observe(time.monotonic() - started, label)
+    if proc.returncode != 0:
+        _command_failures.inc(label)
+    return CommandResult(
+        returncode=proc.returncode,
+        stdout=stdout.decode("utf-8", errors="replace"),
+        stderr=stderr.decode("utf-8", errors="replace"),
+    )
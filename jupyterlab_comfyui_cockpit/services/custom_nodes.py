@@ -0,0 +1,247 @@
+"""ComfyUI の custom_nodes 配下のノードの一覧（git の状態・依存関係・サイズ）"""
+import asyncio
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Config
+from .commands import run_command
+from .git_refs import GitRepository
+from .metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# ノードの依存関係を示すファイル（ComfyUI-Manager がインストール時に参照するもの）
+DEPENDENCY_FILES = ("requirements.txt", "pyproject.toml", "install.py")
+
+# ComfyUI の起動ログにある "Import times for custom nodes:" の各行
+_IMPORT_TIME_RE = re.compile(r"^\s*([\d.]+) seconds( \(IMPORT FAILED\))?: (.+?)\s*$")
+
+
+def parse_import_times(text: str) -> Dict[str, Tuple[float, bool]]:
+    """起動ログからノードごとの読み込み時間と失敗したかを取り出す（同じノードは後の行を優先する）"""
+    times: Dict[str, Tuple[float, bool]] = {}
+    for line in text.splitlines():
+        match = _IMPORT_TIME_RE.match(line)
+        if match:
+            name = os.path.basename(match.group(3).rstrip("/\\"))
+            times[name] = (float(match.group(1)), bool(match.group(2)))
+    return times
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def disk_usage(path: Path) -> int:
+    """ディレクトリ配下のディスク使用量（バイト、シンボリックリンクは辿らない）"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(Path(entry.path))
+                    except OSError:
+                        continue
+                    total += getattr(stat, "st_blocks", 0) * 512 or stat.st_size
+        except OSError:
+            continue
+    return total
+
+
+@dataclass
+class CustomNode:
+    """custom_nodes 配下の1つのノード"""
+
+    name: str
+    enabled: bool
+    kind: str  # directory / file
+    size: int = 0
+    dependencies: List[str] = field(default_factory=list)
+    git: bool = False
+    commit: Optional[str] = None
+    branch: Optional[str] = None
+    remote: Optional[str] = None
+    dirty: Optional[bool] = None  # git status が使えない場合は None
+    collected_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class CustomNodeInventory:
+    """custom_nodes のノードを並行して調べ、ノードごとにキャッシュする
+
+    ノードのディレクトリと .git の HEAD・index・参照・config、依存関係のファイルの mtime が
+    変わらない限り前回の結果を返すため、ウォームな状態ではノード数 × 数回の stat で済む。
+    参照やリモートはファイルから直接読み、git を起動するのは変更の有無（git status）を調べる時だけ。
+    作業ツリーの編集は mtime に現れないことがあるため、max_age 秒を過ぎた結果も調べ直す。
+    """
+
+    DEFAULT_WORKERS = 8
+    DEFAULT_MAX_AGE = 300.0
+    STATUS_TIMEOUT = 10
+
+    def __init__(self, root: Path, workers: int = DEFAULT_WORKERS, max_age: float = DEFAULT_MAX_AGE):
+        self.root = Path(root)
+        self.workers = max(1, workers)
+        self.max_age = max_age
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="custom-nodes")
+        self._cache: Dict[str, Tuple[Tuple, CustomNode]] = {}
+        self._inflight: Optional[asyncio.Future] = None
+        self._inflight_force = False
+
+    @classmethod
+    def from_config(cls, config: Config) -> "CustomNodeInventory":
+        comfyui_path = Path(config.get("COMFYUI_PATH", "/opt/app/ComfyUI"))
+        return cls(
+            comfyui_path / "custom_nodes",
+            workers=config.get_int("COMFYUI_COCKPIT_CUSTOM_NODES_WORKERS", cls.DEFAULT_WORKERS),
+            max_age=config.get_float("COMFYUI_COCKPIT_CUSTOM_NODES_MAX_AGE", cls.DEFAULT_MAX_AGE),
+        )
+
+    def _entries(self) -> List[Tuple[str, bool]]:
+        """(ノードのパス（root からの相対）, ディレクトリか) の一覧"""
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name == "__pycache__" or (entry.name.startswith(".") and entry.name != ".disabled"):
+                        continue
+                    if entry.name == ".disabled" and entry.is_dir():
+                        # ComfyUI-Manager が無効にしたノードを移す場所
+                        with os.scandir(entry.path) as disabled:
+                            entries += [(f".disabled/{d.name}", d.is_dir()) for d in disabled if not d.name.startswith(".")]
+                    elif entry.is_dir():
+                        entries.append((entry.name, True))
+                    elif entry.name.endswith((".py", ".py.disabled")):
+                        entries.append((entry.name, False))
+        except FileNotFoundError:
+            return []
+        return entries
+
+    def _signature(self, path: Path, repo: Optional[GitRepository]) -> Tuple:
+        paths = [path] + [path / name for name in DEPENDENCY_FILES]
+        if repo is not None and repo.exists:
+            paths += [repo.git_dir / "HEAD", repo.git_dir / "index", repo.common_dir / "packed-refs", repo.common_dir / "config"]
+            head_ref = repo.head_ref()
+            if head_ref and head_ref.startswith("refs/"):
+                paths.append(repo.common_dir / head_ref)
+        return tuple(_mtime(p) for p in paths)
+
+    def _inspect(self, relative: str, is_dir: bool, force: bool) -> Tuple[CustomNode, bool, Tuple]:
+        """ファイルから読める情報を集める（スレッドプールで実行する）
+
+        (ノード, git status が必要か, シグネチャ) を返す。
+        """
+        path = self.root / relative
+        name = os.path.basename(relative)
+        enabled = not relative.startswith(".disabled/") and not name.endswith(".disabled")
+        repo = GitRepository(path) if is_dir else None
+        signature = self._signature(path, repo)
+
+        cached = self._cache.get(relative)
+        if (
+            not force
+            and cached is not None
+            and cached[0] == signature
+            and time.time() - cached[1].collected_at < self.max_age
+        ):
+            cache_requests.inc("custom_nodes", "hit")
+            return cached[1], False, signature
+        cache_requests.inc("custom_nodes", "miss")
+
+        node = CustomNode(name=name, enabled=enabled, kind="directory" if is_dir else "file", collected_at=time.time())
+        if not is_dir:
+            try:
+                node.size = os.stat(path).st_size
+            except OSError:
+                pass
+            return node, False, signature
+
+        node.size = disk_usage(path)
+        node.dependencies = [file for file in DEPENDENCY_FILES if (path / file).is_file()]
+        if repo.exists:
+            node.git = True
+            node.commit = repo.head()
+            node.branch = repo.branch()
+            node.remote = repo.remote_url()
+        return node, node.git, signature
+
+    async def _git_dirty(self, path: Path, semaphore: asyncio.Semaphore) -> Optional[bool]:
+        async with semaphore:
+            try:
+                # --no-optional-locks: index を書き換えない（書き換えるとシグネチャが変わってしまう）
+                result = await run_command(
+                    ["git", "--no-optional-locks", "-C", str(path), "status", "--porcelain", "--untracked-files=no"],
+                    timeout=self.STATUS_TIMEOUT,
+                )
+            except Exception as e:
+                logger.debug(f"Failed to get git status of {path}: {e}")
+                return None
+        if result.returncode != 0:
+            return None
+        return bool(result.stdout.strip())
+
+    async def collect(self, force: bool = False) -> List[CustomNode]:
+        """全ノードの情報を返す（収集中に呼ばれた場合は実行中の収集を待つ）
+
+        force の場合、実行中の収集が force でなければキャッシュを使っているため、
+        その完了を待ってからキャッシュを使わずにもう一度収集する。
+        """
+        current = self._inflight
+        if current is None or (force and not self._inflight_force):
+            self._inflight = asyncio.ensure_future(self._collect(force, after=current))
+            self._inflight_force = force
+        return await asyncio.shield(self._inflight)
+
+    async def _collect(self, force: bool, after: Optional[asyncio.Future] = None) -> List[CustomNode]:
+        inflight = self._inflight
+        try:
+            if after is not None:
+                # 同時に git status を実行しないよう、前の収集の完了（失敗も含む）を待つ
+                await asyncio.wait([after])
+            loop = asyncio.get_running_loop()
+            entries = await loop.run_in_executor(self._pool, self._entries)
+            semaphore = asyncio.Semaphore(self.workers)
+
+            async def collect_one(relative: str, is_dir: bool) -> CustomNode:
+                node, needs_status, signature = await loop.run_in_executor(
+                    self._pool, self._inspect, relative, is_dir, force
+                )
+                if needs_status:
+                    node.dirty = await self._git_dirty(self.root / relative, semaphore)
+                self._cache[relative] = (signature, node)
+                return node
+
+            nodes = await asyncio.gather(*(collect_one(relative, is_dir) for relative, is_dir in entries))
+            # 削除されたノードのキャッシュは捨てる
+            for relative in set(self._cache) - {relative for relative, _ in entries}:
+                del self._cache[relative]
+            return sorted(nodes, key=lambda node: (not node.enabled, node.name.lower()))
+        finally:
+            if self._inflight is inflight:
+                self._inflight = None
+
+
+_inventory: Optional[CustomNodeInventory] = None
+
+
+def get_custom_node_inventory() -> CustomNodeInventory:
+    """共有の CustomNodeInventory を返す（初回呼び出し時に作成する）"""
+    global _inventory
+    if _inventory is None:
+        _inventory = CustomNodeInventory.from_config(Config())
+    return _inventory
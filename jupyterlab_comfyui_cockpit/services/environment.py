@@ -0,0 +1,199 @@
+"""ComfyUI の Python 環境にインストールされたパッケージの一覧
+
+pip freeze / pip check のようにサブプロセスを起動せず、site-packages の *.dist-info（と *.egg-info）の
+メタデータを直接読む。site-packages ディレクトリの mtime が変わらない限り、読み直さずにメモリから返す。
+"""
+import asyncio
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..config import Config
+from .metrics import cache_requests
+from .requirements import RequirementSet
+
+METADATA_SUFFIXES = (".dist-info", ".egg-info")
+
+# 要件と環境の比較結果
+REQUIREMENT_STATUSES = ("ok", "mismatch", "missing", "skipped", "unknown")
+
+
+def canonical_name(name: str) -> str:
+    """PEP 503 の正規化したパッケージ名（packaging.utils.canonicalize_name と同じ結果）"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def read_metadata_headers(path: Path) -> Optional[Tuple[str, str]]:
+    """dist-info / egg-info の (Name, Version) を読む
+
+    METADATA は本文（README）が長いことがあるため、最初の空行までのヘッダーだけを読む。
+    """
+    metadata = path
+    if path.is_dir():
+        metadata = path / ("METADATA" if path.name.endswith(".dist-info") else "PKG-INFO")
+    name = version = None
+    try:
+        with open(metadata, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip():
+                    break
+                if line.startswith("Name:"):
+                    name = line[5:].strip()
+                elif line.startswith("Version:"):
+                    version = line[8:].strip()
+                if name and version:
+                    break
+    except OSError:
+        return None
+    if not name or not version:
+        return None
+    return name, version
+
+
+@dataclass
+class InstalledPackage:
+    """インストールされた1つのパッケージ"""
+
+    name: str
+    version: str
+    location: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "version": self.version, "location": self.location}
+
+
+def _default_site_dirs() -> List[Path]:
+    """Jupyter Server と同じ Python の site-packages（import の優先順）"""
+    return [Path(entry) for entry in sys.path if os.path.basename(entry) in ("site-packages", "dist-packages")]
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class EnvironmentInventory:
+    """site-packages のパッケージ一覧を、ディレクトリの mtime で無効化しながらキャッシュする
+
+    pip install / uninstall は dist-info ディレクトリを作成・削除するため、site-packages の mtime が変わる。
+    同じパッケージが複数のディレクトリにある場合は、import と同じく先のディレクトリを優先する。
+    """
+
+    def __init__(self, site_dirs: Sequence[Path]):
+        self.site_dirs = [Path(path) for path in site_dirs]
+        self._signature: Optional[Tuple] = None
+        self._packages: Dict[str, InstalledPackage] = {}
+        self._inflight: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "EnvironmentInventory":
+        value = config.get("COMFYUI_COCKPIT_SITE_PACKAGES", "")
+        site_dirs = [Path(entry) for entry in value.split(os.pathsep) if entry.strip()]
+        return cls(site_dirs or _default_site_dirs())
+
+    def signature(self) -> Tuple:
+        return tuple(_mtime(path) for path in self.site_dirs)
+
+    def scan(self) -> Dict[str, InstalledPackage]:
+        """全 site-packages のメタデータを読む（スレッドプールで実行する）"""
+        packages: Dict[str, InstalledPackage] = {}
+        for site_dir in self.site_dirs:
+            try:
+                with os.scandir(site_dir) as it:
+                    entries = sorted(entry.name for entry in it if entry.name.endswith(METADATA_SUFFIXES))
+            except OSError:
+                continue
+            for entry in entries:
+                headers = read_metadata_headers(site_dir / entry)
+                if headers is None:
+                    continue
+                name, version = headers
+                packages.setdefault(canonical_name(name), InstalledPackage(name, version, str(site_dir)))
+        return packages
+
+    async def get(self) -> Dict[str, InstalledPackage]:
+        """{正規化したパッケージ名: パッケージ}（site-packages が変わっていなければキャッシュを返す）"""
+        signature = self.signature()
+        if self._signature == signature:
+            cache_requests.inc("environment", "hit")
+            return self._packages
+
+        if self._inflight is None:
+            cache_requests.inc("environment", "miss")
+            self._inflight = asyncio.ensure_future(self._refresh(signature))
+        else:
+            cache_requests.inc("environment", "shared")
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self, signature: Tuple) -> Dict[str, InstalledPackage]:
+        inflight = self._inflight
+        try:
+            packages = await asyncio.get_running_loop().run_in_executor(None, self.scan)
+            # 読んでいる間に変わった場合は、次の呼び出しで読み直す
+            if self.signature() == signature:
+                self._signature = signature
+            self._packages = packages
+            return packages
+        finally:
+            if self._inflight is inflight:
+                self._inflight = None
+
+
+def check_requirements(packages: Dict[str, InstalledPackage], requirements: RequirementSet) -> List[Dict[str, Any]]:
+    """要件ごとにインストール済みのバージョンが満たしているかを調べる
+
+    status は ok / mismatch（バージョンが合わない）/ missing（未インストール）/
+    skipped（環境マーカーにより不要）/ unknown（URL 指定など比較できない）のいずれか。
+    環境マーカーは Jupyter Server の Python で評価する。
+    """
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.version import InvalidVersion
+
+    results = []
+    for line in requirements.requirements:
+        try:
+            requirement = Requirement(line)
+        except InvalidRequirement:
+            results.append({"requirement": line, "name": line, "installed": None, "status": "unknown"})
+            continue
+
+        package = packages.get(canonical_name(requirement.name))
+        installed = package.version if package else None
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            status = "skipped"
+        elif package is None:
+            status = "missing"
+        elif requirement.url:
+            status = "unknown"
+        else:
+            try:
+                satisfied = requirement.specifier.contains(installed, prereleases=True)
+            except InvalidVersion:
+                satisfied = None
+            status = "unknown" if satisfied is None else "ok" if satisfied else "mismatch"
+        results.append({"requirement": line, "name": requirement.name, "installed": installed, "status": status})
+    return results
+
+
+def summarize_checks(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """{status: 件数}"""
+    summary = {status: 0 for status in REQUIREMENT_STATUSES}
+    for result in results:
+        summary[result["status"]] += 1
+    return summary
+
+
+_inventory: Optional[EnvironmentInventory] = None
+
+
+def get_environment_inventory() -> EnvironmentInventory:
+    """共有の EnvironmentInventory を返す（初回呼び出し時に作成する）"""
+    global _inventory
+    if _inventory is None:
+        _inventory = EnvironmentInventory.from_config(Config())
+    return _inventory
@@ -0,0 +1,307 @@
+"""supervisord の eventlistener プロトコルと、イベントから組み立てるプロセス状態"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import stat
+import time
+from collections import deque
+from typing import Any, BinaryIO, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..config import Config
+from .supervisor import ProcessInfo
+
+logger = logging.getLogger(__name__)
+
+# ソケットのファイル名（COMFYUI_COCKPIT_EVENT_SOCKET を省略した場合はキャッシュディレクトリに置く）
+EVENT_SOCKET_NAME = "events.sock"
+
+
+def event_socket_path(config: Config) -> str:
+    """eventlistener と cockpit が使うソケットのパス
+
+    既定では利用者ごとのキャッシュディレクトリに置き、他の利用者が偽のイベントを送れないようにする。
+    """
+    return config.get("COMFYUI_COCKPIT_EVENT_SOCKET") or str(config.cache_dir / EVENT_SOCKET_NAME)
+
+
+def parse_tokens(line: str) -> Dict[str, str]:
+    """"key:value key:value" 形式のトークン列を辞書にする"""
+    return dict(token.split(":", 1) for token in line.split() if ":" in token)
+
+
+class EventListenerProtocol:
+    """supervisord の eventlistener プロトコル（stdin/stdout）の実装
+
+    READY を送ってイベントを待ち、処理後に RESULT で結果を返す。
+    """
+
+    def __init__(self, stdin: BinaryIO, stdout: BinaryIO):
+        self._stdin = stdin
+        self._stdout = stdout
+
+    def wait(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """次のイベントを待ち、(ヘッダー, ペイロード) を返す（EOF で EOFError）"""
+        self._write(b"READY\n")
+        line = self._stdin.readline()
+        if not line:
+            raise EOFError("supervisord closed the event stream")
+        headers = parse_tokens(line.decode("utf-8"))
+        body = self._stdin.read(int(headers.get("len", 0))).decode("utf-8")
+        # PROCESS_STATE_* のペイロードは1行のトークン列（他のイベントは2行目以降にデータが続く）
+        payload = parse_tokens(body.partition("\n")[0])
+        return headers, payload
+
+    def ok(self) -> None:
+        self._write(b"RESULT 2\nOK")
+
+    def fail(self) -> None:
+        self._write(b"RESULT 4\nFAIL")
+
+    def _write(self, data: bytes) -> None:
+        self._stdout.write(data)
+        self._stdout.flush()
+
+
+class EventForwarder:
+    """受け取ったイベントを unix ソケット経由で Jupyter サーバーへ送る
+
+    サーバーが起動していない場合はイベントを捨てる
+    （supervisord 側にイベントを溜め込ませないため）。
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 2.0):
+        self._socket_path = socket_path
+        self._timeout = timeout
+        self._sock: Optional[socket.socket] = None
+
+    def send(self, event: Dict[str, Any]) -> bool:
+        data = (json.dumps(event) + "\n").encode("utf-8")
+        for _ in range(2):
+            try:
+                if self._sock is None:
+                    self._sock = self._connect()
+                self._sock.sendall(data)
+                return True
+            except OSError:
+                self.close()
+        return False
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+def build_event(headers: Dict[str, str], payload: Dict[str, str], at: Optional[float] = None) -> Dict[str, Any]:
+    """eventlistener のヘッダーとペイロードから転送用のイベントを作る"""
+    event: Dict[str, Any] = {
+        "eventname": headers.get("eventname", ""),
+        "serial": headers.get("serial"),
+        "processname": payload.get("processname"),
+        "groupname": payload.get("groupname"),
+        "from_state": payload.get("from_state"),
+        "at": time.time() if at is None else at,
+    }
+    for key in ("pid", "tries", "expected"):
+        if key in payload:
+            event[key] = int(payload[key])
+    return event
+
+
+def format_uptime(seconds: float) -> str:
+    """経過秒数を supervisorctl と同じ H:MM:SS 形式にする"""
+    elapsed = max(0, int(seconds))
+    hours, remainder = divmod(elapsed, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+class ProcessEventStore:
+    """PROCESS_STATE_* イベントから組み立てたプロセス状態
+
+    eventlistener が接続している間はこの状態を正とし、
+    状態の問い合わせにサブプロセスを使わずメモリから答える。
+    遷移はタイムスタンプ付きで保持するので、クラッシュループも追跡できる。
+    """
+
+    HISTORY = 50
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._history: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._connections = 0
+        self._listeners: List[Callable[[str], None]] = []
+
+    @property
+    def authoritative(self) -> bool:
+        """eventlistener が接続中で、イベントの状態を信頼できるか"""
+        return self._connections > 0
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """状態が変わった時に呼ばれるコールバックを登録する"""
+        self._listeners.append(callback)
+
+    def connection_opened(self) -> None:
+        self._connections += 1
+
+    def connection_closed(self) -> None:
+        self._connections = max(0, self._connections - 1)
+        if not self._connections:
+            # 接続が切れている間のイベントは失われるため、再接続後は状態を取り直す
+            self._states.clear()
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        """イベントを反映する（PROCESS_STATE_* 以外は無視して False を返す）"""
+        eventname = event.get("eventname") or ""
+        name = event.get("processname")
+        if not eventname.startswith("PROCESS_STATE_") or not name:
+            return False
+        group = event.get("groupname")
+        if group and group != name:
+            # supervisorctl と同じく、グループ内のプロセスは group:name で扱う
+            name = f"{group}:{name}"
+
+        statename = eventname[len("PROCESS_STATE_"):]
+        at = event.get("at") or self._clock()
+        previous = self._states.get(name, {})
+        self._states[name] = {
+            "statename": statename,
+            "pid": event.get("pid") if statename in ("RUNNING", "STOPPING") else None,
+            "since": at,
+        }
+        transition = {
+            "from": event.get("from_state") or previous.get("statename"),
+            "to": statename,
+            "at": at,
+        }
+        for key in ("pid", "tries", "expected"):
+            if key in event:
+                transition[key] = event[key]
+        self._history.setdefault(name, deque(maxlen=self.HISTORY)).append(transition)
+
+        for callback in list(self._listeners):
+            try:
+                callback(name)
+            except Exception:
+                logger.exception("Process event listener callback failed")
+        return True
+
+    def seed(self, name: str, payload: Dict[str, Any]) -> None:
+        """イベント未受信のプログラムについて、問い合わせ結果を初期状態として取り込む"""
+        if not self.authoritative or name in self._states or not payload.get("state"):
+            return
+        self._states[name] = {
+            "statename": payload["state"],
+            "pid": payload.get("pid"),
+            "since": payload.get("start") or self._clock(),
+        }
+
+    def transitions(self, name: str) -> List[Dict[str, Any]]:
+        return list(self._history.get(name, ()))
+
+    def payload(self, name: str) -> Optional[Dict[str, Any]]:
+        """状態を ProcessHandler の応答形式で返す（正とできる状態がなければ None）"""
+        if not self.authoritative:
+            return None
+        state = self._states.get(name)
+        if state is None:
+            return None
+
+        statename = state["statename"]
+        description = ""
+        if statename == "RUNNING":
+            description = f"pid {state['pid']}, uptime {format_uptime(self._clock() - state['since'])}"
+        elif statename in ("BACKOFF", "FATAL"):
+            description = "Exited too quickly (process log may have details)"
+        info = ProcessInfo(
+            name=name,
+            statename=statename,
+            description=description,
+            pid=state["pid"],
+            start=state["since"] if statename == "RUNNING" else None,
+        )
+        payload = info.to_payload()
+        payload["since"] = state["since"]
+        payload["transitions"] = self.transitions(name)[-10:]
+        return payload
+
+
+class EventSocketServer:
+    """eventlistener からのイベントを unix ソケットで受け取るサーバー"""
+
+    def __init__(self, store: ProcessEventStore, socket_path: str):
+        self.store = store
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """ソケットを作成して待ち受ける（ソケットは作成した利用者だけが読み書きできる）
+
+        前回のサーバーが残したソケットは削除するが、ソケット以外のファイルや
+        他の利用者のソケットは削除せずに PermissionError を送出する。
+        """
+        try:
+            info = os.lstat(self.socket_path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(self.socket_path) or ".", mode=0o700, exist_ok=True)
+        else:
+            if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+                raise PermissionError(f"Refusing to replace {self.socket_path}: not a socket owned by the current user")
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.store.connection_opened()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self.store.apply(json.loads(line))
+                except ValueError:
+                    logger.warning("Ignoring malformed process event: %r", line[:200])
+        finally:
+            self.store.connection_closed()
+            writer.close()
+
+
+process_event_store = ProcessEventStore()
+
+
+async def start_event_server(config: Config) -> Optional[EventSocketServer]:
+    """COMFYUI_COCKPIT_EVENTS が有効なら eventlistener 用のソケットで待ち受ける"""
+    if not config.get_bool("COMFYUI_COCKPIT_EVENTS"):
+        return None
+    socket_path = event_socket_path(config)
+    server = EventSocketServer(process_event_store, socket_path)
+    try:
+        await server.start()
+    except PermissionError as e:
+        logger.error("Not listening for supervisord process events: %s", e)
+        return None
+    logger.info("Listening for supervisord process events on %s", socket_path)
+    return server
@@ -0,0 +1,226 @@
+"""ComfyUI の output ディレクトリの索引とサムネイルのキャッシュ"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from ..config import Config
+from .metrics import cache_requests
+from .models import ModelIndex
+
+# Pillow がなければサムネイルは作らず、元のファイルを使ってもらう
+# （拡張機能の読み込みを遅くしないよう、import はサムネイルを作る時まで遅らせる）
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"})
+VIDEO_EXTENSIONS = frozenset({".mp4", ".webm", ".mov", ".mkv"})
+AUDIO_EXTENSIONS = frozenset({".flac", ".wav", ".mp3", ".ogg"})
+
+
+def media_kind(name: str) -> str:
+    """image / video / audio"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    if extension in AUDIO_EXTENSIONS:
+        return "audio"
+    return "image"
+
+
+class OutputIndex(ModelIndex):
+    """output ディレクトリの生成物の索引（models と同じ仕組みで、新しい順の一覧に mtime の索引を使う）"""
+
+    NAME = "output"
+    EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS | AUDIO_EXTENSIONS
+    DEFAULT_SCAN_INTERVAL = 10.0
+
+    @classmethod
+    def from_config(cls, config: Config) -> "OutputIndex":
+        comfyui_path = Path(config.get("COMFYUI_PATH", "/opt/app/ComfyUI"))
+        root = config.get("COMFYUI_COCKPIT_OUTPUT_DIR") or comfyui_path / "output"
+        return cls(
+            Path(root),
+            config.cache_dir / "output.sqlite3",
+            config.get_float("COMFYUI_COCKPIT_OUTPUT_SCAN_INTERVAL", cls.DEFAULT_SCAN_INTERVAL),
+        )
+
+
+def render_thumbnail(source: Path, destination: Path, size: int) -> None:
+    """Pillow で長辺 size ピクセルの WebP を作る"""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        # JPEG は縮小しながらデコードできるため、巨大な画像でも全画素を展開しない
+        image.draft("RGB", (size, size))
+        image.thumbnail((size, size), reducing_gap=2.0)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+        image.save(destination, "WEBP", quality=80, method=4)
+
+
+class ThumbnailCache:
+    """サムネイルをディスク上にキャッシュし、合計サイズが max_bytes を超えたら古いものから消す
+
+    サムネイルは元のファイルのパス・サイズ・mtime から決まるキーのファイル名で保存するため、
+    元のファイルが変わると別のサムネイルになる（古いものはそのうち追い出される）。
+    使うたびにサムネイルの mtime を更新し、サーバーを再起動しても mtime の順で LRU を復元する。
+    生成はスレッドプールで行い、同じサムネイルへの同時リクエストは1回の生成にまとめる。
+    """
+
+    SUFFIX = ".webp"
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        size: int = 256,
+        workers: int = 2,
+        render: Optional[Callable[[Path, Path, int], None]] = render_thumbnail if PILLOW_AVAILABLE else None,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.size = size
+        self._render = render
+        self._pool = ThreadPoolExecutor(max(1, workers), thread_name_prefix="thumbnails")
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_config(cls, config: Config) -> "ThumbnailCache":
+        return cls(
+            config.cache_dir / "thumbnails",
+            max_bytes=config.get_int("COMFYUI_COCKPIT_THUMBNAIL_CACHE_MB", 512) * 1024 * 1024,
+            size=config.get_int("COMFYUI_COCKPIT_THUMBNAIL_SIZE", 256),
+            workers=config.get_int("COMFYUI_COCKPIT_THUMBNAIL_WORKERS", 2),
+        )
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def supported(self, name: str) -> bool:
+        return self._render is not None and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+    def key(self, relative: str, size: int, mtime: float) -> str:
+        """サムネイルのキー（ETag とファイル名に使う）"""
+        return hashlib.sha1(f"{relative}\0{size}\0{mtime!r}\0{self.size}".encode("utf-8")).hexdigest()
+
+    def _load(self) -> "OrderedDict[str, int]":
+        if self._entries is None:
+            files = []
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(self.SUFFIX):
+                            stat = entry.stat()
+                            files.append((stat.st_mtime, entry.name, stat.st_size))
+            except FileNotFoundError:
+                pass
+            self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    def _touch(self, name: str) -> bool:
+        with self._lock:
+            entries = self._load()
+            if name not in entries:
+                return False
+            entries.move_to_end(name)
+        try:
+            os.utime(self.directory / name)
+        except FileNotFoundError:
+            # 別のプロセスなどに消されていた
+            with self._lock:
+                self._total -= entries.pop(name, 0)
+            return False
+        return True
+
+    def _add(self, name: str, size: int) -> None:
+        with self._lock:
+            entries = self._load()
+            self._total += size - entries.pop(name, 0)
+            entries[name] = size
+            # 追加したものは残し、古いものから消す
+            while self._total > self.max_bytes and len(entries) > 1:
+                evicted, evicted_size = entries.popitem(last=False)
+                self._total -= evicted_size
+                try:
+                    os.unlink(self.directory / evicted)
+                except FileNotFoundError:
+                    pass
+
+    def _generate(self, source: Path, name: str) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        destination = self.directory / name
+        temporary = destination.with_name(f".{name}.{threading.get_ident()}.tmp")
+        try:
+            self._render(source, temporary, self.size)
+            os.replace(temporary, destination)
+        finally:
+            if temporary.exists():
+                temporary.unlink()
+        return destination.stat().st_size
+
+    async def get(self, source: Path, relative: str) -> Optional[str]:
+        """サムネイルのファイル名を返す（なければ作る。作れない形式なら None）"""
+        if not self.supported(relative):
+            return None
+        stat = os.stat(source)
+        name = self.key(relative, stat.st_size, stat.st_mtime) + self.SUFFIX
+        if self._touch(name):
+            cache_requests.inc("thumbnails", "hit")
+            return name
+
+        future = self._pending.get(name)
+        if future is None:
+            cache_requests.inc("thumbnails", "miss")
+            future = asyncio.get_running_loop().run_in_executor(self._pool, self._generate, source, name)
+            self._pending[name] = future
+            future.add_done_callback(lambda _: self._pending.pop(name, None))
+        else:
+            cache_requests.inc("thumbnails", "shared")
+        size = await asyncio.shield(future)
+        self._add(name, size)
+        return name
+
+    def prefetch(self, root: Path, relatives: Iterable[str]) -> None:
+        """一覧に含まれるファイルのサムネイルを裏で作り始める"""
+        for relative in relatives:
+            if self.supported(relative):
+                asyncio.ensure_future(self._prefetch_one(root / relative, relative))
+
+    async def _prefetch_one(self, source: Path, relative: str) -> None:
+        try:
+            await self.get(source, relative)
+        except Exception as e:
+            logger.debug(f"Failed to create a thumbnail for {relative}: {e}")
+
+
+_output_index: Optional[OutputIndex] = None
+_thumbnails: Optional[ThumbnailCache] = None
+
+
+def get_output_index() -> OutputIndex:
+    """共有の OutputIndex を返す（初回呼び出し時に作成する）"""
+    global _output_index
+    if _output_index is None:
+        _output_index = OutputIndex.from_config(Config())
+    return _output_index
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """共有の ThumbnailCache を返す（初回呼び出し時に作成する）"""
+    global _thumbnails
+    if _thumbnails is None:
+        _thumbnails = ThumbnailCache.from_config(Config())
+    return _thumbnails
@@ -0,0 +1,367 @@
+"""git コマンドを起動せずにリポジトリの参照（HEAD・タグ）を読み取る"""
+import logging
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .commands import run_command
+from .metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+_VERSION_RE = re.compile(r'__version__\s*=\s*["\']([^"\']+)["\']')
+_REMOTE_SECTION_RE = re.compile(r'^\[\s*remote\s+"([^"]+)"\s*\]$')
+
+
+def version_sort_key(tag: str) -> Tuple:
+    """git tag --sort=version:refname と同様に、数字部分を数値として比較するキー"""
+    # re.split に数字のグループを渡すと、奇数番目の要素が常に数字になる
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(re.split(r"(\d+)", tag)))
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class TagRef:
+    """タグの参照先（annotated tag の場合は peeled がコミットを指す）"""
+
+    name: str
+    sha: str
+    peeled: Optional[str] = None
+
+    @property
+    def commit(self) -> str:
+        return self.peeled or self.sha
+
+
+class GitRepository:
+    """.git 配下のファイルを直接読み取る最小限のリポジトリ表現
+
+    worktree（.git がファイルの場合）にも対応し、HEAD は worktree 固有の
+    ディレクトリから、refs と packed-refs は共通ディレクトリから読む。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.git_dir, self.common_dir = self._resolve_git_dirs()
+
+    @property
+    def exists(self) -> bool:
+        return self.git_dir is not None
+
+    def _resolve_git_dirs(self) -> Tuple[Optional[Path], Optional[Path]]:
+        dot_git = self.path / ".git"
+        if dot_git.is_dir():
+            return dot_git, dot_git
+        if not dot_git.is_file():
+            return None, None
+        try:
+            content = dot_git.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None, None
+        if not content.startswith("gitdir:"):
+            return None, None
+        git_dir = Path(content[len("gitdir:"):].strip())
+        if not git_dir.is_absolute():
+            git_dir = (self.path / git_dir).resolve()
+        common_dir = git_dir
+        commondir_file = git_dir / "commondir"
+        if commondir_file.is_file():
+            common_dir = (git_dir / commondir_file.read_text(encoding="utf-8").strip()).resolve()
+        return git_dir, common_dir
+
+    def head_ref(self) -> Optional[str]:
+        """HEAD の内容（"ref: refs/heads/master" の ref 名、または detached の SHA）"""
+        if self.git_dir is None:
+            return None
+        try:
+            content = (self.git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if content.startswith("ref:"):
+            return content[len("ref:"):].strip()
+        return content
+
+    def head(self) -> Optional[str]:
+        """HEAD が指すコミットの SHA"""
+        ref = self.head_ref()
+        if ref is None or _SHA_RE.match(ref):
+            return ref
+        return self.resolve_ref(ref)
+
+    def branch(self) -> Optional[str]:
+        """チェックアウト中のブランチ名（detached HEAD なら None）"""
+        ref = self.head_ref()
+        if ref is None or not ref.startswith("refs/heads/"):
+            return None
+        return ref[len("refs/heads/"):]
+
+    def remote_url(self, name: str = "origin") -> Optional[str]:
+        """config に書かれたリモートの URL（name がなければ最初のリモート）"""
+        if self.common_dir is None:
+            return None
+        try:
+            lines = (self.common_dir / "config").read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return None
+        urls: Dict[str, str] = {}
+        remote = None
+        for line in lines:
+            line = line.strip()
+            if line.startswith("["):
+                match = _REMOTE_SECTION_RE.match(line)
+                remote = match.group(1) if match else None
+                continue
+            key, sep, value = line.partition("=")
+            if remote is not None and sep and key.strip() == "url":
+                urls.setdefault(remote, value.strip())
+        return urls.get(name) or next(iter(urls.values()), None)
+
+    def resolve_ref(self, ref: str) -> Optional[str]:
+        """ref 名（refs/heads/master など）を SHA に解決する"""
+        for base in (self.git_dir, self.common_dir):
+            if base is None:
+                continue
+            try:
+                content = (base / ref).read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+            if content.startswith("ref:"):
+                return self.resolve_ref(content[len("ref:"):].strip())
+            return content
+        sha, _ = self.packed_refs().get(ref, (None, None))
+        return sha
+
+    def packed_refs(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """packed-refs を {ref名: (SHA, peeled SHA)} として読み込む"""
+        refs: Dict[str, Tuple[str, Optional[str]]] = {}
+        if self.common_dir is None:
+            return refs
+        try:
+            with open(self.common_dir / "packed-refs", "r", encoding="utf-8") as f:
+                last_ref = None
+                for line in f:
+                    line = line.rstrip("\n")
+                    if not line or line.startswith("#"):
+                        continue
+                    if line.startswith("^"):
+                        # 直前の annotated tag が指すコミット
+                        if last_ref is not None:
+                            refs[last_ref] = (refs[last_ref][0], line[1:])
+                        continue
+                    sha, _, ref = line.partition(" ")
+                    refs[ref] = (sha, None)
+                    last_ref = ref
+        except OSError:
+            pass
+        return refs
+
+    def tags(self) -> Dict[str, TagRef]:
+        """全タグを返す（loose な refs/tags が packed-refs より優先される）"""
+        tags: Dict[str, TagRef] = {}
+        for ref, (sha, peeled) in self.packed_refs().items():
+            if ref.startswith("refs/tags/"):
+                name = ref[len("refs/tags/"):]
+                tags[name] = TagRef(name, sha, peeled)
+
+        if self.common_dir is None:
+            return tags
+        tags_dir = self.common_dir / "refs" / "tags"
+        for root, _, files in os.walk(tags_dir):
+            for filename in files:
+                path = Path(root) / filename
+                name = path.relative_to(tags_dir).as_posix()
+                try:
+                    sha = path.read_text(encoding="utf-8").strip()
+                except OSError:
+                    continue
+                if _SHA_RE.match(sha):
+                    tags[name] = TagRef(name, sha, self._peel_loose_tag(sha))
+        return tags
+
+    def tag_dirs(self) -> List[Path]:
+        """タグの追加・削除で mtime が変わるディレクトリの一覧"""
+        if self.common_dir is None:
+            return []
+        tags_dir = self.common_dir / "refs" / "tags"
+        return [Path(root) for root, _, _ in os.walk(tags_dir)] or [tags_dir]
+
+    def _peel_loose_tag(self, sha: str) -> Optional[str]:
+        """loose オブジェクトとして存在する annotated tag が指すコミットを返す"""
+        path = self.common_dir / "objects" / sha[:2] / sha[2:]
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            # pack 内のオブジェクトや lightweight tag は解決しない
+            return None
+        header, _, body = data.partition(b"\0")
+        if not header.startswith(b"tag "):
+            return None
+        first_line = body.split(b"\n", 1)[0]
+        if first_line.startswith(b"object "):
+            return first_line[len(b"object "):].decode("ascii")
+        return None
+
+
+class VersionMetadata:
+    """ComfyUI のバージョン情報を、参照ファイルの mtime で無効化しながらキャッシュする
+
+    HEAD・packed-refs・refs/tags 配下のディレクトリ・comfyui_version.py の
+    mtime が変わらない限り、タグ一覧や現在のバージョンはメモリから返す。
+    外部で git pull や git checkout された場合も mtime の変化で検知できる。
+    """
+
+    def __init__(self, comfyui_path: Path):
+        self.comfyui_path = Path(comfyui_path)
+        self._signature = None
+        self._tags: Dict[str, TagRef] = {}
+        self._sorted_tags: List[str] = []
+        self._head: Optional[str] = None
+        self._file_version: Optional[str] = None
+        self._describe: Dict[str, Optional[str]] = {}
+        # (コミット, パス) ごとのファイルの内容（コミットの内容は変わらないためタグの更新でも捨てない）
+        self._files: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def _compute_signature(self, repo: GitRepository) -> Tuple:
+        paths = [self.comfyui_path / "comfyui_version.py"]
+        if repo.exists:
+            paths += [repo.git_dir / "HEAD", repo.common_dir / "packed-refs"]
+            head_ref = repo.head_ref()
+            if head_ref and not _SHA_RE.match(head_ref):
+                # ブランチ上での git pull は HEAD ではなくブランチの ref を更新する
+                paths.append(repo.common_dir / head_ref)
+            paths += repo.tag_dirs()
+        return tuple((str(path), _mtime(path)) for path in paths)
+
+    def refresh(self) -> None:
+        """参照ファイルが変わっていればキャッシュを読み直す"""
+        repo = GitRepository(self.comfyui_path)
+        signature = self._compute_signature(repo)
+        if signature == self._signature:
+            cache_requests.inc("git_metadata", "hit")
+            return
+        cache_requests.inc("git_metadata", "miss")
+
+        self._tags = repo.tags() if repo.exists else {}
+        self._sorted_tags = sorted(self._tags, key=version_sort_key, reverse=True)
+        self._head = repo.head() if repo.exists else None
+        self._file_version = self._read_version_file()
+        self._describe = {}
+        self._signature = signature
+
+    def _read_version_file(self) -> Optional[str]:
+        version_file = self.comfyui_path / "comfyui_version.py"
+        try:
+            content = version_file.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read __version__.py: {e}")
+            return None
+        # __version__ = "1.0.0" のような形式を探す
+        match = _VERSION_RE.search(content)
+        return match.group(1) if match else None
+
+    def available_versions(self, limit: Optional[int] = None) -> List[str]:
+        """タグをバージョンの降順で返す"""
+        self.refresh()
+        return self._sorted_tags[:limit] if limit is not None else list(self._sorted_tags)
+
+    def tag_exists(self, tag: str) -> bool:
+        self.refresh()
+        return tag in self._tags
+
+    def head_tag(self) -> Optional[str]:
+        """HEAD のコミットを指すタグ（複数あれば最も新しいバージョン）"""
+        self.refresh()
+        if self._head is None:
+            return None
+        for name in self._sorted_tags:
+            if self._tags[name].commit == self._head:
+                return name
+        return None
+
+    async def current_version(self) -> Optional[str]:
+        """git describe --tags --always 相当の現在のバージョン
+
+        comfyui_version.py があればその値を優先する。HEAD がタグを指していれば
+        プロセス内で解決し、そうでなければ HEAD ごとに1回だけ git describe を実行する。
+        """
+        self.refresh()
+        if self._file_version:
+            return self._file_version
+        if self._head is None:
+            return None
+
+        tag = self.head_tag()
+        if tag is not None:
+            return tag
+        if self._head not in self._describe:
+            cache_requests.inc("git_describe", "miss")
+            self._describe[self._head] = await self._git_describe()
+        else:
+            cache_requests.inc("git_describe", "hit")
+        return self._describe[self._head]
+
+    async def read_file(self, tag: str, relative: str) -> Optional[str]:
+        """タグの時点のファイルの内容（タグかファイルがなければ None）
+
+        git show はコミットとパスの組ごとに1回だけ実行する。
+        """
+        self.refresh()
+        ref = self._tags.get(tag)
+        if ref is None:
+            return None
+        key = (ref.commit, relative)
+        if key in self._files:
+            cache_requests.inc("git_show", "hit")
+            return self._files[key]
+        cache_requests.inc("git_show", "miss")
+
+        content = None
+        try:
+            result = await run_command(
+                ["git", "-C", str(self.comfyui_path), "show", f"{ref.commit}:{relative}"],
+                timeout=5,
+            )
+            if result.returncode == 0:
+                content = result.stdout
+        except Exception as e:
+            logger.debug(f"Failed to read {relative} at {tag}: {e}")
+            # 一時的な失敗はキャッシュしない
+            return None
+        self._files[key] = content
+        return content
+
+    async def _git_describe(self) -> Optional[str]:
+        try:
+            result = await run_command(
+                ["git", "-C", str(self.comfyui_path), "describe", "--tags", "--always"],
+                timeout=2,
+            )
+            if result.returncode == 0:
+                return result.stdout.strip()
+        except Exception as e:
+            logger.debug(f"Failed to get git version: {e}")
+        return self._head[:7]
+
+
+_metadata: Dict[str, VersionMetadata] = {}
+
+
+def get_version_metadata(comfyui_path: Path) -> VersionMetadata:
+    """パスごとに共有される VersionMetadata を返す"""
+    key = str(comfyui_path)
+    if key not in _metadata:
+        _metadata[key] = VersionMetadata(Path(comfyui_path))
+    return _metadata[key]
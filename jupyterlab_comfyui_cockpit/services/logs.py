@@ -0,0 +1,248 @@
+"""ログファイルをバイトオフセット単位で読み出し、追記された分だけを配信する"""
+import asyncio
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from ..config import Config
+from .broadcast import Broadcaster, Subscription
+from .metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK = 64 * 1024
+MAX_CHUNK = 1024 * 1024
+
+
+def _utf8_safe_end(data: bytes) -> int:
+    """末尾で途切れた UTF-8 の多バイト文字を含めない長さを返す"""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            # 継続バイトなので、さらに前の先頭バイトを探す
+            continue
+        if byte < 0x80:
+            return len(data)
+        needed = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4
+        return len(data) if back >= needed else len(data) - back
+    return len(data)
+
+
+@dataclass
+class LogChunk:
+    """ログファイルの一部分"""
+
+    offset: int  # data の先頭のバイト位置
+    next_offset: int  # 続きを読む時に指定するバイト位置
+    size: int  # 読み出し時点のファイルサイズ
+    data: str
+    reset: bool = False  # ローテーションなどで要求した位置がファイルの外だった
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "offset": self.offset,
+            "next_offset": self.next_offset,
+            "size": self.size,
+            "data": self.data,
+            "reset": self.reset,
+        }
+
+
+def read_chunk(path: Path, offset: int, limit: int = DEFAULT_CHUNK) -> LogChunk:
+    """offset から最大 limit バイトを読み出す（ファイル全体は読み込まない）
+
+    offset が負の場合は末尾から -offset バイト手前を起点とし、行の途中からは始めない。
+    offset がファイルサイズを超えている場合は切り詰められたとみなして先頭から読む。
+    """
+    limit = max(1, min(limit, MAX_CHUNK))
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        reset = False
+        if offset < 0:
+            start = max(0, size + offset)
+        elif offset > size:
+            start, reset = 0, True
+        else:
+            start = offset
+        f.seek(start)
+        data = f.read(limit)
+
+    if offset < 0 and start > 0:
+        newline = data.find(b"\n")
+        if newline >= 0:
+            start += newline + 1
+            data = data[newline + 1:]
+    data = data[:_utf8_safe_end(data)]
+    return LogChunk(start, start + len(data), size, data.decode("utf-8", errors="replace"), reset)
+
+
+class LogRingBuffer:
+    """ファイル末尾付近の内容をオフセット付きで保持する上限付きバッファ"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._chunks: Deque[Tuple[int, bytes]] = deque()
+        self._size = 0
+
+    @property
+    def start_offset(self) -> Optional[int]:
+        return self._chunks[0][0] if self._chunks else None
+
+    @property
+    def end_offset(self) -> Optional[int]:
+        if not self._chunks:
+            return None
+        offset, data = self._chunks[-1]
+        return offset + len(data)
+
+    def append(self, offset: int, data: bytes) -> None:
+        if self._chunks and offset != self.end_offset:
+            # 連続しない内容は混ぜない
+            self.clear()
+        self._chunks.append((offset, data))
+        self._size += len(data)
+        while self._size > self.capacity and len(self._chunks) > 1:
+            _, dropped = self._chunks.popleft()
+            self._size -= len(dropped)
+
+    def read_from(self, offset: int) -> Optional[bytes]:
+        """offset 以降の内容（バッファの範囲外なら None）"""
+        if not self._chunks or not self.start_offset <= offset <= self.end_offset:
+            return None
+        parts = []
+        for chunk_offset, data in self._chunks:
+            end = chunk_offset + len(data)
+            if end <= offset:
+                continue
+            parts.append(data[max(0, offset - chunk_offset):])
+        return b"".join(parts)
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._size = 0
+
+
+class LogTailer:
+    """1つのログファイルを監視し、追記された内容を全購読者へ配信する
+
+    購読者がいる間だけ interval 秒ごとにファイルサイズを確認して増えた分だけを読み、
+    直近 buffer_size バイトはメモリに保持して、新しい購読者の追いつき読み込みに使う。
+    """
+
+    DEFAULT_INTERVAL = 0.5
+    BUFFER_SIZE = 256 * 1024
+
+    def __init__(self, path: Path, interval: Optional[float] = None, buffer_size: Optional[int] = None):
+        self.path = Path(path)
+        self._interval = interval
+        self._buffer = LogRingBuffer(
+            buffer_size or Config().get_int("COMFYUI_COCKPIT_LOG_BUFFER", self.BUFFER_SIZE)
+        )
+        self._broadcaster = Broadcaster(maxsize=64)
+        self._offset: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def interval(self) -> float:
+        """ファイルサイズを確認する間隔（秒）"""
+        if self._interval is not None:
+            return self._interval
+        return Config().get_float("COMFYUI_COCKPIT_LOG_INTERVAL", self.DEFAULT_INTERVAL)
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._broadcaster.subscriber_count
+
+    def subscribe(self, offset: Optional[int] = None) -> Subscription:
+        """追従を開始する
+
+        最初に offset（負の値なら末尾からのバイト数）以降の内容を1つのチャンクとして受け取り、
+        以降は追記されるたびにチャンクを受け取る。
+        """
+        try:
+            # 既存の購読者へ先に配信しておき、新しい購読者には追いつき分だけを渡す
+            self.poll()
+            first = {"event": "chunk", "data": self._catch_up(offset).to_dict()}
+        except FileNotFoundError:
+            first = {"event": "waiting", "data": {"path": str(self.path)}}
+        subscription = self._broadcaster.subscribe()
+        subscription.put(first)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return subscription
+
+    def _catch_up(self, offset: Optional[int]) -> LogChunk:
+        if offset is None:
+            offset = -DEFAULT_CHUNK
+        size = self._offset or 0
+        start = max(0, size + offset) if offset < 0 else offset
+        data = self._buffer.read_from(start)
+        if data is None or len(data) > MAX_CHUNK:
+            # バッファにない範囲だけディスクから読む
+            cache_requests.inc("log_buffer", "miss")
+            return read_chunk(self.path, offset, MAX_CHUNK)
+        cache_requests.inc("log_buffer", "hit")
+        if offset < 0 and start > 0:
+            newline = data.find(b"\n")
+            if newline >= 0:
+                start += newline + 1
+                data = data[newline + 1:]
+        data = data[:_utf8_safe_end(data)]
+        return LogChunk(start, start + len(data), size, data.decode("utf-8", errors="replace"))
+
+    def poll(self) -> None:
+        """前回の位置から増えた分を読み出して配信する"""
+        st = os.stat(self.path)
+        if self._offset is None or st.st_ino != self._inode or st.st_size < self._offset:
+            rotated = self._offset is not None
+            self._inode = st.st_ino
+            self._buffer.clear()
+            self._offset = 0 if rotated else max(0, st.st_size - self._buffer.capacity)
+            if rotated:
+                self._broadcaster.publish({"event": "reset", "data": {"size": st.st_size}})
+
+        if st.st_size - self._offset > self._buffer.capacity:
+            # 追いつけないほど増えた分は飛ばす（クライアントはオフセットの不連続から検知できる）
+            self._buffer.clear()
+            self._offset = st.st_size - self._buffer.capacity
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        data = data[:_utf8_safe_end(data)]
+        if not data:
+            return
+
+        start = self._offset
+        self._buffer.append(start, data)
+        self._offset = start + len(data)
+        chunk = LogChunk(start, self._offset, st.st_size, data.decode("utf-8", errors="replace"))
+        self._broadcaster.publish({"event": "chunk", "data": chunk.to_dict()})
+
+    async def _run(self) -> None:
+        while self._broadcaster.subscriber_count:
+            try:
+                self.poll()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Failed to read log file %s: %s", self.path, e)
+            await asyncio.sleep(self.interval)
+        self._task = None
+
+
+_tailers: Dict[str, LogTailer] = {}
+
+
+def get_log_tailer(path: Path) -> LogTailer:
+    """パスごとに共有される LogTailer を返す"""
+    key = str(path)
+    if key not in _tailers:
+        _tailers[key] = LogTailer(Path(path))
+    return _tailers[key]
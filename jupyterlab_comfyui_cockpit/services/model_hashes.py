@@ -0,0 +1,313 @@
+"""モデルファイルの SHA-256 を並行して求め、同じ内容のファイルを見つける"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter as TallyCounter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import Config
+from .metrics import cache_requests, metrics
+from .models import ModelIndex, get_model_index
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    hashed_at REAL NOT NULL,
+    PRIMARY KEY (device, inode)
+);
+CREATE TABLE IF NOT EXISTS hash_paths (
+    path TEXT PRIMARY KEY,
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hashes_sha256 ON hashes (sha256);
+"""
+
+hashed_bytes = metrics.counter(
+    "comfyui_cockpit_model_hash_bytes_total",
+    "Bytes read to compute model file hashes.",
+)
+
+FileKey = Tuple[int, int, int, int]  # (device, inode, size, mtime_ns)
+
+
+class RateLimiter:
+    """複数のスレッドで共有する読み込み量の上限（バイト/秒のトークンバケット）
+
+    rate が 0 以下なら制限しない。1秒分までは溜めておけるため、短い間隔の読み込みはまとめて通す。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._available = rate
+        self._updated = clock()
+
+    def acquire(self, amount: int) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._available = min(self.rate, self._available + (now - self._updated) * self.rate)
+            self._updated = now
+            self._available -= amount
+            wait = -self._available / self.rate if self._available < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+
+def sha256_file(
+    path: Path,
+    chunk_size: int = CHUNK_SIZE,
+    limiter: Optional[RateLimiter] = None,
+    on_read: Optional[Callable[[int], None]] = None,
+) -> str:
+    """ファイルの SHA-256 を求める
+
+    1つのバッファに readinto で読み込んで使い回し、数 GB のファイルでもメモリ使用量は chunk_size で済む。
+    hashlib は大きなデータの計算中に GIL を解放するため、スレッドを増やせば並行に計算できる。
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        fadvise = getattr(os, "posix_fadvise", None)
+        if fadvise is not None:
+            fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            if limiter is not None:
+                limiter.acquire(size)
+            digest.update(view[:size])
+            if on_read is not None:
+                on_read(size)
+        if fadvise is not None:
+            # 一度しか読まない巨大なファイルでページキャッシュを押し出さない
+            fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return digest.hexdigest()
+
+
+@dataclass
+class HashProgress:
+    """ハッシュ計算の進捗"""
+
+    status: str = "idle"  # idle / running / done / failed
+    files_total: int = 0
+    files_done: int = 0
+    files_cached: int = 0
+    bytes_total: int = 0
+    bytes_done: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    message: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ModelHasher:
+    """models の索引にあるファイルの SHA-256 を求めてキャッシュする
+
+    ハッシュは (device, inode, size, mtime) をキーに保存し、ファイルが変わらない限り再計算しない。
+    ハードリンクは同じ inode なので1回だけ計算する。
+    all_files=False（デフォルト）ではサイズが他のファイルと一致するものだけを計算する
+    （サイズが異なれば内容も異なるため、重複の検出にはそれで足りる）。
+    """
+
+    def __init__(self, index: ModelIndex, workers: int = 2, rate: float = 0.0, chunk_size: int = CHUNK_SIZE):
+        self.index = index
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self._limiter = RateLimiter(rate)
+        self._progress = HashProgress()
+        self._task: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_config(cls, config: Config, index: ModelIndex) -> "ModelHasher":
+        return cls(
+            index,
+            workers=config.get_int("COMFYUI_COCKPIT_HASH_WORKERS", 2),
+            # HDD では並列に読むと遅くなるため、読み込み量の上限（MB/秒、0 で無制限）も設定できる
+            rate=config.get_float("COMFYUI_COCKPIT_HASH_RATE_MB", 0.0) * 1024 * 1024,
+        )
+
+    @property
+    def progress(self) -> HashProgress:
+        return self._progress
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = self.index.connect()
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def start(self, all_files: bool = False) -> HashProgress:
+        """裏でハッシュの計算を始める（計算中ならその進捗を返す）"""
+        if not self.running:
+            self._progress = HashProgress(status="running", started_at=time.time())
+            self._task = asyncio.ensure_future(self._run(all_files))
+        return self._progress
+
+    async def wait(self) -> HashProgress:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        return self._progress
+
+    async def _run(self, all_files: bool) -> None:
+        try:
+            await self.index.refresh()
+            await asyncio.get_running_loop().run_in_executor(None, self.hash_all, all_files, self._progress)
+            self._progress.status = "done"
+        except Exception as e:
+            logger.warning(f"Failed to hash model files: {e}")
+            self._progress.status = "failed"
+            self._progress.message = str(e)
+        finally:
+            self._progress.finished_at = time.time()
+
+    def hash_all(self, all_files: bool = False, progress: Optional[HashProgress] = None) -> HashProgress:
+        """同期的に索引のファイルのハッシュを求める（進捗は progress に書き込む）"""
+        progress = progress or HashProgress(status="running", started_at=time.time())
+        lock = threading.Lock()
+
+        def on_read(size: int) -> None:
+            hashed_bytes.inc(amount=size)
+            with lock:
+                progress.bytes_done += size
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT path, size, mtime FROM models").fetchall()
+            if not all_files:
+                sizes = TallyCounter(size for _, size, _ in rows)
+                rows = [row for row in rows if row[1] > 0 and sizes[row[1]] > 1]
+
+            cached = {
+                (device, inode): (size, mtime_ns)
+                for device, inode, size, mtime_ns in conn.execute("SELECT device, inode, size, mtime_ns FROM hashes")
+            }
+            pending: Dict[Tuple[int, int], Tuple[Path, FileKey]] = {}
+            paths = []
+            for path, size, mtime in rows:
+                try:
+                    stat = os.stat(self.index.root / path)
+                except OSError:
+                    continue
+                key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                paths.append((path, stat.st_dev, stat.st_ino, stat.st_size, mtime, stat.st_mtime_ns))
+                if cached.get(key[:2]) == key[2:]:
+                    cache_requests.inc("model_hashes", "hit")
+                    progress.files_cached += 1
+                elif key[:2] not in pending:
+                    cache_requests.inc("model_hashes", "miss")
+                    pending[key[:2]] = (self.index.root / path, key)
+
+            with conn:
+                conn.execute("DELETE FROM hash_paths")
+                conn.executemany("INSERT INTO hash_paths VALUES (?, ?, ?, ?, ?, ?)", paths)
+
+            progress.files_total = len(pending)
+            progress.bytes_total = sum(key[2] for _, key in pending.values())
+
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="model-hash") as pool:
+                futures = {
+                    pool.submit(sha256_file, path, self.chunk_size, self._limiter, on_read): (path, key)
+                    for path, key in pending.values()
+                }
+                for future in as_completed(futures):
+                    path, (device, inode, size, mtime_ns) = futures[future]
+                    try:
+                        digest = future.result()
+                    except OSError as e:
+                        logger.warning(f"Failed to hash {path}: {e}")
+                        continue
+                    with conn:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+                            (device, inode, size, mtime_ns, digest, time.time()),
+                        )
+                    progress.files_done += 1
+        return progress
+
+    def duplicates(self) -> Dict[str, Any]:
+        """内容が同じファイルのグループと、1つを残して削除した場合に空く容量"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT h.sha256, p.path, p.size, p.device, p.inode
+                FROM hash_paths p
+                JOIN models m ON m.path = p.path AND m.size = p.size AND m.mtime = p.mtime
+                JOIN hashes h ON h.device = p.device AND h.inode = p.inode
+                    AND h.size = p.size AND h.mtime_ns = p.mtime_ns
+                ORDER BY h.sha256, p.path
+                """
+            ).fetchall()
+
+        by_hash: Dict[str, List[Tuple[str, int, Tuple[int, int]]]] = {}
+        for sha256, path, size, device, inode in rows:
+            by_hash.setdefault(sha256, []).append((path, size, (device, inode)))
+
+        groups = []
+        for sha256, files in by_hash.items():
+            if len(files) < 2:
+                continue
+            size = files[0][1]
+            first_path: Dict[Tuple[int, int], str] = {}
+            entries = []
+            for path, _, identity in files:
+                # ハードリンクは実体を共有しているため、削除しても容量は空かない
+                entries.append({"path": path, "hardlink_of": first_path.get(identity)})
+                first_path.setdefault(identity, path)
+            groups.append({
+                "sha256": sha256,
+                "size": size,
+                "files": entries,
+                "reclaimable": size * (len(first_path) - 1),
+            })
+        groups.sort(key=lambda group: (-group["reclaimable"], group["sha256"]))
+
+        return {
+            "groups": groups,
+            "reclaimable": sum(group["reclaimable"] for group in groups),
+        }
+
+
+_hasher: Optional[ModelHasher] = None
+
+
+def get_model_hasher() -> ModelHasher:
+    """共有の ModelHasher を返す（初回呼び出し時に作成する）"""
+    global _hasher
+    if _hasher is None:
+        _hasher = ModelHasher.from_config(Config(), get_model_index())
+    return _hasher
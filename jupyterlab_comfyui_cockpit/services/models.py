@@ -0,0 +1,366 @@
+"""ComfyUI の models ディレクトリのファイル一覧を SQLite に索引する"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..config import Config
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# ComfyUI が読み込むモデルファイルの拡張子（folder_paths.supported_pt_extensions と gguf / onnx）
+MODEL_EXTENSIONS = frozenset({
+    ".ckpt", ".pt", ".pt2", ".bin", ".pth", ".safetensors", ".pkl", ".sft", ".gguf", ".onnx",
+})
+
+SORT_COLUMNS = {"name": "name", "size": "size", "mtime": "mtime", "path": "path"}
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS models (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_folder_name ON models (folder, name, path);
+CREATE INDEX IF NOT EXISTS models_name ON models (name, path);
+CREATE INDEX IF NOT EXISTS models_folder_size ON models (folder, size);
+CREATE INDEX IF NOT EXISTS models_folder_mtime ON models (folder, mtime);
+CREATE INDEX IF NOT EXISTS models_directory ON models (directory);
+CREATE INDEX IF NOT EXISTS models_mtime ON models (mtime, path);
+"""
+
+scan_duration = metrics.histogram(
+    "comfyui_cockpit_index_scan_seconds",
+    "Duration of directory index scans, by index (models, output).",
+    ("index",),
+)
+scanned_directories = metrics.counter(
+    "comfyui_cockpit_index_scanned_directories_total",
+    "Directories visited by index scans, by index and result (rescanned or unchanged).",
+    ("index", "result"),
+)
+
+
+@dataclass
+class ScanResult:
+    """1回の走査の結果"""
+
+    rescanned: int  # 内容を読み直したディレクトリの数
+    unchanged: int  # mtime が変わっておらず読み飛ばしたディレクトリの数
+    removed: int  # 消えていたディレクトリの数
+    duration: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rescanned": self.rescanned,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+            "duration": round(self.duration, 3),
+        }
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _join(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+
+class ModelIndex:
+    """models ディレクトリのファイル（名前・種類のフォルダ・サイズ・mtime）の索引
+
+    ディレクトリの mtime を記録しておき、再走査ではエントリが増減したディレクトリだけを
+    os.scandir で読み直す（変わっていないディレクトリは stat 1回で済む）。
+    ファイルをその場で上書きしてもディレクトリの mtime は変わらないため、
+    サイズの変化まで拾う場合は full=True で全ディレクトリを読み直す。
+    一覧は索引から返し、走査は別スレッド・別の接続で行うため走査中も待たされない。
+    """
+
+    DEFAULT_SCAN_INTERVAL = 60.0
+    # メトリクスのラベルと索引するファイルの拡張子（別のディレクトリを索引するサブクラスで変える）
+    NAME = "models"
+    EXTENSIONS = MODEL_EXTENSIONS
+
+    def __init__(self, root: Path, db_path: Path, scan_interval: float = DEFAULT_SCAN_INTERVAL):
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.scan_interval = scan_interval
+        self._scanned_at: Optional[float] = None
+        self._last_scan: Optional[ScanResult] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._inflight_full = False
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._folders_cache: Optional[Tuple[Optional[float], List[Dict[str, Any]]]] = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "ModelIndex":
+        comfyui_path = Path(config.get("COMFYUI_PATH", "/opt/app/ComfyUI"))
+        root = config.get("COMFYUI_COCKPIT_MODELS_DIR") or comfyui_path / "models"
+        return cls(
+            Path(root),
+            config.cache_dir / "models.sqlite3",
+            config.get_float("COMFYUI_COCKPIT_MODELS_SCAN_INTERVAL", cls.DEFAULT_SCAN_INTERVAL),
+        )
+
+    def connect(self) -> sqlite3.Connection:
+        """索引のデータベースに接続する（初回はスキーマを用意する）"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        with self._init_lock:
+            if not self._initialized:
+                self._initialize(conn)
+        return conn
+
+    def _initialize(self, conn: sqlite3.Connection) -> None:
+        """スキーマを作成し、保存済みの索引が同じ models ディレクトリのものか確かめる"""
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.executescript(
+                "DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS directories; DROP TABLE IF EXISTS models;"
+            )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        # 別の models ディレクトリの索引は使わない
+        row = conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        if row is None or row[0] != str(self.root):
+            with conn:
+                conn.execute("DELETE FROM directories")
+                conn.execute("DELETE FROM models")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('root', ?)", (str(self.root),))
+        else:
+            scanned_at = conn.execute("SELECT value FROM meta WHERE key = 'scanned_at'").fetchone()
+            self._scanned_at = float(scanned_at[0]) if scanned_at else None
+        self._initialized = True
+
+    @property
+    def scanned_at(self) -> Optional[float]:
+        """最後に走査を終えた時刻（UNIX 時間、未走査なら None）"""
+        return self._scanned_at
+
+    @property
+    def scanning(self) -> bool:
+        return self._inflight is not None
+
+    def scan(self, full: bool = False) -> ScanResult:
+        """同期的に走査して索引を更新する"""
+        started = time.monotonic()
+        with closing(self.connect()) as conn, conn:
+            known: Dict[str, int] = {}
+            children: Dict[str, List[str]] = {}
+            for path, parent, mtime_ns in conn.execute("SELECT path, parent, mtime_ns FROM directories"):
+                known[path] = mtime_ns
+                if parent is not None:
+                    children.setdefault(parent, []).append(path)
+
+            seen: Set[str] = set()
+            visited: Set[Tuple[int, int]] = set()
+            rescanned = unchanged = 0
+            stack = [""]
+            while stack:
+                relative = stack.pop()
+                try:
+                    stat = os.stat(self.root / relative)
+                except OSError:
+                    continue
+                # シンボリックリンクによる循環を避ける
+                identity = (stat.st_dev, stat.st_ino)
+                if identity in visited:
+                    continue
+                visited.add(identity)
+                seen.add(relative)
+
+                if not full and known.get(relative) == stat.st_mtime_ns:
+                    unchanged += 1
+                    stack.extend(children.get(relative, ()))
+                    continue
+
+                rescanned += 1
+                stack.extend(self._rescan_directory(conn, relative, stat.st_mtime_ns))
+
+            removed = [path for path in known if path not in seen]
+            for path in removed:
+                conn.execute("DELETE FROM directories WHERE path = ?", (path,))
+                conn.execute("DELETE FROM models WHERE directory = ?", (path,))
+
+            self._scanned_at = time.time()
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scanned_at', ?)", (str(self._scanned_at),))
+
+        result = ScanResult(rescanned, unchanged, len(removed), time.monotonic() - started)
+        scanned_directories.inc(self.NAME, "rescanned", amount=rescanned)
+        scanned_directories.inc(self.NAME, "unchanged", amount=unchanged)
+        scan_duration.observe(result.duration, self.NAME)
+        self._last_scan = result
+        return result
+
+    def _rescan_directory(self, conn: sqlite3.Connection, relative: str, mtime_ns: int) -> List[str]:
+        """ディレクトリ内のモデルファイルを登録し直し、サブディレクトリを返す"""
+        folder = relative.split("/", 1)[0]
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(self.root / relative) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            subdirectories.append(_join(relative, entry.name))
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.EXTENSIONS:
+                            stat = entry.stat()
+                            files.append((_join(relative, entry.name), entry.name, folder, relative, stat.st_size, stat.st_mtime))
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Failed to scan {self.root / relative}: {e}")
+
+        conn.execute("DELETE FROM models WHERE directory = ?", (relative,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO models (path, name, folder, directory, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            files,
+        )
+        parent = relative.rsplit("/", 1)[0] if "/" in relative else ("" if relative else None)
+        conn.execute(
+            "INSERT OR REPLACE INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?)",
+            (relative, parent, mtime_ns),
+        )
+        return subdirectories
+
+    def query(
+        self,
+        folder: Optional[str] = None,
+        search: Optional[str] = None,
+        sort: str = "name",
+        offset: int = 0,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """索引からモデルの一覧を1ページ分返す（sort の先頭に - を付けると降順）"""
+        descending = sort.startswith("-")
+        column = SORT_COLUMNS.get(sort.lstrip("-"))
+        if column is None:
+            raise ValueError(f"sort must be one of {sorted(SORT_COLUMNS)}")
+
+        conditions = []
+        params: List[Any] = []
+        if folder is not None:
+            conditions.append("folder = ?")
+            params.append(folder)
+        if search:
+            conditions.append("path LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(search)}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        order = f"{column} {direction}, path {direction}"
+
+        with closing(self.connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM models {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT path, name, folder, size, mtime FROM models {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+            folders = self._folders(conn)
+
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "models": [
+                {"path": path, "name": name, "folder": folder, "size": size, "mtime": mtime}
+                for path, name, folder, size, mtime in rows
+            ],
+            "folders": folders,
+        }
+
+    def _folders(self, conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+        """フォルダごとの件数と合計サイズ（索引は走査でしか変わらないため走査ごとに1回だけ集計する）"""
+        cached = self._folders_cache
+        if cached is not None and cached[0] == self._scanned_at:
+            return cached[1]
+        rows = conn.execute("SELECT folder, COUNT(*), SUM(size) FROM models GROUP BY folder ORDER BY folder").fetchall()
+        folders = [{"folder": name, "count": count, "size": size} for name, count, size in rows]
+        self._folders_cache = (self._scanned_at, folders)
+        return folders
+
+    async def refresh(self, full: bool = False) -> ScanResult:
+        """別スレッドで走査する（走査中に呼ばれた場合は実行中の走査を待つ）
+
+        full の場合、実行中の走査が差分の走査であれば変更のないディレクトリを読み直さないため、
+        その完了を待ってから全ディレクトリをもう一度走査する。
+        """
+        current = self._inflight
+        if current is None or (full and not self._inflight_full):
+            self._inflight = asyncio.ensure_future(self._refresh(full, after=current))
+            self._inflight_full = full
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self, full: bool, after: Optional[asyncio.Future] = None) -> ScanResult:
+        inflight = self._inflight
+        try:
+            if after is not None:
+                # 同じ索引へ同時に書き込まないよう、前の走査の完了（失敗も含む）を待つ
+                await asyncio.wait([after])
+            return await asyncio.get_running_loop().run_in_executor(None, self.scan, full)
+        finally:
+            if self._inflight is inflight:
+                self._inflight = None
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Failed to scan models directory {self.root}: {e}")
+
+    async def list(self, **kwargs: Any) -> Dict[str, Any]:
+        """一覧を返す
+
+        一度も走査していなければ走査を待ち、それ以外は索引をそのまま返す。
+        前回の走査から scan_interval 秒以上経っていれば裏で再走査を始める。
+        """
+        loop = asyncio.get_running_loop()
+        if self._scanned_at is None:
+            # 永続化された索引があれば読み込み時に scanned_at が復元される
+            await loop.run_in_executor(None, lambda: self.connect().close())
+        if self._scanned_at is None:
+            await self.refresh()
+        elif not self.scanning and time.time() - self._scanned_at >= self.scan_interval:
+            asyncio.ensure_future(self._refresh_in_background())
+
+        page = await loop.run_in_executor(None, lambda: self.query(**kwargs))
+        return {
+            "root": str(self.root),
+            "exists": self.root.is_dir(),
+            "scanned_at": self._scanned_at,
+            "scanning": self.scanning,
+            "last_scan": self._last_scan.to_dict() if self._last_scan else None,
+            **page,
+        }
+
+
+_index: Optional[ModelIndex] = None
+
+
+def get_model_index() -> ModelIndex:
+    """共有の ModelIndex を返す（初回呼び出し時に作成する）"""
+    global _index
+    if _index is None:
+        _index = ModelIndex.from_config(Config())
+    return _index
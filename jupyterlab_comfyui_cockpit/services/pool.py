@@ -0,0 +1,68 @@
+"""使い回し可能な接続のスレッドセーフなプール"""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+from .metrics import cache_requests
+
+T = TypeVar("T")
+
+
+class ConnectionPool(Generic[T]):
+    """keep-alive 接続を再利用するための小さなプール
+
+    接続は factory で必要になった時に作成し、使用後はプールへ戻す。
+    使用中に例外が発生した接続は状態が不明なため破棄する。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        maxsize: int = 4,
+        close: Callable[[T], None] = None,
+        name: Optional[str] = None,
+    ):
+        self._factory = factory
+        # 接続の再利用率をメトリクスに出す時の名前
+        self._name = name
+        self._close = close
+        self._idle: "queue.LifoQueue[T]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+
+    @contextmanager
+    def connection(self) -> Iterator[T]:
+        """プールから接続を1つ借りる"""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._factory()
+                reused = False
+            if self._name is not None:
+                cache_requests.inc(self._name, "hit" if reused else "miss")
+            try:
+                yield conn
+            except BaseException:
+                self._discard(conn)
+                raise
+            else:
+                self._idle.put(conn)
+
+    def clear(self) -> None:
+        """待機中の接続をすべて閉じる"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def _discard(self, conn: T) -> None:
+        if self._close is None:
+            return
+        try:
+            self._close(conn)
+        except Exception:
+            pass
@@ -0,0 +1,409 @@
+"""ComfyUI のキューと実行履歴を1本の接続で監視し、全クライアントで共有する"""
+import asyncio
+import http.client
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from tornado.websocket import websocket_connect
+
+from ..config import Config
+from .broadcast import Broadcaster, Subscription
+from .metrics import cache_requests, metrics
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 実行が終わったことを示す websocket のメッセージ（古い ComfyUI は executing の node が null になるだけ）
+FINISHED_EVENTS = ("execution_success", "execution_error", "execution_interrupted")
+
+upstream_requests = metrics.counter(
+    "comfyui_cockpit_queue_upstream_requests_total",
+    "Requests sent to the ComfyUI queue and history APIs.",
+    ("endpoint", "result"),
+)
+prompt_duration = metrics.histogram(
+    "comfyui_cockpit_prompt_execution_seconds",
+    "Execution time of prompts seen in the ComfyUI history.",
+    buckets=(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+)
+
+
+def summarize_queue_item(item: List[Any]) -> Dict[str, Any]:
+    """/queue の1件（[番号, prompt_id, prompt, extra_data, 出力ノード]）を要約する"""
+    prompt = item[2] if len(item) > 2 else None
+    extra = item[3] if len(item) > 3 and isinstance(item[3], dict) else {}
+    return {
+        "number": item[0],
+        "prompt_id": item[1],
+        "nodes": len(prompt) if isinstance(prompt, dict) else None,
+        "client_id": extra.get("client_id"),
+    }
+
+
+def summarize_history_entry(prompt_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """/history の1件を要約する
+
+    開始・終了時刻は status.messages にあるミリ秒のタイムスタンプから求める
+    （タイムスタンプがない古い ComfyUI では None）。outputs は output ディレクトリからの相対パス。
+    """
+    prompt = entry.get("prompt") or []
+    status = entry.get("status") or {}
+    started_at = finished_at = None
+    for message in status.get("messages") or []:
+        if len(message) < 2 or not isinstance(message[1], dict):
+            continue
+        timestamp = message[1].get("timestamp")
+        if timestamp is None:
+            continue
+        if message[0] == "execution_start":
+            started_at = timestamp / 1000
+        elif message[0] in FINISHED_EVENTS:
+            finished_at = timestamp / 1000
+
+    outputs = []
+    for node_outputs in (entry.get("outputs") or {}).values():
+        for files in node_outputs.values():
+            if not isinstance(files, list):
+                continue
+            for file in files:
+                if isinstance(file, dict) and file.get("type") == "output" and file.get("filename"):
+                    subfolder = file.get("subfolder")
+                    outputs.append(f"{subfolder}/{file['filename']}" if subfolder else file["filename"])
+
+    return {
+        "prompt_id": prompt_id,
+        "number": prompt[0] if prompt else None,
+        "status": status.get("status_str"),
+        "completed": status.get("completed"),
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "duration": finished_at - started_at if started_at is not None and finished_at is not None else None,
+        "outputs": outputs,
+    }
+
+
+class PromptQueueMonitor:
+    """ComfyUI のキュー・直近の実行履歴・実行中のプロンプトの進捗を保持する
+
+    購読者がいる間は ComfyUI の websocket に1本だけ接続し、実行の開始・終了やキューの変化の通知を
+    受けた時だけ /queue（とプロンプトがキューから抜けた時は /history）を取得して全購読者へ配信する。
+    websocket に接続できない間は interval 秒ごとの /queue の取得に切り替え、間隔を空けながら再接続を試みる。
+    購読者がいない時の GET は、interval 秒以内に取得した結果を全クライアントで使い回す。
+    """
+
+    DEFAULT_URL = "http://127.0.0.1:8188"
+    DEFAULT_INTERVAL = 1.0
+    DEFAULT_HISTORY = 100
+    RECONNECT_MIN = 1.0
+    RECONNECT_MAX = 30.0
+
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        interval: float = DEFAULT_INTERVAL,
+        history_size: int = DEFAULT_HISTORY,
+        websocket: bool = True,
+        timeout: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        parsed = urlparse(url)
+        self.url = url.rstrip("/")
+        self.interval = interval
+        self.history_size = max(1, history_size)
+        self.websocket = websocket
+        self._https = parsed.scheme == "https"
+        self._netloc = parsed.netloc
+        self._timeout = timeout
+        self._clock = clock
+        self._pool = ConnectionPool(
+            self._connect,
+            maxsize=2,
+            close=lambda conn: conn.close(),
+            name="queue_connections",
+        )
+        self._broadcaster = Broadcaster(maxsize=64, on_idle=self._on_idle)
+        self._running: List[Dict[str, Any]] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._history: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # websocket で観測した開始・終了時刻（履歴にタイムスタンプがない場合に使う）
+        self._executions: Dict[str, Dict[str, float]] = {}
+        self._progress: Optional[Dict[str, Any]] = None
+        self._history_dirty = True
+        self._updated_at: Optional[float] = None
+        self._connected = False
+        self._mode = "polling"
+        self._error: Optional[str] = None
+        self._last_key: Optional[Tuple] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connection = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "PromptQueueMonitor":
+        return cls(
+            url=config.get("COMFYUI_COCKPIT_COMFYUI_URL", cls.DEFAULT_URL),
+            interval=config.get_float("COMFYUI_COCKPIT_QUEUE_INTERVAL", cls.DEFAULT_INTERVAL),
+            history_size=config.get_int("COMFYUI_COCKPIT_QUEUE_HISTORY", cls.DEFAULT_HISTORY),
+            websocket=config.get_bool("COMFYUI_COCKPIT_QUEUE_WEBSOCKET", True),
+        )
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._broadcaster.subscriber_count
+
+    @property
+    def watching(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return connection_class(self._netloc, timeout=self._timeout)
+
+    def _get_json(self, endpoint: str, query: str = "") -> Any:
+        """同期的に ComfyUI の API を GET する"""
+        try:
+            with self._pool.connection() as conn:
+                conn.request("GET", f"/{endpoint}{query}")
+                response = conn.getresponse()
+                body = response.read()
+            if response.status != 200:
+                raise http.client.HTTPException(f"{self.url}/{endpoint}: HTTP {response.status}")
+            data = json.loads(body)
+        except Exception:
+            upstream_requests.inc(endpoint, "error")
+            raise
+        upstream_requests.inc(endpoint, "ok")
+        return data
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現在のキューと履歴（新しい順）"""
+        return {
+            "url": self.url,
+            "connected": self._connected,
+            "mode": self._mode,
+            "error": self._error,
+            "updated_at": self._updated_at,
+            "queue_remaining": len(self._running) + len(self._pending),
+            "running": self._running,
+            "pending": self._pending,
+            "progress": self._progress,
+            "history": list(reversed(self._history.values())),
+        }
+
+    async def get(self) -> Dict[str, Any]:
+        """キャッシュ済みの状態を返す（監視中でなく、interval 秒以上経っていれば取得し直す）"""
+        fresh = self._updated_at is not None and self._clock() - self._updated_at < self.interval
+        if self._inflight is None and (fresh or (self.watching and self._mode == "websocket" and self._connected)):
+            cache_requests.inc("prompt_queue", "hit")
+            return self.snapshot()
+        await self._poll()
+        return self.snapshot()
+
+    def subscribe(self) -> Subscription:
+        """購読を開始する（("queue", 状態) と ("progress", 進捗) を受け取る）"""
+        subscription = self._broadcaster.subscribe()
+        if self._updated_at is not None:
+            subscription.put(("queue", self.snapshot()))
+        if not self.watching:
+            self._task = asyncio.ensure_future(self._run())
+        return subscription
+
+    async def refresh(self) -> None:
+        """/queue（と必要なら /history）を取得する（取得中に呼ばれた場合は実行中の取得を待つ）"""
+        if self._inflight is None:
+            cache_requests.inc("prompt_queue", "miss")
+            self._inflight = asyncio.ensure_future(self._refresh())
+        else:
+            cache_requests.inc("prompt_queue", "shared")
+        await asyncio.shield(self._inflight)
+
+    async def _refresh(self) -> None:
+        inflight = self._inflight
+        try:
+            loop = asyncio.get_running_loop()
+            queue = await loop.run_in_executor(None, self._get_json, "queue")
+            previous = {item["prompt_id"] for item in self._running + self._pending}
+            self._apply_queue(queue)
+            current = {item["prompt_id"] for item in self._running + self._pending}
+            # キューから抜けたプロンプトがあれば履歴に加わっている
+            if self._history_dirty or previous - current:
+                history = await loop.run_in_executor(
+                    None, self._get_json, "history", f"?max_items={self.history_size}"
+                )
+                self._apply_history(history)
+            self._updated_at = self._clock()
+        finally:
+            if self._inflight is inflight:
+                self._inflight = None
+
+    async def _poll(self) -> None:
+        """取得し、結果（または失敗）を購読者へ配信する"""
+        try:
+            await self.refresh()
+            if self._mode == "polling":
+                self._connected = True
+            self._error = None
+        except Exception as e:
+            logger.debug(f"Failed to fetch the ComfyUI queue: {e}")
+            self._connected = False
+            self._error = f"{self.url}: {e}"
+        self._publish()
+
+    def _apply_queue(self, data: Dict[str, Any]) -> None:
+        running = sorted((summarize_queue_item(item) for item in data.get("queue_running") or []), key=lambda i: i["number"])
+        for item in running:
+            item["started_at"] = self._executions.get(item["prompt_id"], {}).get("started_at")
+        self._running = running
+        self._pending = sorted(
+            (summarize_queue_item(item) for item in data.get("queue_pending") or []), key=lambda i: i["number"]
+        )
+
+    def _apply_history(self, data: Dict[str, Any]) -> None:
+        first = self._updated_at is None
+        entries = []
+        for prompt_id, entry in data.items():
+            summary = summarize_history_entry(prompt_id, entry)
+            observed = self._executions.pop(prompt_id, {})
+            if summary["started_at"] is None and "started_at" in observed and "finished_at" in observed:
+                summary["started_at"] = observed["started_at"]
+                summary["finished_at"] = observed["finished_at"]
+                summary["duration"] = observed["finished_at"] - observed["started_at"]
+            if not first and prompt_id not in self._history and summary["duration"] is not None:
+                prompt_duration.observe(summary["duration"])
+            entries.append(summary)
+
+        for summary in entries:
+            self._history[summary["prompt_id"]] = summary
+        ordered = sorted(self._history.values(), key=lambda s: (s["number"] is None, s["number"] or 0))
+        self._history = OrderedDict((s["prompt_id"], s) for s in ordered[-self.history_size:])
+        self._history_dirty = False
+
+    def _publish(self) -> None:
+        """キュー・履歴・接続状態が変わっていれば配信する"""
+        key = (
+            self._connected,
+            self._error,
+            tuple((item["prompt_id"], item["started_at"]) for item in self._running),
+            tuple(item["prompt_id"] for item in self._pending),
+            tuple(self._history),
+        )
+        if key == self._last_key:
+            return
+        self._last_key = key
+        self._broadcaster.publish(("queue", self.snapshot()))
+
+    def _observe(self, prompt_id: str) -> Dict[str, float]:
+        """prompt_id の観測した時刻を返す
+
+        履歴を取得できずに残ったものが溜まらないよう、history_size を超えたら古いものから捨てる。
+        """
+        observed = self._executions.setdefault(prompt_id, {})
+        while len(self._executions) > self.history_size:
+            del self._executions[next(iter(self._executions))]
+        return observed
+
+    def _handle(self, message: Dict[str, Any]) -> bool:
+        """websocket のメッセージを反映する（キューを取得し直す必要があれば True）"""
+        kind = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if kind == "progress":
+            self._progress = {
+                "prompt_id": prompt_id,
+                "node": data.get("node"),
+                "value": data.get("value"),
+                "max": data.get("max"),
+            }
+            self._broadcaster.publish(("progress", self._progress))
+            return False
+        if kind == "execution_start":
+            self._observe(prompt_id)["started_at"] = self._clock()
+            self._progress = None
+            return True
+        if kind in FINISHED_EVENTS or (kind == "executing" and data.get("node") is None):
+            if prompt_id and prompt_id not in self._history:
+                self._observe(prompt_id).setdefault("finished_at", self._clock())
+                self._history_dirty = True
+            self._progress = None
+            return True
+        return kind == "status"
+
+    async def _listen(self) -> None:
+        """websocket が閉じるか購読者がいなくなるまで通知を受け取る"""
+        parsed = urlparse(self.url)
+        scheme = "wss" if self._https else "ws"
+        url = f"{scheme}://{parsed.netloc}{parsed.path}/ws?clientId=cockpit-{uuid.uuid4().hex}"
+        connection = await asyncio.wait_for(websocket_connect(url), self._timeout)
+        self._connection = connection
+        self._mode = "websocket"
+        self._connected = True
+        self._history_dirty = True
+        try:
+            await self._poll()
+            while self.subscriber_count:
+                message = await connection.read_message()
+                if message is None:
+                    break
+                if isinstance(message, bytes):
+                    # 生成中のプレビュー画像
+                    continue
+                try:
+                    needs_refresh = self._handle(json.loads(message))
+                except (ValueError, AttributeError):
+                    continue
+                if needs_refresh:
+                    await self._poll()
+        finally:
+            connection.close()
+            self._connection = None
+            self._mode = "polling"
+            if self.subscriber_count:
+                # 購読者がいなくなって閉じた場合は、取得済みの状態は接続できていた時のもの
+                self._connected = False
+
+    async def _run(self) -> None:
+        backoff = self.RECONNECT_MIN
+        next_attempt = 0.0
+        try:
+            while self.subscriber_count:
+                if self.websocket and time.monotonic() >= next_attempt:
+                    try:
+                        await self._listen()
+                        backoff = self.RECONNECT_MIN
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.debug(f"Failed to connect to the ComfyUI websocket: {e}")
+                        backoff = min(backoff * 2, self.RECONNECT_MAX)
+                    next_attempt = time.monotonic() + backoff
+                    if not self.subscriber_count:
+                        break
+                await self._poll()
+                await asyncio.sleep(self.interval)
+        finally:
+            self._task = None
+
+    def _on_idle(self) -> None:
+        # 最後の購読者が離れたら websocket を閉じ、監視ループを終わらせる
+        if self._connection is not None:
+            self._connection.close()
+
+    def close(self) -> None:
+        self._broadcaster.close_all()
+        self._pool.clear()
+
+
+_monitor: Optional[PromptQueueMonitor] = None
+
+
+def get_prompt_queue_monitor() -> PromptQueueMonitor:
+    """共有の PromptQueueMonitor を返す（初回呼び出し時に作成する）"""
+    global _monitor
+    if _monitor is None:
+        _monitor = PromptQueueMonitor.from_config(Config())
+    return _monitor
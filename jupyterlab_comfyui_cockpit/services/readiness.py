@@ -0,0 +1,162 @@
+"""ComfyUI の HTTP API に問い合わせ、リクエストを受け付けられる状態かを調べる"""
+import asyncio
+import http.client
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+from urllib.parse import urlparse
+
+from ..config import Config
+from .metrics import cache_requests
+from .pool import ConnectionPool
+
+
+@dataclass
+class ReadinessResult:
+    """1回の問い合わせ結果"""
+
+    ready: bool
+    message: str
+    checked_at: float  # 問い合わせた時刻（UNIX 時間）
+    latency: Optional[float] = None  # 応答までの秒数（接続できなかった場合は None）
+
+
+class ReadinessProber:
+    """ComfyUI の /system_stats などに GET して応答するかを調べる
+
+    接続は keep-alive のままプールして再利用し、結果は全クライアントで共有する。
+    応答した後は ttl 秒ごと、応答しない間は min_backoff 秒から max_backoff 秒まで
+    間隔を倍にしながら問い合わせ、それ以外の時はキャッシュした結果を返す。
+    """
+
+    DEFAULT_URL = "http://127.0.0.1:8188"
+    DEFAULT_PATH = "/system_stats"
+
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        path: str = DEFAULT_PATH,
+        timeout: float = 2.0,
+        ttl: float = 2.0,
+        min_backoff: float = 0.5,
+        max_backoff: float = 5.0,
+        pool_size: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        parsed = urlparse(url)
+        self.url = url
+        self.path = path if path.startswith("/") else "/" + path
+        self._https = parsed.scheme == "https"
+        self._netloc = parsed.netloc
+        self._timeout = timeout
+        self._ttl = ttl
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._clock = clock
+        self._pool = ConnectionPool(
+            self._connect,
+            maxsize=pool_size,
+            close=lambda conn: conn.close(),
+            name="readiness_connections",
+        )
+        self._instance: Optional[Hashable] = None
+        self._result: Optional[ReadinessResult] = None
+        self._next_probe = 0.0
+        self._backoff = min_backoff
+        self._inflight: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "ReadinessProber":
+        return cls(
+            url=config.get("COMFYUI_COCKPIT_COMFYUI_URL", cls.DEFAULT_URL),
+            path=config.get("COMFYUI_COCKPIT_READINESS_PATH", cls.DEFAULT_PATH),
+            timeout=config.get_float("COMFYUI_COCKPIT_READINESS_TIMEOUT", 2.0),
+            ttl=config.get_float("COMFYUI_COCKPIT_READINESS_INTERVAL", 2.0),
+        )
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return connection_class(self._netloc, timeout=self._timeout)
+
+    def probe(self) -> ReadinessResult:
+        """同期的に1回問い合わせる"""
+        started = time.monotonic()
+        try:
+            with self._pool.connection() as conn:
+                conn.request("GET", self.path)
+                response = conn.getresponse()
+                # 本文を読み切らないと同じ接続を次のリクエストに使えない
+                response.read()
+        except (OSError, http.client.HTTPException) as e:
+            return ReadinessResult(False, f"{self.url}{self.path}: {e}", time.time())
+
+        latency = time.monotonic() - started
+        if 200 <= response.status < 300:
+            return ReadinessResult(True, "", time.time(), latency)
+        return ReadinessResult(False, f"{self.url}{self.path}: HTTP {response.status}", time.time(), latency)
+
+    async def check(self, instance: Optional[Hashable] = None) -> ReadinessResult:
+        """キャッシュ済みの結果を返す（問い合わせる時刻になっていれば問い合わせる）
+
+        instance にはプロセスの起動ごとに変わる値（pid など）を渡す。
+        値が変わったら前回の起動での結果とバックオフを破棄する。
+        """
+        if instance != self._instance:
+            self._instance = instance
+            self._result = None
+            self._next_probe = 0.0
+            self._backoff = self._min_backoff
+
+        if self._result is not None and self._clock() < self._next_probe:
+            cache_requests.inc("readiness", "hit")
+            return self._result
+        if self._inflight is None:
+            cache_requests.inc("readiness", "miss")
+            self._inflight = asyncio.ensure_future(self._probe(instance))
+        else:
+            cache_requests.inc("readiness", "shared")
+        # 呼び出し元がキャンセルされても共有中の問い合わせは継続させる
+        return await asyncio.shield(self._inflight)
+
+    async def _probe(self, instance: Optional[Hashable]) -> ReadinessResult:
+        inflight = self._inflight
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, self.probe)
+            if instance == self._instance:
+                if result.ready:
+                    self._backoff = self._min_backoff
+                    delay = self._ttl
+                else:
+                    delay = self._backoff
+                    self._backoff = min(self._backoff * 2, self._max_backoff)
+                self._result = result
+                self._next_probe = self._clock() + delay
+            return result
+        finally:
+            if self._inflight is inflight:
+                self._inflight = None
+
+    def close(self) -> None:
+        self._pool.clear()
+
+
+async def add_readiness(payload: Dict[str, Any], prober: ReadinessProber) -> Dict[str, Any]:
+    """ステータスに ready（ComfyUI がリクエストを受け付けられるか）を加える
+
+    supervisord 上で RUNNING でなければ問い合わせずに False とする。
+    """
+    if payload.get("status") != "running":
+        return {**payload, "ready": False, "ready_message": ""}
+    result = await prober.check(payload.get("pid"))
+    return {**payload, "ready": result.ready, "ready_message": result.message}
+
+
+_prober: Optional[ReadinessProber] = None
+
+
+def get_readiness_prober() -> ReadinessProber:
+    """共有の ReadinessProber を返す（初回呼び出し時に作成する）"""
+    global _prober
+    if _prober is None:
+        _prober = ReadinessProber.from_config(Config())
+    return _prober
@@ -0,0 +1,285 @@
+"""requirements.txt の比較と、差分だけを入れる pip インストール"""
+import hashlib
+import json
+import logging
+import shlex
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..config import Config
+from .commands import run_command
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_requirement(line: str) -> str:
+    """比較用に要件の表記を正規化する（パッケージ名の大小文字・区切り文字・空白の違いを吸収）"""
+    # packaging の import は重いため、バージョン切り替えで要件を比較するときまで遅らせる
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.utils import canonicalize_name
+
+    try:
+        requirement = Requirement(line)
+    except InvalidRequirement:
+        return line
+    requirement.name = canonicalize_name(requirement.name)
+    return str(requirement)
+
+
+@dataclass
+class RequirementSet:
+    """requirements.txt の内容（pip のオプション行と要件を分けて保持する）"""
+
+    requirements: List[str] = field(default_factory=list)
+    options: List[str] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, text: str) -> "RequirementSet":
+        requirements: List[str] = []
+        options: List[str] = []
+        for raw_line in text.splitlines():
+            line = raw_line.split(" #", 1)[0].strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("-"):
+                options.append(line)
+            else:
+                requirements.append(normalize_requirement(line))
+        return cls(sorted(set(requirements)), options)
+
+    @classmethod
+    def from_file(cls, path: Path) -> Optional["RequirementSet"]:
+        try:
+            return cls.parse(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    @property
+    def digest(self) -> str:
+        """内容のハッシュ（並び順や表記揺れに依存しない）"""
+        content = "\n".join(self.options + ["--"] + self.requirements)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def names(self) -> Dict[str, str]:
+        """{正規化したパッケージ名: 要件} の対応"""
+        from packaging.requirements import InvalidRequirement, Requirement
+        from packaging.utils import canonicalize_name
+
+        result = {}
+        for line in self.requirements:
+            try:
+                result[canonicalize_name(Requirement(line).name)] = line
+            except InvalidRequirement:
+                result[line] = line
+        return result
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {"requirements": self.requirements, "options": self.options}
+
+
+@dataclass
+class RequirementDiff:
+    """2つの RequirementSet の差分"""
+
+    changed: List[str]
+    removed: List[str]
+    options_changed: bool
+
+    @property
+    def empty(self) -> bool:
+        return not self.changed and not self.removed and not self.options_changed
+
+
+def diff_requirements(current: RequirementSet, target: RequirementSet) -> RequirementDiff:
+    """target で追加・変更された要件と、削除された要件を求める"""
+    current_names = current.names()
+    target_names = target.names()
+    changed = [line for name, line in target_names.items() if current_names.get(name) != line]
+    removed = [line for name, line in current_names.items() if name not in target_names]
+    return RequirementDiff(sorted(changed), sorted(removed), current.options != target.options)
+
+
+class RequirementsState:
+    """最後にインストールに成功した要件を記録するファイル"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> Optional[RequirementSet]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return RequirementSet(data.get("requirements", []), data.get("options", []))
+
+    def save(self, requirements: RequirementSet) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            data = {"digest": requirements.digest, **requirements.to_dict()}
+            self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Failed to save requirements state: {e}")
+
+
+@dataclass
+class InstallResult:
+    success: bool
+    message: str
+    installed: List[str] = field(default_factory=list)
+
+
+class PipInstaller:
+    """要件の差分だけを、ローカルの wheelhouse を優先してインストールする
+
+    インストールする wheel と、置き換えられる（切り替え前のバージョンの）要件の wheel を wheelhouse に残すため、
+    以前使ったバージョンへ戻す時はパッケージインデックスへのアクセスが不要になる。
+    """
+
+    TIMEOUT = 300
+
+    def __init__(self, pip_command: Sequence[str], wheelhouse: Path, state: RequirementsState):
+        self.pip_command = list(pip_command)
+        self.wheelhouse = wheelhouse
+        self.state = state
+
+    @classmethod
+    def from_config(cls, config: Config) -> "PipInstaller":
+        cache_dir = config.cache_dir
+        wheelhouse = config.get("COMFYUI_COCKPIT_WHEELHOUSE") or str(cache_dir / "wheelhouse")
+        return cls(
+            shlex.split(config.get("COMFYUI_COCKPIT_PIP", "pip")),
+            Path(wheelhouse),
+            RequirementsState(cache_dir / "requirements-state.json"),
+        )
+
+    async def sync(
+        self,
+        current: Optional[RequirementSet],
+        target: RequirementSet,
+        on_line: Optional[Callable[[str], None]] = None,
+    ) -> InstallResult:
+        """current から target への切り替えに必要な要件だけをインストールする
+
+        前回インストールに成功した記録があれば、current よりもそちらを信頼する。
+        """
+        log = on_line or (lambda line: None)
+        installed = self.state.load() or current
+
+        if installed is not None and installed.digest == target.digest:
+            return InstallResult(True, f"Requirements unchanged ({target.digest[:12]}); skipped pip")
+
+        if installed is None:
+            specs = target.requirements
+        else:
+            diff = diff_requirements(installed, target)
+            specs = target.requirements if diff.options_changed else diff.changed
+            if diff.removed:
+                log(f"No longer required (left installed): {', '.join(diff.removed)}")
+            if not specs:
+                self.state.save(target)
+                return InstallResult(True, "No new or changed requirements; skipped pip")
+
+        if installed is not None:
+            # 元のバージョンへ戻す時にオフラインでインストールできるよう、置き換えられる要件の wheel を残しておく
+            await self._cache_outgoing(installed, target, log)
+
+        log(f"Installing {len(specs)} requirement(s): {', '.join(specs)}")
+        options = [arg for line in target.options for arg in shlex.split(line)]
+        success = await self._install(specs, options, log)
+        if not success:
+            return InstallResult(False, "pip install failed", specs)
+
+        self.state.save(target)
+        return InstallResult(True, f"Installed {len(specs)} changed requirement(s)", specs)
+
+    async def prefetch(
+        self,
+        target: RequirementSet,
+        on_line: Optional[Callable[[str], None]] = None,
+    ) -> InstallResult:
+        """target に必要な wheel を wheelhouse に用意する（インストールはしない）
+
+        ステージング中のバージョンは稼働中の環境に影響を与えないよう、
+        wheel の取得だけを先に済ませておき、切り替え時にオフラインでインストールする。
+        置き換えられる要件の wheel もここで用意し、切り替え時にインデックスへアクセスしないようにする。
+        """
+        log = on_line or (lambda line: None)
+        installed = self.state.load()
+        if installed is None:
+            specs = target.requirements
+        else:
+            diff = diff_requirements(installed, target)
+            specs = target.requirements if diff.options_changed else diff.changed
+            await self._cache_outgoing(installed, target, log)
+        if not specs:
+            return InstallResult(True, "Requirements already installed; nothing to prefetch")
+
+        self.wheelhouse.mkdir(parents=True, exist_ok=True)
+        log(f"Prefetching {len(specs)} requirement(s) into local wheelhouse: {', '.join(specs)}")
+        options = [arg for line in target.options for arg in shlex.split(line)]
+        result = await run_command(self._wheel_command(specs, options), timeout=self.TIMEOUT, on_line=log)
+        if result.returncode != 0:
+            logger.warning(f"Pip wheel failed: {result.stderr.strip()}")
+            return InstallResult(False, "pip wheel failed", specs)
+        return InstallResult(True, f"Prefetched {len(specs)} requirement(s)", specs)
+
+    async def _cache_outgoing(self, installed: RequirementSet, target: RequirementSet, log: Callable[[str], None]) -> None:
+        """installed のうち target で変更・削除される要件の wheel を wheelhouse に用意する
+
+        すでに wheelhouse にあればインデックスにはアクセスしない。失敗しても切り替えは続ける。
+        """
+        specs = diff_requirements(target, installed).changed
+        if not specs:
+            return
+        options = [arg for line in installed.options for arg in shlex.split(line)]
+        self.wheelhouse.mkdir(parents=True, exist_ok=True)
+        try:
+            result = await run_command(self._wheel_command(specs, ["--no-index", *options]), timeout=self.TIMEOUT)
+            if result.returncode == 0:
+                return
+            log(f"Caching {len(specs)} outgoing requirement(s) for switching back: {', '.join(specs)}")
+            result = await run_command(self._wheel_command(specs, options), timeout=self.TIMEOUT, on_line=log)
+        except Exception as e:
+            logger.warning(f"Failed to cache outgoing requirements: {e}")
+            return
+        if result.returncode != 0:
+            logger.warning(f"Pip wheel of outgoing requirements failed: {result.stderr.strip()}")
+            log("Could not cache the outgoing requirements; switching back may need the package index")
+
+    def _wheel_command(self, specs: List[str], options: List[str]) -> List[str]:
+        wheelhouse = str(self.wheelhouse)
+        return self.pip_command + ["wheel", "--wheel-dir", wheelhouse, "--find-links", wheelhouse, *options, *specs]
+
+    async def _install(self, specs: List[str], options: List[str], log: Callable[[str], None]) -> bool:
+        wheelhouse = str(self.wheelhouse)
+        offline = self.pip_command + ["install", "--no-index", "--find-links", wheelhouse, *options, *specs]
+
+        # wheelhouse だけで揃えば、インデックスにはアクセスしない
+        result = await run_command(offline, timeout=self.TIMEOUT)
+        if result.returncode == 0:
+            log("Installed from local wheelhouse")
+            return True
+
+        self.wheelhouse.mkdir(parents=True, exist_ok=True)
+        log("Fetching wheels into local wheelhouse...")
+        wheel_result = await run_command(
+            self._wheel_command(specs, options),
+            timeout=self.TIMEOUT,
+            on_line=log,
+        )
+        if wheel_result.returncode == 0:
+            result = await run_command(offline, timeout=self.TIMEOUT, on_line=log)
+            if result.returncode == 0:
+                return True
+
+        # wheel を作れないパッケージなどは通常のインストールにフォールバックする
+        log("Falling back to pip install from the package index...")
+        result = await run_command(
+            self.pip_command + ["install", *options, *specs],
+            timeout=self.TIMEOUT,
+            on_line=log,
+        )
+        if result.returncode != 0:
+            logger.warning(f"Pip install failed: {result.stderr.strip()}")
+        return result.returncode == 0
@@ -0,0 +1,335 @@
+"""/proc から ComfyUI のプロセスツリーの資源使用量を定期的に採取する"""
+import asyncio
+import logging
+import math
+import os
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# リングバッファに保持する値（いずれも採取時点の値、または前回からの変化率）
+SAMPLE_FIELDS = ("cpu_percent", "rss", "threads", "fds", "read_rate", "write_rate", "processes")
+# ダウンサンプリング時に平均値とは別に最大値も返す値
+PEAK_FIELDS = ("cpu_percent", "rss")
+
+
+@dataclass
+class ProcStat:
+    """1プロセス分の /proc/<pid> の値"""
+
+    pid: int
+    ppid: int
+    cpu_seconds: float
+    rss: int
+    threads: int
+    fds: Optional[int]
+    read_bytes: Optional[int]
+    write_bytes: Optional[int]
+
+
+def read_proc_stat(pid: int, proc_root: Path = Path("/proc")) -> ProcStat:
+    """/proc/<pid>/stat・fd・io を読む（権限がなく読めない項目は None）"""
+    base = proc_root / str(pid)
+    content = (base / "stat").read_text()
+    # comm（2番目の項目）は空白や括弧を含みうるので、最後の ')' 以降を分割する
+    fields = content[content.rindex(")") + 2:].split()
+    utime, stime = int(fields[11]), int(fields[12])
+
+    try:
+        fds: Optional[int] = len(os.listdir(base / "fd"))
+    except OSError:
+        fds = None
+
+    read_bytes = write_bytes = None
+    try:
+        for line in (base / "io").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key == "read_bytes":
+                read_bytes = int(value)
+            elif key == "write_bytes":
+                write_bytes = int(value)
+    except OSError:
+        pass
+
+    return ProcStat(
+        pid=pid,
+        ppid=int(fields[1]),
+        cpu_seconds=(utime + stime) / _CLOCK_TICKS,
+        rss=int(fields[21]) * _PAGE_SIZE,
+        threads=int(fields[17]),
+        fds=fds,
+        read_bytes=read_bytes,
+        write_bytes=write_bytes,
+    )
+
+
+def _child_pids(pid: int, proc_root: Path) -> Optional[List[int]]:
+    """/proc/<pid>/task/*/children から子プロセスを得る（カーネルが未対応なら None）"""
+    children: List[int] = []
+    try:
+        tasks = os.listdir(proc_root / str(pid) / "task")
+    except OSError:
+        return []
+    for tid in tasks:
+        try:
+            content = (proc_root / str(pid) / "task" / tid / "children").read_text()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            continue
+        children.extend(int(child) for child in content.split())
+    return children
+
+
+def _scan_parent_map(proc_root: Path) -> Dict[int, List[int]]:
+    """全プロセスの stat を読んで {親 PID: [子 PID]} を作る"""
+    parents: Dict[int, List[int]] = {}
+    for entry in os.listdir(proc_root):
+        if not entry.isdigit():
+            continue
+        try:
+            content = (proc_root / entry / "stat").read_text()
+        except OSError:
+            continue
+        ppid = int(content[content.rindex(")") + 2:].split()[1])
+        parents.setdefault(ppid, []).append(int(entry))
+    return parents
+
+
+def process_tree(pid: int, proc_root: Path = Path("/proc")) -> List[int]:
+    """pid とその子孫の PID"""
+    tree = [pid]
+    parents: Optional[Dict[int, List[int]]] = None
+    index = 0
+    while index < len(tree):
+        current = tree[index]
+        index += 1
+        children = _child_pids(current, proc_root) if parents is None else None
+        if children is None:
+            if parents is None:
+                parents = _scan_parent_map(proc_root)
+            children = parents.get(current, [])
+        tree.extend(child for child in children if child not in tree)
+    return tree
+
+
+class SampleRingBuffer:
+    """固定長の配列に時系列を保持するリングバッファ（古いサンプルから上書きする）"""
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._columns = {field: array("d", [math.nan]) * capacity for field in self.fields}
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _slot(self, position: int) -> int:
+        """古い順で position 番目のサンプルが入っている添字"""
+        return (self._next - self._count + position) % self.capacity
+
+    def append(self, timestamp: float, values: Dict[str, Optional[float]]) -> None:
+        slot = self._next
+        self._times[slot] = timestamp
+        for field in self.fields:
+            value = values.get(field)
+            self._columns[field][slot] = math.nan if value is None else float(value)
+        self._next = (slot + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def latest(self) -> Optional[Dict[str, Optional[float]]]:
+        if not self._count:
+            return None
+        slot = self._slot(self._count - 1)
+        sample: Dict[str, Optional[float]] = {"t": self._times[slot]}
+        for field in self.fields:
+            value = self._columns[field][slot]
+            sample[field] = None if math.isnan(value) else value
+        return sample
+
+    def _bisect(self, timestamp: float) -> int:
+        """時刻が timestamp 以上になる最初の位置（時刻は古い順に単調増加）"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[self._slot(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def downsample(self, since: float, until: float, points: int) -> Dict[str, List[Optional[float]]]:
+        """[since, until) を points 個の区間に分け、区間ごとの平均（と最大値）を返す
+
+        サンプルのない区間は省略する。
+        """
+        points = max(1, points)
+        width = (until - since) / points
+        sums = {field: [0.0] * points for field in self.fields}
+        counts = {field: [0] * points for field in self.fields}
+        peaks = {field: [-math.inf] * points for field in PEAK_FIELDS if field in self.fields}
+        present = [False] * points
+
+        for position in range(self._bisect(since), self._bisect(until)):
+            slot = self._slot(position)
+            bucket = min(points - 1, int((self._times[slot] - since) / width)) if width > 0 else 0
+            present[bucket] = True
+            for field in self.fields:
+                value = self._columns[field][slot]
+                if math.isnan(value):
+                    continue
+                sums[field][bucket] += value
+                counts[field][bucket] += 1
+                if field in peaks and value > peaks[field][bucket]:
+                    peaks[field][bucket] = value
+
+        buckets = [bucket for bucket in range(points) if present[bucket]]
+        series: Dict[str, List[Optional[float]]] = {
+            "t": [since + (bucket + 0.5) * width for bucket in buckets],
+        }
+        for field in self.fields:
+            series[field] = [
+                sums[field][bucket] / counts[field][bucket] if counts[field][bucket] else None
+                for bucket in buckets
+            ]
+        for field, values in peaks.items():
+            series[f"{field}_max"] = [values[bucket] if counts[field][bucket] else None for bucket in buckets]
+        return series
+
+
+class ResourceSampler:
+    """ComfyUI のプロセスツリーの資源使用量を interval 秒ごとに採取する
+
+    CPU 使用率と I/O は前回の採取からの差分を経過時間で割った値を記録する。
+    """
+
+    DEFAULT_INTERVAL = 5.0
+    DEFAULT_CAPACITY = 17280  # 5秒間隔で24時間分
+
+    def __init__(
+        self,
+        fetch_pid: Callable[[], Awaitable[Optional[int]]],
+        interval: Optional[float] = None,
+        capacity: Optional[int] = None,
+        proc_root: Path = Path("/proc"),
+        clock: Callable[[], float] = time.time,
+    ):
+        self._fetch_pid = fetch_pid
+        self._interval = interval
+        self._capacity = capacity
+        self._proc_root = proc_root
+        self._clock = clock
+        self._buffer: Optional[SampleRingBuffer] = None
+        self._previous: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.pid: Optional[int] = None
+
+    @property
+    def interval(self) -> float:
+        if self._interval is not None:
+            return self._interval
+        return Config().get_float("COMFYUI_COCKPIT_SAMPLE_INTERVAL", self.DEFAULT_INTERVAL)
+
+    @property
+    def buffer(self) -> SampleRingBuffer:
+        if self._buffer is None:
+            capacity = self._capacity or Config().get_int("COMFYUI_COCKPIT_SAMPLE_CAPACITY", self.DEFAULT_CAPACITY)
+            self._buffer = SampleRingBuffer(SAMPLE_FIELDS, max(1, capacity))
+        return self._buffer
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """採取ループを開始する（間隔が 0 以下なら何もしない）"""
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def collect(self, pid: int) -> Dict[str, float]:
+        """pid を根とするプロセスツリーの合計値（累積値を含む）"""
+        totals = {"cpu_seconds": 0.0, "rss": 0, "threads": 0, "processes": 0}
+        optional: Dict[str, Optional[int]] = {"fds": 0, "read_bytes": 0, "write_bytes": 0}
+        for tree_pid in process_tree(pid, self._proc_root):
+            try:
+                stat = read_proc_stat(tree_pid, self._proc_root)
+            except (OSError, ValueError, IndexError):
+                # 読み取り中に終了したプロセスは数えない
+                continue
+            totals["cpu_seconds"] += stat.cpu_seconds
+            totals["rss"] += stat.rss
+            totals["threads"] += stat.threads
+            totals["processes"] += 1
+            for key in optional:
+                value = getattr(stat, key)
+                optional[key] = None if value is None or optional[key] is None else optional[key] + value
+        if not totals["processes"]:
+            raise ProcessLookupError(pid)
+        return {**totals, **optional}
+
+    def sample(self, pid: int) -> Dict[str, Optional[float]]:
+        """1回採取してリングバッファに追加する"""
+        now = self._clock()
+        current = self.collect(pid)
+        current["t"] = now
+
+        values: Dict[str, Optional[float]] = {
+            "rss": current["rss"],
+            "threads": current["threads"],
+            "fds": current["fds"],
+            "processes": current["processes"],
+            "cpu_percent": None,
+            "read_rate": None,
+            "write_rate": None,
+        }
+        previous = self._previous
+        if previous is not None and previous["pid"] == pid and now > previous["t"]:
+            elapsed = now - previous["t"]
+            # 子プロセスが終了すると合計が減るため、負の差分は 0 とみなす
+            values["cpu_percent"] = max(0.0, current["cpu_seconds"] - previous["cpu_seconds"]) / elapsed * 100
+            for key, rate in (("read_bytes", "read_rate"), ("write_bytes", "write_rate")):
+                if current[key] is not None and previous[key] is not None:
+                    values[rate] = max(0, current[key] - previous[key]) / elapsed
+        self._previous = {**current, "pid": pid}
+        self.buffer.append(now, values)
+        return values
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                pid = await self._fetch_pid()
+                self.pid = pid
+                if pid:
+                    await asyncio.get_running_loop().run_in_executor(None, self.sample, pid)
+                else:
+                    self._previous = None
+            except ProcessLookupError:
+                self._previous = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Failed to sample process resources: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def series(self, window: float, points: int) -> Dict[str, List[Optional[float]]]:
+        """直近 window 秒を points 個に間引いた時系列"""
+        now = self._clock()
+        return self.buffer.downsample(now - window, now + 1e-6, points)
@@ -0,0 +1,272 @@
+"""バージョンごとの git worktree を事前に用意し、シンボリックリンクの張り替えで切り替える
+
+COMFYUI_PATH をステージングディレクトリ内の worktree を指すシンボリックリンクにしておくと、
+切り替え先のバージョンは稼働中の ComfyUI に触れずにバックグラウンドで準備でき、
+切り替えそのものはリンクの置き換え（os.replace による原子的な操作）と1回の再起動で済む。
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..config import Config
+from .commands import run_command
+from .git_refs import GitRepository, get_version_metadata
+from .requirements import PipInstaller, RequirementSet
+from .version_jobs import StepFailed, VersionSwitcher, VersionSwitchJob
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StagedVersion:
+    """ステージングディレクトリ内の worktree"""
+
+    version: Optional[str]
+    path: Path
+    active: bool = False
+    previous: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": str(self.path),
+            "active": self.active,
+            "previous": self.previous,
+        }
+
+
+class StagingArea:
+    """COMFYUI_PATH（シンボリックリンク）と、その参照先になる worktree 群を管理する"""
+
+    GIT_TIMEOUT = 120
+    STATE_FILE = ".cockpit-staging.json"
+
+    def __init__(self, comfyui_path: Path, staging_dir: Path):
+        self.comfyui_path = Path(comfyui_path)
+        self.staging_dir = Path(os.path.abspath(staging_dir))
+
+    @classmethod
+    def from_config(cls, config: Config) -> Optional["StagingArea"]:
+        """COMFYUI_COCKPIT_STAGING_DIR が設定されていなければ None"""
+        staging_dir = config.get("COMFYUI_COCKPIT_STAGING_DIR")
+        if not staging_dir:
+            return None
+        return cls(Path(config.get("COMFYUI_PATH", "/opt/app/ComfyUI")), Path(staging_dir))
+
+    @property
+    def enabled(self) -> bool:
+        """COMFYUI_PATH がシンボリックリンクの場合だけ張り替えで切り替えられる"""
+        return self.comfyui_path.is_symlink()
+
+    def current_target(self) -> Optional[Path]:
+        """COMFYUI_PATH が現在指しているディレクトリ"""
+        try:
+            target = Path(os.readlink(self.comfyui_path))
+        except OSError:
+            return None
+        if not target.is_absolute():
+            target = self.comfyui_path.parent / target
+        return Path(os.path.normpath(target))
+
+    def previous_target(self) -> Optional[Path]:
+        """直前に COMFYUI_PATH が指していたディレクトリ（ロールバック先）"""
+        try:
+            data = json.loads((self.staging_dir / self.STATE_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        previous = data.get("previous")
+        if not previous or not Path(previous).is_dir():
+            return None
+        return Path(previous)
+
+    def _save_previous(self, previous: Path) -> None:
+        try:
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            (self.staging_dir / self.STATE_FILE).write_text(
+                json.dumps({"previous": str(previous)}), encoding="utf-8"
+            )
+        except OSError as e:
+            logger.warning(f"Failed to save staging state: {e}")
+
+    def worktree_path(self, version: str) -> Path:
+        return self.staging_dir / version.replace("/", "_")
+
+    def version_of(self, path: Path) -> Optional[str]:
+        """worktree の HEAD が指すタグ（タグ以外ならディレクトリ名）"""
+        return get_version_metadata(path).head_tag() or path.name
+
+    def staged(self) -> List[StagedVersion]:
+        """ステージ済みの worktree の一覧"""
+        current = self.current_target()
+        previous = self.previous_target()
+        result = []
+        try:
+            entries = sorted(os.scandir(self.staging_dir), key=lambda entry: entry.name)
+        except OSError:
+            return result
+        for entry in entries:
+            path = Path(entry.path)
+            if not entry.is_dir() or not (path / ".git").is_file():
+                continue
+            result.append(StagedVersion(
+                self.version_of(path),
+                path,
+                active=path == current,
+                previous=path == previous,
+            ))
+        return result
+
+    async def prepare(self, version: str, log: Callable[[str], None]) -> Path:
+        """version をチェックアウトした worktree を用意してそのパスを返す
+
+        既に同じコミットの worktree があればそのまま再利用する。
+        """
+        tag = GitRepository(self.comfyui_path).tags().get(version)
+        if tag is None:
+            raise StepFailed(f"Unknown version: {version}")
+
+        path = self.worktree_path(version)
+        worktree = GitRepository(path)
+        if worktree.exists:
+            if worktree.head() == tag.commit:
+                log(f"Reusing staged worktree {path}")
+                return path
+            if path == self.current_target():
+                raise StepFailed(f"Cannot re-stage the active worktree: {path}")
+            log(f"Updating staged worktree {path}...")
+            command = ["git", "-C", str(path), "checkout", "--detach", version]
+        else:
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            log(f"Creating worktree {path}...")
+            command = ["git", "-C", str(self.comfyui_path), "worktree", "add", "--detach", str(path), version]
+
+        result = await run_command(command, timeout=self.GIT_TIMEOUT, on_line=log)
+        if result.returncode != 0:
+            raise StepFailed(f"Failed to stage version: {result.stderr.strip()}")
+        return path
+
+    def swap(self, target: Path) -> Optional[Path]:
+        """COMFYUI_PATH を target へのシンボリックリンクに置き換え、直前の参照先を返す
+
+        一時的なリンクを作ってから os.replace で置き換えるため、
+        COMFYUI_PATH が存在しない瞬間はない。
+        """
+        if not self.enabled:
+            raise StepFailed(f"COMFYUI_PATH must be a symlink to use staging mode: {self.comfyui_path}")
+        current = self.current_target()
+        temporary = self.comfyui_path.with_name(f".{self.comfyui_path.name}.swap-{os.getpid()}")
+        if temporary.is_symlink():
+            temporary.unlink()
+        os.symlink(target, temporary)
+        os.replace(temporary, self.comfyui_path)
+        if current is not None and current != target:
+            self._save_previous(current)
+        return current
+
+    async def remove(self, version: str) -> Tuple[bool, str]:
+        """使わなくなった worktree を削除する（稼働中・ロールバック先は削除しない）"""
+        path = self.worktree_path(version)
+        if not GitRepository(path).exists:
+            return False, f"Version {version} is not staged"
+        if path in (self.current_target(), self.previous_target()):
+            return False, f"Cannot remove the active or rollback worktree: {path}"
+        result = await run_command(
+            ["git", "-C", str(self.comfyui_path), "worktree", "remove", "--force", str(path)],
+            timeout=self.GIT_TIMEOUT,
+        )
+        if result.returncode != 0:
+            return False, f"Failed to remove worktree: {result.stderr.strip()}"
+        return True, f"Removed staged version {version}"
+
+
+class StagePreparer:
+    """worktree の作成と wheel の事前取得だけを行う（稼働中の ComfyUI には触れない）"""
+
+    kind = "stage"
+    steps = ("worktree", "wheels")
+
+    def __init__(self, staging: StagingArea, installer: PipInstaller):
+        self.staging = staging
+        self.installer = installer
+
+    async def run(self, job: VersionSwitchJob) -> Dict[str, Any]:
+        target_version = job.target_version
+
+        async with job.step("worktree"):
+            path = await self.staging.prepare(target_version, job.log)
+
+        async with job.step("wheels") as step:
+            requirements = RequirementSet.from_file(path / "requirements.txt")
+            if requirements is None:
+                step.status = "skipped"
+                step.message = "requirements.txt not found"
+            else:
+                result = await self.installer.prefetch(requirements, on_line=job.log)
+                step.message = result.message
+                if not result.success:
+                    # 切り替え時に通常のインストールへフォールバックできるため失敗扱いにはしない
+                    step.status = "warning"
+                elif not result.installed:
+                    step.status = "skipped"
+
+        return {
+            "success": True,
+            "message": f"Version {target_version} is staged at {path}",
+            "version": target_version,
+        }
+
+
+class StagedVersionSwitcher(VersionSwitcher):
+    """ステージ済みの worktree へ COMFYUI_PATH を張り替えてから1回だけ再起動する
+
+    worktree の作成（と wheel の取得）は稼働中の ComfyUI に影響しないが、依存関係は稼働中の環境と
+    同じ site-packages にインストールするため、"deps" は稼働中の ComfyUI に影響する。
+    そのため依存関係のインストールはリンクの張り替えの後、再起動の直前に行い、
+    古いバージョンが新しいパッケージで動く時間を最短にする（wheel は取得済みなのでオフラインで済む）。
+    target_path を指定した場合はステージをせずにそのディレクトリへ切り替える（ロールバック用）。
+    """
+
+    def __init__(
+        self,
+        staging: StagingArea,
+        installer: PipInstaller,
+        service_names: Optional[Sequence[str]] = None,
+        target_path: Optional[Path] = None,
+    ):
+        super().__init__(staging.comfyui_path, installer, service_names)
+        self.staging = staging
+        self.target_path = target_path
+        if target_path is None:
+            self.kind = "switch"
+            self.steps = ("stage", "swap", "deps", "restart")
+        else:
+            self.kind = "rollback"
+            self.steps = ("swap", "deps", "restart")
+
+    async def run(self, job: VersionSwitchJob) -> Dict[str, Any]:
+        target_version = job.target_version
+        previous_requirements = RequirementSet.from_file(self.comfyui_path / "requirements.txt")
+
+        target_path = self.target_path
+        if target_path is None:
+            async with job.step("stage"):
+                target_path = await self.staging.prepare(target_version, job.log)
+
+        async with job.step("swap"):
+            previous = self.staging.swap(target_path)
+            job.log(f"{self.comfyui_path} -> {target_path} (was {previous})")
+
+        # ここからは稼働中の環境を変更するため、再起動までの間を空けない
+        async with job.step("deps") as step:
+            await self.update_dependencies(job, step, previous_requirements, source=target_path)
+
+        await self.restart(job)
+
+        return {
+            "success": True,
+            "message": f"Successfully switched to version {target_version} and restarted ComfyUI",
+            "version": target_version,
+        }
@@ -0,0 +1,144 @@
+"""プロセス状態の取得とキャッシュ"""
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..config import Config
+from .events import process_event_store
+from .metrics import cache_requests
+from .supervisor import get_supervisor
+
+
+def combine_payloads(programs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """プログラムごとの状態を1つの応答にまとめる
+
+    先頭（主となる ComfyUI）の状態はトップレベルにも置き、単一プログラムの頃の応答と互換にする。
+    """
+    payload = {key: value for key, value in programs[0].items() if key != "name"}
+    payload["programs"] = programs
+    return payload
+
+
+def state_etag(state: Dict[str, Any]) -> str:
+    """状態の ETag（内容が変わったときだけ変わる）
+
+    起動中のプログラムの message には supervisord の "uptime 0:01:23" が含まれ毎秒変わるため、
+    start（起動時刻）がある場合は message を除いて計算する（経過時間は UI が start から求める）。
+    """
+
+    def strip_uptime(program: Dict[str, Any]) -> Dict[str, Any]:
+        if program.get("start"):
+            return {key: value for key, value in program.items() if key != "message"}
+        return program
+
+    def view(value: Any) -> Any:
+        if isinstance(value, dict):
+            if "programs" in value and isinstance(value["programs"], list):
+                value = {**strip_uptime(value), "programs": [strip_uptime(program) for program in value["programs"]]}
+            return {key: view(item) for key, item in value.items()}
+        return value
+
+    digest = hashlib.sha1(json.dumps(view(state), sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+class ProcessStatusCache:
+    """プロセス状態を短いTTLでキャッシュし、同時リクエストを1回の取得にまとめる
+
+    TTL内のリクエストはキャッシュから返し、取得中に来たリクエストは
+    実行中の取得結果を共有するため、N件の同時ポーリングでも
+    supervisord への問い合わせは1回で済む。
+    """
+
+    DEFAULT_TTL = 1.0
+
+    def __init__(
+        self,
+        programs: Optional[Sequence[str]] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._programs = list(programs) if programs else None
+        self._ttl = ttl
+        self._clock = clock
+        self._payload: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._generation = 0
+        self._inflight: Optional[asyncio.Future] = None
+
+    @property
+    def programs(self) -> List[str]:
+        """状態を取得するプログラム（未指定なら COMFYUI_COCKPIT_PROGRAMS）"""
+        return self._programs or Config().programs
+
+    @property
+    def ttl(self) -> float:
+        """キャッシュの有効期間（秒）"""
+        if self._ttl is not None:
+            return self._ttl
+        return Config().get_float("COMFYUI_COCKPIT_STATUS_TTL", self.DEFAULT_TTL)
+
+    async def get(self) -> Dict[str, Any]:
+        """キャッシュ済みのステータスを返す（期限切れなら再取得する）"""
+        # eventlistener の状態があればサブプロセスを使わずに返す
+        payload = self._event_payload()
+        if payload is not None:
+            cache_requests.inc("process_status", "hit")
+            return payload
+
+        if self._payload is not None and self._clock() - self._fetched_at < self.ttl:
+            cache_requests.inc("process_status", "hit")
+            return self._payload
+
+        if self._inflight is None:
+            cache_requests.inc("process_status", "miss")
+            self._inflight = asyncio.ensure_future(self._refresh(self._generation))
+        else:
+            cache_requests.inc("process_status", "shared")
+        # 呼び出し元がキャンセルされても共有中の取得は継続させる
+        return await asyncio.shield(self._inflight)
+
+    def _event_payload(self) -> Optional[Dict[str, Any]]:
+        programs = []
+        for name in self.programs:
+            payload = process_event_store.payload(name)
+            if payload is None:
+                return None
+            programs.append({"name": name, **payload})
+        return combine_payloads(programs)
+
+    def invalidate(self) -> None:
+        """キャッシュを破棄する（プロセス操作の直後などに呼ぶ）"""
+        self._generation += 1
+        self._payload = None
+        self._inflight = None
+
+    async def _refresh(self, generation: int) -> Dict[str, Any]:
+        inflight = self._inflight
+        try:
+            payload = await self._collect()
+            # 取得中に invalidate された場合、古い結果はキャッシュしない
+            if generation == self._generation:
+                self._payload = payload
+                self._fetched_at = self._clock()
+                for program in payload.get("programs", []):
+                    process_event_store.seed(program["name"], program)
+            return payload
+        finally:
+            if self._inflight is inflight:
+                self._inflight = None
+
+    async def _collect(self) -> Dict[str, Any]:
+        names = self.programs
+        supervisor = get_supervisor()
+        if len(names) == 1:
+            infos = {names[0]: await supervisor.get_process_info(names[0])}
+        else:
+            # プログラムの数によらず問い合わせは1回にまとめる
+            infos = await supervisor.get_all_process_info(names)
+        return combine_payloads([{"name": name, **infos[name].to_payload()} for name in names])
+
+
+process_status_cache = ProcessStatusCache()
@@ -0,0 +1,408 @@
+"""supervisord との通信（XML-RPC クライアントと supervisorctl フォールバック）"""
+import asyncio
+import http.client
+import logging
+import os
+import re
+import socket
+import time
+import xmlrpc.client
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlparse
+
+from ..config import Config
+from .commands import run_command
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# URL 未設定時に探索する supervisord の unix ソケット
+DEFAULT_SOCKET_PATHS = (
+    "/var/run/supervisor.sock",
+    "/run/supervisor.sock",
+    "/tmp/supervisor.sock",
+)
+
+# supervisord の状態名から cockpit のステータスへの対応
+_STATUS_BY_STATENAME = {
+    "RUNNING": "running",
+    "STARTING": "starting",
+    "BACKOFF": "error",
+    "FATAL": "error",
+}
+
+# supervisor.xmlrpc.Faults のうち、supervisorctl と同じ文言で表示するもの
+_FAULT_TEXT = {
+    10: "no such process",
+    40: "abnormal termination",
+    50: "spawn error",
+    60: "already started",
+    70: "not running",
+}
+FAULT_BAD_NAME = 10
+FAULT_ALREADY_STARTED = 60
+FAULT_NOT_RUNNING = 70
+
+_STATUS_LINE_RE = re.compile(r"^(\S+)\s+([A-Z]+)\b\s*(.*)$")
+_PID_RE = re.compile(r"pid (\d+)")
+_UPTIME_RE = re.compile(r"uptime (?:(\d+) days?, )?(\d+):(\d+):(\d+)")
+
+
+class SupervisorError(Exception):
+    """supervisord の操作に失敗した場合のエラー"""
+
+
+class SupervisorUnavailable(SupervisorError):
+    """supervisord に接続できない場合のエラー"""
+
+
+class SupervisorFault(SupervisorError):
+    """supervisord が XML-RPC の Fault を返した場合のエラー"""
+
+    def __init__(self, code: int, text: str):
+        super().__init__(text)
+        self.code = code
+        self.text = _FAULT_TEXT.get(code, text)
+
+
+@dataclass
+class ProcessInfo:
+    """supervisord が管理するプログラムの状態"""
+
+    name: str
+    statename: str
+    description: str = ""
+    pid: Optional[int] = None
+    start: Optional[float] = None
+    exitstatus: Optional[int] = None
+    output: Optional[str] = None
+    stdout_logfile: Optional[str] = None
+    stderr_logfile: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        """cockpit のステータス（running / starting / error / stopped）"""
+        return _STATUS_BY_STATENAME.get(self.statename, "stopped")
+
+    @property
+    def message(self) -> str:
+        """supervisorctl status と同じ形式のメッセージ"""
+        if self.output is not None:
+            return self.output
+        return f"{self.name:<32} {self.statename:<10} {self.description}".rstrip()
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "message": self.message,
+            "state": self.statename,
+            "pid": self.pid,
+            "start": self.start,
+            "exitstatus": self.exitstatus,
+        }
+
+    @classmethod
+    def missing(cls, name: str) -> "ProcessInfo":
+        """supervisord に存在しないプログラム"""
+        return cls(name=name, statename="UNKNOWN", output=f"{name}: ERROR (no such process)")
+
+    @classmethod
+    def from_rpc(cls, info: Dict[str, Any]) -> "ProcessInfo":
+        """supervisor.getProcessInfo の戻り値から作成する"""
+        running = info.get("statename") in ("RUNNING", "STOPPING")
+        return cls(
+            name=rpc_process_name(info),
+            statename=info.get("statename", "UNKNOWN"),
+            description=info.get("description", ""),
+            pid=info.get("pid") or None,
+            start=float(info["start"]) if running and info.get("start") else None,
+            exitstatus=info.get("exitstatus"),
+            stdout_logfile=info.get("stdout_logfile") or None,
+            stderr_logfile=info.get("stderr_logfile") or None,
+        )
+
+
+def rpc_process_name(info: Dict[str, Any]) -> str:
+    """supervisorctl と同じ表記のプログラム名（グループ内のプロセスは group:name）"""
+    name = info.get("name", "")
+    group = info.get("group")
+    if group and group != name:
+        return f"{group}:{name}"
+    return name
+
+
+def parse_status_line(output: str, name: str = "") -> ProcessInfo:
+    """supervisorctl status の1行を ProcessInfo に変換する"""
+    # supervisorctl status output example: "comfyui RUNNING   pid 12345, uptime 0:00:10"
+    # or "comfyui STOPPED   Dec 05 12:00 PM"
+    match = _STATUS_LINE_RE.match(output)
+    if not match:
+        return ProcessInfo(name=name, statename="UNKNOWN", output=output)
+
+    description = match.group(3)
+    pid_match = _PID_RE.search(description)
+    start = None
+    uptime_match = _UPTIME_RE.search(description)
+    if uptime_match:
+        days, hours, minutes, seconds = (int(g or 0) for g in uptime_match.groups())
+        start = time.time() - (((days * 24 + hours) * 60 + minutes) * 60 + seconds)
+    return ProcessInfo(
+        name=match.group(1),
+        statename=match.group(2),
+        description=description,
+        pid=int(pid_match.group(1)) if pid_match else None,
+        start=start,
+        output=output,
+    )
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class _UnixStreamTransport(xmlrpc.client.Transport):
+    """unix ソケット越しに XML-RPC を送るトランスポート"""
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__()
+        self._socket_path = path
+        self._timeout = timeout
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        _, self._extra_headers, _ = self.get_host_info(host)
+        self._connection = host, _UnixHTTPConnection(self._socket_path, self._timeout)
+        return self._connection[1]
+
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    def __init__(self, timeout: float):
+        super().__init__()
+        self._timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self._timeout
+        return conn
+
+
+class XmlRpcSupervisor:
+    """supervisord の XML-RPC インターフェースを直接呼び出すクライアント
+
+    url には unix:///var/run/supervisor.sock または http://127.0.0.1:9001 を指定する。
+    接続は keep-alive のままプールして再利用する。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: float = 30.0,
+        pool_size: int = 4,
+    ):
+        self.url = url
+        self._username = username
+        self._password = password
+        self._timeout = timeout
+        self._pool = ConnectionPool(
+            self._make_proxy,
+            maxsize=pool_size,
+            close=lambda proxy: proxy("close")(),
+            name="supervisor_connections",
+        )
+
+    def _make_proxy(self) -> xmlrpc.client.ServerProxy:
+        parsed = urlparse(self.url)
+        if parsed.scheme == "unix":
+            transport = _UnixStreamTransport(parsed.path, self._timeout)
+            netloc, path = "localhost", "/RPC2"
+        else:
+            transport = _TimeoutTransport(self._timeout)
+            netloc, path = parsed.netloc, (parsed.path.rstrip("/") or "/RPC2")
+        if self._username:
+            credentials = quote(self._username, safe="")
+            if self._password:
+                credentials += ":" + quote(self._password, safe="")
+            netloc = f"{credentials}@{netloc}"
+        return xmlrpc.client.ServerProxy(f"http://{netloc}{path}", transport=transport, allow_none=True)
+
+    def call(self, method: str, *args: Any) -> Any:
+        """XML-RPC メソッドを同期的に呼び出す"""
+        try:
+            with self._pool.connection() as proxy:
+                try:
+                    return getattr(proxy, method)(*args)
+                except xmlrpc.client.Fault as fault:
+                    error = SupervisorFault(fault.faultCode, fault.faultString)
+        except (OSError, http.client.HTTPException, xmlrpc.client.ProtocolError) as e:
+            raise SupervisorUnavailable(f"Cannot reach supervisord at {self.url}: {e}") from e
+        raise error
+
+    async def _call_async(self, method: str, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.call, method, *args)
+
+    async def get_process_info(self, name: str) -> ProcessInfo:
+        try:
+            info = await self._call_async("supervisor.getProcessInfo", name)
+        except SupervisorFault as e:
+            return ProcessInfo(name=name, statename="UNKNOWN", output=f"{name}: ERROR ({e.text})")
+        return ProcessInfo.from_rpc(info)
+
+    async def get_all_process_info(self, names: Sequence[str]) -> Dict[str, ProcessInfo]:
+        """names の状態を supervisor.getAllProcessInfo の1回の呼び出しで取得する"""
+        infos = {}
+        for info in await self._call_async("supervisor.getAllProcessInfo"):
+            process = ProcessInfo.from_rpc(info)
+            infos[process.name] = process
+        return {name: infos.get(name) or ProcessInfo.missing(name) for name in names}
+
+    async def perform_action(self, action: str, name: str) -> Tuple[bool, str]:
+        """start / stop / restart を実行し、(成功したか, メッセージ) を返す"""
+        if action == "start":
+            return await self._start(name)
+        if action == "stop":
+            return await self._stop(name)
+        if action == "restart":
+            _, stop_message = await self._stop(name)
+            started, start_message = await self._start(name)
+            return started, f"{stop_message}\n{start_message}"
+        raise ValueError(f"Unsupported action: {action}")
+
+    async def _start(self, name: str) -> Tuple[bool, str]:
+        try:
+            await self._call_async("supervisor.startProcess", name, True)
+        except SupervisorFault as e:
+            # 起動済みのプログラムへの start は supervisorctl と同じく成功として扱う
+            return e.code == FAULT_ALREADY_STARTED, f"{name}: ERROR ({e.text})"
+        return True, f"{name}: started"
+
+    async def _stop(self, name: str) -> Tuple[bool, str]:
+        try:
+            await self._call_async("supervisor.stopProcess", name, True)
+        except SupervisorFault as e:
+            # 停止済みのプログラムへの stop も同様に成功として扱う
+            return e.code == FAULT_NOT_RUNNING, f"{name}: ERROR ({e.text})"
+        return True, f"{name}: stopped"
+
+    def close(self) -> None:
+        self._pool.clear()
+
+
+class SupervisorctlSupervisor:
+    """supervisorctl コマンドを起動して操作するバックエンド"""
+
+    async def get_process_info(self, name: str) -> ProcessInfo:
+        result = await run_command(["supervisorctl", "status", name])
+        return parse_status_line(result.stdout.strip(), name)
+
+    async def get_all_process_info(self, names: Sequence[str]) -> Dict[str, ProcessInfo]:
+        """names の状態を1回の supervisorctl status で取得する"""
+        result = await run_command(["supervisorctl", "status", *names])
+        infos = {}
+        for line in result.stdout.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            # 存在しないプログラムは "name: ERROR (no such process)" と出力される
+            name = line.split()[0].rstrip(":")
+            infos[name] = parse_status_line(line, name)
+        return {name: infos.get(name) or ProcessInfo.missing(name) for name in names}
+
+    async def perform_action(self, action: str, name: str) -> Tuple[bool, str]:
+        result = await run_command(["supervisorctl", action, name])
+        if result.returncode == 0:
+            return True, result.stdout.strip()
+        return False, result.stderr.strip() or result.stdout.strip()
+
+
+class FallbackSupervisor:
+    """XML-RPC を優先し、接続できない間は supervisorctl で代替する"""
+
+    RETRY_AFTER = 30.0
+
+    def __init__(self, primary: XmlRpcSupervisor, fallback: SupervisorctlSupervisor):
+        self.primary = primary
+        self.fallback = fallback
+        self._unavailable_until = 0.0
+
+    async def get_process_info(self, name: str) -> ProcessInfo:
+        return await self._dispatch("get_process_info", name)
+
+    async def get_all_process_info(self, names: Sequence[str]) -> Dict[str, ProcessInfo]:
+        return await self._dispatch("get_all_process_info", names)
+
+    async def perform_action(self, action: str, name: str) -> Tuple[bool, str]:
+        return await self._dispatch("perform_action", action, name)
+
+    async def _dispatch(self, method: str, *args: Any) -> Any:
+        if time.monotonic() >= self._unavailable_until:
+            try:
+                return await getattr(self.primary, method)(*args)
+            except SupervisorUnavailable as e:
+                logger.warning("%s; falling back to supervisorctl", e)
+                self._unavailable_until = time.monotonic() + self.RETRY_AFTER
+        return await getattr(self.fallback, method)(*args)
+
+
+async def perform_actions(supervisor: Any, action: str, names: Sequence[str]) -> List[Tuple[str, bool, str]]:
+    """複数のプログラムに同じ操作を並行して実行し、[(名前, 成功したか, メッセージ)] を返す"""
+
+    async def perform(name: str) -> Tuple[str, bool, str]:
+        try:
+            ok, message = await supervisor.perform_action(action, name)
+        except SupervisorError as e:
+            return name, False, f"{name}: ERROR ({e})"
+        return name, ok, message
+
+    return list(await asyncio.gather(*(perform(name) for name in names)))
+
+
+def _detect_socket_url() -> Optional[str]:
+    for path in DEFAULT_SOCKET_PATHS:
+        if os.path.exists(path):
+            return f"unix://{path}"
+    return None
+
+
+def create_supervisor(config: Config):
+    """設定に応じた supervisord バックエンドを作成する"""
+    fallback = SupervisorctlSupervisor()
+    url = config.get("COMFYUI_COCKPIT_SUPERVISOR_URL") or _detect_socket_url()
+    if not url or url == "supervisorctl":
+        return fallback
+    primary = XmlRpcSupervisor(
+        url,
+        username=config.get("COMFYUI_COCKPIT_SUPERVISOR_USERNAME"),
+        password=config.get("COMFYUI_COCKPIT_SUPERVISOR_PASSWORD"),
+        timeout=config.get_float("COMFYUI_COCKPIT_SUPERVISOR_TIMEOUT", 30.0),
+        # 全プログラムへの操作を並行して行えるだけの接続を用意する
+        pool_size=max(4, len(config.programs)),
+    )
+    return FallbackSupervisor(primary, fallback)
+
+
+_supervisor = None
+
+
+def get_supervisor():
+    """共有の supervisord バックエンドを返す（初回呼び出し時に作成する）"""
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = create_supervisor(Config())
+    return _supervisor
@@ -0,0 +1,260 @@
+"""起動・再起動・バージョン切り替えの各段階の所要時間を記録する"""
+import asyncio
+import bisect
+import json
+import logging
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# ヒストグラムの区間の上限（秒）。これを超えた値は最後の区間に入る
+BUCKET_BOUNDS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+
+class LatencyHistogram:
+    """所要時間の分布を固定の区間で数えるヒストグラム"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.last: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q 分位点の推定値（区間内は一様に分布しているとみなして補間する）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if not count or seen + count < rank:
+                seen += count
+                continue
+            lower = self.bounds[index - 1] if index > 0 else 0.0
+            upper = self.bounds[index] if index < len(self.bounds) else self.max
+            estimate = lower + (upper - lower) * (rank - seen) / count
+            return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": [
+                {"le": bound, "count": count}
+                for bound, count in zip(list(self.bounds) + [None], self.counts)
+            ],
+        }
+
+
+class LifecycleTimings:
+    """操作の種類（start / restart / switch など）・段階ごとのヒストグラムと直近の履歴
+
+    履歴は path に保存し、サーバーの再起動後は履歴からヒストグラムを作り直す。
+    """
+
+    HISTORY = 200
+
+    def __init__(self, path: Optional[Path] = None, history_size: int = HISTORY):
+        self._path = path
+        self._history_size = history_size
+        self._history: Optional[Deque[Dict[str, Any]]] = None
+        self._histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+    @property
+    def path(self) -> Path:
+        return self._path or Config().cache_dir / "lifecycle-timings.json"
+
+    def _load(self) -> Deque[Dict[str, Any]]:
+        if self._history is None:
+            self._history = deque(maxlen=self._history_size)
+            try:
+                records = json.loads(self.path.read_text(encoding="utf-8")).get("history", [])
+            except FileNotFoundError:
+                records = []
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"Failed to load lifecycle timings: {e}")
+                records = []
+            for record in records[-self._history_size:]:
+                self._history.append(record)
+                self._observe(record)
+        return self._history
+
+    def _observe(self, record: Dict[str, Any]) -> None:
+        # 失敗・タイムアウトした操作の所要時間は分布に含めない
+        if record.get("outcome") != "success":
+            return
+        histograms = self._histograms.setdefault(record["kind"], {})
+        for phase, duration in record.get("phases", {}).items():
+            histograms.setdefault(phase, LatencyHistogram()).observe(duration)
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(self.path.name + ".tmp")
+            temporary.write_text(json.dumps({"history": list(self._history)}), encoding="utf-8")
+            temporary.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save lifecycle timings: {e}")
+
+    def record(
+        self,
+        kind: str,
+        phases: Dict[str, float],
+        outcome: str = "success",
+        **details: Any,
+    ) -> Dict[str, Any]:
+        """1回の操作の段階ごとの所要時間（秒）を記録する"""
+        history = self._load()
+        record = {
+            "kind": kind,
+            "at": time.time(),
+            "outcome": outcome,
+            "phases": {phase: round(duration, 3) for phase, duration in phases.items()},
+            **details,
+        }
+        history.append(record)
+        self._observe(record)
+        self._save()
+        return record
+
+    def summary(self, history: int = 20) -> Dict[str, Any]:
+        """ヒストグラムと直近 history 件の記録"""
+        records = list(self._load())
+        return {
+            "histograms": {
+                kind: {phase: histogram.to_dict() for phase, histogram in phases.items()}
+                for kind, phases in self._histograms.items()
+            },
+            "history": list(reversed(records[-history:])) if history > 0 else [],
+        }
+
+
+lifecycle_timings = LifecycleTimings()
+
+
+class StartupTracker:
+    """start / restart の操作から STARTING → RUNNING → ready までを計測する
+
+    操作の直前に begin() を呼ぶと、状態を interval 秒ごとに取得して各段階に
+    初めて到達した時刻を記録し、ready になった時点（または失敗・タイムアウト時）に
+    段階ごとの所要時間を LifecycleTimings へ記録する。
+    取得間隔より短い段階は観測できないことがあり、その場合は次の段階に含める。
+    """
+
+    MILESTONES = ("starting", "running", "ready")
+    DEFAULT_TIMEOUT = 600.0
+
+    def __init__(
+        self,
+        timings: LifecycleTimings,
+        interval: float = 0.5,
+        timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._timings = timings
+        self._interval = interval
+        self._timeout = timeout
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def timeout(self) -> float:
+        if self._timeout is not None:
+            return self._timeout
+        return Config().get_float("COMFYUI_COCKPIT_STARTUP_TIMEOUT", self.DEFAULT_TIMEOUT)
+
+    async def begin(self, kind: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Optional[asyncio.Task]:
+        """計測を開始する（計測中の操作があれば記録せずに打ち切る）
+
+        起動中・起動済みのプログラムへの start は何も起こらないため計測しない（None を返す）。
+        """
+        self.cancel()
+        # 再起動前のプロセスを RUNNING と取り違えないように、操作前の pid を控えておく
+        try:
+            baseline = await fetch()
+        except Exception:
+            baseline = {}
+        if kind == "start" and baseline.get("status") in ("starting", "running"):
+            return None
+        self._task = asyncio.ensure_future(self._track(kind, fetch, baseline.get("pid"), self._clock()))
+        return self._task
+
+    def cancel(self) -> None:
+        """計測を打ち切る（操作自体が失敗した場合など）"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _track(
+        self,
+        kind: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        baseline_pid: Optional[int],
+        started: float,
+    ) -> Dict[str, Any]:
+        reached: Dict[str, float] = {}
+        stopped = False
+        outcome = "timeout"
+        while self._clock() - started < self.timeout:
+            try:
+                payload = await fetch()
+            except Exception:
+                payload = {}
+            elapsed = self._clock() - started
+            status = payload.get("status")
+            stopped = stopped or status == "stopped"
+            # 操作が反映される前の（キャッシュされた）状態は操作の結果とみなさない
+            progressed = stopped or "starting" in reached or payload.get("pid") != baseline_pid
+
+            if status == "starting":
+                reached.setdefault("starting", elapsed)
+            elif status == "error" and progressed:
+                outcome = "failed"
+                break
+            elif status == "running" and progressed:
+                reached.setdefault("running", elapsed)
+                # readiness を確認できない場合は RUNNING を完了とみなす
+                if payload.get("ready", True):
+                    reached["ready"] = elapsed
+                    outcome = "success"
+                    break
+            await asyncio.sleep(self._interval)
+
+        milestones = {milestone: round(offset, 3) for milestone, offset in reached.items()}
+        return self._timings.record(kind, self._phases(reached, outcome), outcome, milestones=milestones)
+
+    def _phases(self, reached: Dict[str, float], outcome: str) -> Dict[str, float]:
+        """到達時刻から段階ごとの所要時間を求める（観測できなかった段階は次の段階に含める）"""
+        phases: Dict[str, float] = {}
+        previous = 0.0
+        for milestone in self.MILESTONES:
+            if milestone in reached:
+                phases[milestone] = reached[milestone] - previous
+                previous = reached[milestone]
+        if outcome == "success":
+            phases["total"] = previous
+        return phases
+
@@ -0,0 +1,365 @@
+"""ComfyUIのバージョン切り替えをバックグラウンドジョブとして実行する"""
+import asyncio
+import logging
+import subprocess
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence
+
+from ..config import Config
+from .actions import ActionReservation, ActionResult, process_actions
+from .broadcast import Broadcaster, Subscription
+from .commands import run_command
+from .requirements import PipInstaller, RequirementSet
+from .status import process_status_cache
+from .supervisor import get_supervisor
+from .timings import lifecycle_timings
+
+logger = logging.getLogger(__name__)
+
+
+class StepFailed(Exception):
+    """ジョブのステップが失敗し、以降のステップを実行できない場合のエラー"""
+
+    def __init__(self, message: str, version: Optional[str] = None):
+        super().__init__(message)
+        self.version = version
+
+
+class JobConflict(Exception):
+    """別のバージョン切り替えが実行中の場合のエラー"""
+
+    def __init__(self, active: "VersionSwitchJob"):
+        super().__init__(f"Another version switch is in progress ({active.target_version})")
+        self.active = active
+
+
+class JobStep:
+    """ジョブを構成する1ステップの進捗"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "pending"  # pending / running / success / warning / failed / skipped
+        self.message = ""
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return round(end - self.started_at, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "message": self.message,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+        }
+
+
+class VersionSwitchJob:
+    """1回のバージョン切り替え（ステップごとの進捗・所要時間・ログを保持する）"""
+
+    STEPS = ("checkout", "deps", "restart")
+    LOG_LINES = 500
+
+    def __init__(self, target_version: str, steps: Optional[List[str]] = None, kind: str = "switch"):
+        self.id = uuid.uuid4().hex[:12]
+        self.target_version = target_version
+        self.kind = kind  # switch / stage / rollback
+        self.status = "queued"  # queued / running / success / failed
+        self.message = ""
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps = [JobStep(name) for name in (steps or self.STEPS)]
+        self.result: Optional[Dict[str, Any]] = None
+        # restart ステップのために確保した操作の枠（VersionJobManager が設定する）
+        self.reservation: Optional[ActionReservation] = None
+        self._log: Deque[str] = deque(maxlen=self.LOG_LINES)
+        self._broadcaster = Broadcaster(maxsize=256)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("success", "failed")
+
+    def get_step(self, name: str) -> JobStep:
+        for step in self.steps:
+            if step.name == name:
+                return step
+        raise KeyError(name)
+
+    def step_durations(self) -> Dict[str, float]:
+        """実際に処理したステップ（スキップ以外）の所要時間と全体の所要時間"""
+        durations = {
+            step.name: step.duration
+            for step in self.steps
+            if step.duration is not None and step.status in ("success", "warning", "failed")
+        }
+        if self.started_at is not None and self.finished_at is not None:
+            durations["total"] = self.finished_at - self.started_at
+        return durations
+
+    def log(self, line: str) -> None:
+        """ログを1行追加し、購読者へ配信する"""
+        self._log.append(line)
+        self._broadcaster.publish({"event": "log", "data": {"line": line}})
+
+    @asynccontextmanager
+    async def step(self, name: str) -> AsyncIterator[JobStep]:
+        """ステップの開始・終了を記録するコンテキスト
+
+        StepFailed が送出された場合はステップを失敗として記録し、そのまま再送出する。
+        """
+        step = self.get_step(name)
+        step.status = "running"
+        step.started_at = time.time()
+        self.log(f"[{name}] started")
+        self._publish_snapshot()
+        try:
+            yield step
+        except StepFailed as e:
+            step.status = "failed"
+            step.message = str(e)
+            raise
+        except subprocess.TimeoutExpired:
+            step.status = "failed"
+            step.message = "timed out"
+            raise
+        except Exception as e:
+            step.status = "failed"
+            step.message = str(e)
+            raise StepFailed(str(e)) from e
+        else:
+            if step.status == "running":
+                step.status = "success"
+        finally:
+            step.finished_at = time.time()
+            self.log(f"[{name}] {step.status} in {step.duration:.1f}s")
+            self._publish_snapshot()
+
+    def mark_running(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+        self._publish_snapshot()
+
+    def finish(self, success: bool, message: str, version: Optional[str]) -> None:
+        for step in self.steps:
+            if step.status == "pending":
+                step.status = "skipped"
+        self.status = "success" if success else "failed"
+        self.message = message
+        self.finished_at = time.time()
+        self.result = {"success": success, "message": message, "version": version}
+        self.log(message)
+        self._publish_snapshot()
+        self._broadcaster.close_all()
+
+    def subscribe(self) -> Subscription:
+        """進捗の購読を開始する（最初に現在の状態を受け取る）"""
+        subscription = self._broadcaster.subscribe()
+        subscription.put({"event": "job", "data": self.to_dict(include_log=True)})
+        if self.finished:
+            subscription.close()
+        return subscription
+
+    def to_dict(self, include_log: bool = False) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "target_version": self.target_version,
+            "status": self.status,
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": round(self.finished_at - self.started_at, 3)
+            if self.started_at is not None and self.finished_at is not None else None,
+            "steps": [step.to_dict() for step in self.steps],
+            "result": self.result,
+        }
+        if include_log:
+            data["log"] = list(self._log)
+        return data
+
+    def _publish_snapshot(self) -> None:
+        self._broadcaster.publish({"event": "job", "data": self.to_dict()})
+
+
+async def restart_programs(job: VersionSwitchJob, supervisor: Any, names: Sequence[str]) -> List[ActionResult]:
+    """ジョブの restart ステップでプログラムを再起動する
+
+    ジョブの登録時に確保した枠で再起動するため、切り替え中に押された restart はこの1回の再起動に合流する。
+    """
+    if job.reservation is not None:
+        return await job.reservation.perform(supervisor)
+    return await process_actions.perform(supervisor, "restart", names)
+
+
+class VersionSwitcher:
+    """git checkout → 依存関係の更新 → 再起動 を実行する"""
+
+    CHECKOUT_TIMEOUT = 60
+
+    def __init__(
+        self,
+        comfyui_path: Path,
+        installer: PipInstaller,
+        service_names: Optional[Sequence[str]] = None,
+    ):
+        self.comfyui_path = comfyui_path
+        self.installer = installer
+        # 同じ ComfyUI を使う全プログラムを再起動する
+        self.service_names = list(service_names or Config().programs)
+
+    async def run(self, job: VersionSwitchJob) -> Dict[str, Any]:
+        target_version = job.target_version
+        previous_requirements = RequirementSet.from_file(self.comfyui_path / "requirements.txt")
+
+        async with job.step("checkout"):
+            job.log(f"Switching to version {target_version}...")
+            result = await run_command(
+                ["git", "-C", str(self.comfyui_path), "checkout", target_version],
+                timeout=self.CHECKOUT_TIMEOUT,
+                on_line=job.log,
+            )
+            if result.returncode != 0:
+                raise StepFailed(f"Failed to checkout version: {result.stderr.strip()}")
+
+        async with job.step("deps") as step:
+            await self.update_dependencies(job, step, previous_requirements)
+
+        await self.restart(job)
+
+        return {
+            "success": True,
+            "message": f"Successfully switched to version {target_version} and restarted ComfyUI",
+            "version": target_version,
+        }
+
+    async def restart(self, job: VersionSwitchJob) -> None:
+        async with job.step("restart"):
+            results = await restart_programs(job, get_supervisor(), self.service_names)
+            process_status_cache.invalidate()
+            failed = []
+            for name, restarted, restart_message in results:
+                job.log(restart_message)
+                if not restarted:
+                    failed.append(restart_message)
+            if failed:
+                raise StepFailed(f"Failed to restart ComfyUI: {'; '.join(failed)}", version=job.target_version)
+
+    async def update_dependencies(
+        self,
+        job: VersionSwitchJob,
+        step: JobStep,
+        previous: Optional[RequirementSet],
+        source: Optional[Path] = None,
+    ) -> None:
+        """切り替え前後の requirements.txt を比較し、変わった要件だけをインストールする
+
+        source を指定した場合は、そのディレクトリの requirements.txt を切り替え後の要件とする。
+        """
+        requirements = RequirementSet.from_file((source or self.comfyui_path) / "requirements.txt")
+        if requirements is None:
+            step.status = "skipped"
+            step.message = "requirements.txt not found"
+            return
+
+        job.log("Updating Python dependencies...")
+        result = await self.installer.sync(previous, requirements, on_line=job.log)
+        step.message = result.message
+        if not result.success:
+            # 依存関係の更新に失敗しても切り替え自体は続行する
+            step.status = "warning"
+        elif not result.installed:
+            step.status = "skipped"
+
+
+class VersionJobManager:
+    """バージョン切り替えジョブの登録と実行を管理する
+
+    同時に実行できる切り替えは1つだけで、実行中に別のバージョンへの
+    切り替えを要求された場合は JobConflict を送出する。
+    """
+
+    HISTORY = 20
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, VersionSwitchJob]" = OrderedDict()
+        self._active: Optional[VersionSwitchJob] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def active(self) -> Optional[VersionSwitchJob]:
+        """実行中のジョブ（なければ None）"""
+        if self._active is not None and not self._active.finished:
+            return self._active
+        return None
+
+    def get(self, job_id: str) -> Optional[VersionSwitchJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[VersionSwitchJob]:
+        return list(reversed(self._jobs.values()))
+
+    def submit(self, target_version: str, switcher: Any) -> VersionSwitchJob:
+        """ジョブを登録してバックグラウンドで実行を開始する
+
+        同じ種類・同じバージョンのジョブが実行中なら、そのジョブを返す。
+        """
+        kind = getattr(switcher, "kind", "switch")
+        active = self.active
+        if active is not None:
+            if active.target_version == target_version and active.kind == kind:
+                return active
+            raise JobConflict(active)
+
+        job = VersionSwitchJob(target_version, getattr(switcher, "steps", None), kind)
+        if any(step.name == "restart" for step in job.steps):
+            # 切り替えの前に要求された操作の後に再起動の枠を確保し、切り替え中の start / restart を合流させる
+            names = getattr(switcher, "service_names", None) or Config().programs
+            job.reservation = process_actions.reserve(names)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.HISTORY:
+            self._jobs.popitem(last=False)
+        self._active = job
+        self._tasks[job.id] = asyncio.ensure_future(self._run(job, switcher))
+        return job
+
+    async def wait(self, job_id: str) -> Optional[VersionSwitchJob]:
+        """ジョブの完了を待つ"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: VersionSwitchJob, switcher: Any) -> None:
+        job.mark_running()
+        try:
+            result = await switcher.run(job)
+            job.finish(result["success"], result["message"], result.get("version"))
+        except StepFailed as e:
+            job.finish(False, str(e), e.version)
+        except subprocess.TimeoutExpired:
+            job.finish(False, f"Version switch timed out for {job.target_version}", None)
+        except Exception as e:
+            logger.error(f"Error switching version: {e}", exc_info=True)
+            job.finish(False, f"Error switching version: {str(e)}", None)
+        finally:
+            if job.reservation is not None:
+                job.reservation.release()
+            self._tasks.pop(job.id, None)
+        # checkout / deps / restart などの所要時間を記録し、遅くなったステップを追えるようにする
+        lifecycle_timings.record(job.kind, job.step_durations(), job.status, version=job.target_version)
+
+
+version_job_manager = VersionJobManager()
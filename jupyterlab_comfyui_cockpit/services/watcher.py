@@ -0,0 +1,95 @@
+"""プロセス状態を監視し、状態遷移を購読者へ配信する"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..config import Config
+from .broadcast import Broadcaster, Subscription
+
+logger = logging.getLogger(__name__)
+
+StatusPayload = Dict[str, Any]
+
+
+class ProcessStatusWatcher:
+    """サーバー内で1つだけ動く状態監視ループ
+
+    購読者がいる間だけ fetch で状態を取得し、状態が変わった時
+    （および接続維持のため heartbeat 秒ごと）に全購読者へ配信する。
+    """
+
+    DEFAULT_INTERVAL = 1.0
+    HEARTBEAT = 15.0
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[StatusPayload]],
+        interval: Optional[float] = None,
+        heartbeat: float = HEARTBEAT,
+    ):
+        self._fetch = fetch
+        self._interval = interval
+        self._heartbeat = heartbeat
+        self._broadcaster = Broadcaster()
+        self._latest: Optional[StatusPayload] = None
+        self._last_key = None
+        self._last_sent = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def interval(self) -> float:
+        """状態を確認する間隔（秒）"""
+        if self._interval is not None:
+            return self._interval
+        return Config().get_float("COMFYUI_COCKPIT_WATCH_INTERVAL", self.DEFAULT_INTERVAL)
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._broadcaster.subscriber_count
+
+    def subscribe(self) -> Subscription:
+        """購読を開始する（直近の状態があれば即座に受け取る）"""
+        subscription = self._broadcaster.subscribe()
+        if self._latest is not None:
+            subscription.put(self._latest)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        return subscription
+
+    def poke(self) -> None:
+        """次の確認を待たずに状態を再取得させる（プロセス操作の直後などに呼ぶ）"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def publish(self, payload: StatusPayload) -> None:
+        """外部で得た状態を配信する（変化がなければ何もしない）"""
+        key = (payload.get("ready"),) + tuple(
+            tuple(program.get(field) for field in ("status", "state", "pid", "start"))
+            for program in payload.get("programs", [payload])
+        )
+        now = time.monotonic()
+        self._latest = payload
+        if key == self._last_key and now - self._last_sent < self._heartbeat:
+            return
+        self._last_key = key
+        self._last_sent = now
+        self._broadcaster.publish(payload)
+
+    async def _run(self) -> None:
+        while self._broadcaster.subscriber_count:
+            try:
+                payload = await self._fetch()
+            except Exception as e:
+                logger.warning("Failed to fetch process status: %s", e)
+                payload = {"status": "error", "message": str(e)}
+            self.publish(payload)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
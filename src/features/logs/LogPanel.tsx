@@ -0,0 +1,72 @@
+import React, { useEffect, useRef, useState } from 'react';
+import {
+  Box,
+  Chip,
+  FormControlLabel,
+  Stack,
+  Switch,
+  ToggleButton,
+  ToggleButtonGroup,
+} from '@mui/material';
+import { LogStreamName, useLogStream } from '../../hooks/useLogs';
+
+export const LogPanel = () => {
+  const [stream, setStream] = useState<LogStreamName>('stdout');
+  const [follow, setFollow] = useState(true);
+  const { text, isStreaming, isWaiting } = useLogStream(stream);
+  const logRef = useRef<HTMLPreElement>(null);
+
+  useEffect(() => {
+    // 自動スクロールが有効なら常に末尾を表示する
+    if (follow && logRef.current) {
+      logRef.current.scrollTop = logRef.current.scrollHeight;
+    }
+  }, [text, follow]);
+
+  return (
+    <Box sx={{ height: '100%', display: 'flex', flexDirection: 'column', boxSizing: 'border-box' }}>
+      <Stack direction="row" spacing={2} alignItems="center">
+        <ToggleButtonGroup
+          size="small"
+          exclusive
+          value={stream}
+          onChange={(_, value) => value && setStream(value)}
+        >
+          <ToggleButton value="stdout" sx={{ textTransform: 'none' }}>stdout</ToggleButton>
+          <ToggleButton value="stderr" sx={{ textTransform: 'none' }}>stderr</ToggleButton>
+        </ToggleButtonGroup>
+        <FormControlLabel
+          control={<Switch size="small" checked={follow} onChange={(e) => setFollow(e.target.checked)} />}
+          label="自動スクロール"
+        />
+        <Chip
+          size="small"
+          label={isStreaming ? 'ライブ' : '再接続中'}
+          color={isStreaming ? 'success' : 'default'}
+          variant="outlined"
+        />
+      </Stack>
+
+      <Box
+        component="pre"
+        ref={logRef}
+        sx={{
+          flex: 1,
+          minHeight: 0,
+          overflow: 'auto',
+          m: 0,
+          mt: 1,
+          p: 1,
+          fontSize: '0.75rem',
+          fontFamily: 'monospace',
+          whiteSpace: 'pre-wrap',
+          wordBreak: 'break-all',
+          bgcolor: 'action.hover',
+          borderRadius: 1,
+        }}
+      >
+        {text || (isWaiting ? 'ログファイルの作成を待っています...' : 'ログはまだありません')}
+      </Box>
+    </Box>
+  );
+};
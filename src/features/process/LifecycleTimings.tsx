@@ -0,0 +1,72 @@
+import React from 'react';
+import { Box, Divider, Stack, Table, TableBody, TableCell, TableHead, TableRow, Typography } from '@mui/material';
+import { useTimings } from '../../hooks/useTimings';
+
+const KIND_LABELS: Record<string, string> = {
+  start: '起動',
+  restart: '再起動',
+  switch: 'バージョン切り替え',
+  rollback: 'ロールバック',
+  stage: 'ステージング',
+};
+
+const formatSeconds = (seconds: number | null | undefined): string => {
+  if (seconds === null || seconds === undefined) {
+    return '-';
+  }
+  return seconds >= 10 ? `${seconds.toFixed(0)}s` : `${seconds.toFixed(1)}s`;
+};
+
+const cellSx = { py: 0.25, px: 1, fontSize: '0.75rem' };
+
+/**
+ * 操作の種類・段階ごとの所要時間（直近・中央値・90パーセンタイル）を表示する
+ */
+export const LifecycleTimings = () => {
+  const { histograms } = useTimings();
+  const kinds = Object.keys(histograms);
+
+  if (kinds.length === 0) {
+    return null;
+  }
+
+  return (
+    <>
+      <Stack spacing={1}>
+        <Typography variant="subtitle2" color="text.secondary" sx={{ fontWeight: 'bold' }}>
+          所要時間
+        </Typography>
+        {kinds.map((kind) => (
+          <Box key={kind}>
+            <Typography variant="caption" color="text.secondary">
+              {KIND_LABELS[kind] ?? kind}（{histograms[kind].total?.count ?? 0}回）
+            </Typography>
+            <Table size="small">
+              <TableHead>
+                <TableRow>
+                  <TableCell sx={cellSx}>段階</TableCell>
+                  <TableCell sx={cellSx} align="right">直近</TableCell>
+                  <TableCell sx={cellSx} align="right">中央値</TableCell>
+                  <TableCell sx={cellSx} align="right">p90</TableCell>
+                  <TableCell sx={cellSx} align="right">最大</TableCell>
+                </TableRow>
+              </TableHead>
+              <TableBody>
+                {Object.entries(histograms[kind]).map(([phase, summary]) => (
+                  <TableRow key={phase}>
+                    <TableCell sx={cellSx}>{phase}</TableCell>
+                    <TableCell sx={cellSx} align="right">{formatSeconds(summary.last)}</TableCell>
+                    <TableCell sx={cellSx} align="right">{formatSeconds(summary.p50)}</TableCell>
+                    <TableCell sx={cellSx} align="right">{formatSeconds(summary.p90)}</TableCell>
+                    <TableCell sx={cellSx} align="right">{formatSeconds(summary.max)}</TableCell>
+                  </TableRow>
+                ))}
+              </TableBody>
+            </Table>
+          </Box>
+        ))}
+      </Stack>
+      <Divider sx={{ my: 2 }} />
+    </>
+  );
+};
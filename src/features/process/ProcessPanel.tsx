@@ -14,15 +14,38 @@ import {
   CircularProgress,
 } from '@mui/material';
 import { ProcessStatusArea } from './ProcessStatusArea';
-import { useProcessStatus } from '../../hooks/useProcess';
-import { useVersion, useVersionList, switchVersion } from '../../hooks/useVersion';
-
-type ProcessAction = 'start' | 'stop' | 'restart';
+import { LifecycleTimings } from './LifecycleTimings';
+import { ProgramList } from './ProgramList';
+import { ResourceSummary } from './ResourceSummary';
+import { ProcessAction, useProcessStatus } from '../../hooks/useProcess';
+import {
+  useVersion,
+  useVersionList,
+  useVersionStaging,
+  switchVersion,
+  rollbackVersion,
+  VersionJob,
+  VersionSwitchResult,
+} from '../../hooks/useVersion';
 
 export const ProcessPanel = () => {
-  const { status, message, isLoading, start, stop, restart } = useProcessStatus();
+  const {
+    status,
+    message,
+    pid,
+    startTime,
+    ready,
+    readyMessage,
+    programs,
+    isLoading,
+    start,
+    stop,
+    restart,
+    controlPrograms,
+  } = useProcessStatus();
   const { comfyuiVersion, isLoading: isVersionLoading, mutate: mutateVersion } = useVersion();
   const { availableVersions, isLoading: isVersionListLoading } = useVersionList();
+  const { stagingEnabled, previousVersion, mutate: mutateStaging } = useVersionStaging();
   const [pendingActions, setPendingActions] = useState<Record<ProcessAction, boolean>>({
     start: false,
     stop: false,
@@ -30,6 +53,7 @@ export const ProcessPanel = () => {
   });
   const [selectedVersion, setSelectedVersion] = useState<string>('');
   const [isSwitchingVersion, setIsSwitchingVersion] = useState(false);
+  const [switchingStep, setSwitchingStep] = useState<string | null>(null);
   const [versionSwitchMessage, setVersionSwitchMessage] = useState<{
     type: 'success' | 'error';
     message: string;
@@ -61,23 +85,28 @@ export const ProcessPanel = () => {
     setVersionSwitchMessage(null); // メッセージをクリア
   };
 
-  const handleVersionConfirm = async () => {
-    if (!selectedVersion || selectedVersion === comfyuiVersion) {
-      return;
-    }
-
+  const runVersionSwitch = async (
+    targetVersion: string,
+    run: (onProgress: (job: VersionJob) => void) => Promise<VersionSwitchResult>
+  ) => {
     setIsSwitchingVersion(true);
     setVersionSwitchMessage(null);
 
+    const handleProgress = (job: VersionJob) => {
+      const runningStep = job.steps.find((step) => step.status === 'running');
+      setSwitchingStep(runningStep ? runningStep.name : null);
+    };
+
     try {
-      const result = await switchVersion(selectedVersion);
+      const result = await run(handleProgress);
       if (result.success) {
         setVersionSwitchMessage({
           type: 'success',
-          message: `ComfyUIをバージョン ${selectedVersion} に切り替えました`,
+          message: `ComfyUIをバージョン ${targetVersion} に切り替えました`,
         });
         // バージョン情報を再取得
         mutateVersion();
+        mutateStaging();
         setSelectedVersion(''); // 選択状態をリセット
       } else {
         setVersionSwitchMessage({
@@ -92,9 +121,24 @@ export const ProcessPanel = () => {
       });
     } finally {
       setIsSwitchingVersion(false);
+      setSwitchingStep(null);
     }
   };
 
+  const handleVersionConfirm = async () => {
+    if (!selectedVersion || selectedVersion === comfyuiVersion) {
+      return;
+    }
+    await runVersionSwitch(selectedVersion, (onProgress) => switchVersion(selectedVersion, onProgress));
+  };
+
+  const handleRollback = async () => {
+    if (!previousVersion) {
+      return;
+    }
+    await runVersionSwitch(previousVersion, (onProgress) => rollbackVersion(onProgress));
+  };
+
   useEffect(() => {
     if (!pendingActions.start && !pendingActions.stop && !pendingActions.restart) {
       return;
@@ -129,6 +173,10 @@ export const ProcessPanel = () => {
       <ProcessStatusArea
         status={status}
         message={message}
+        pid={pid}
+        startTime={startTime}
+        ready={ready}
+        readyMessage={readyMessage}
         onStart={() => controlProcess('start')}
         onStop={() => controlProcess('stop')}
         onRestart={() => controlProcess('restart')}
@@ -144,8 +192,19 @@ export const ProcessPanel = () => {
           </Typography>
       )}
 
+      {/* Programs (only when several programs are managed) */}
+      {programs.length > 1 && (
+        <ProgramList programs={programs} onAction={controlPrograms} disabled={isSwitchingVersion} />
+      )}
+
       <Divider sx={{ my: 2 }} />
 
+      {/* Resource Usage */}
+      <ResourceSummary />
+
+      {/* Lifecycle Timings */}
+      <LifecycleTimings />
+
       {/* Version Information */}
       <Stack spacing={1}>
         <Typography variant="subtitle2" color="text.secondary" sx={{ fontWeight: 'bold' }}>
@@ -231,7 +290,7 @@ export const ProcessPanel = () => {
                 {isSwitchingVersion ? (
                   <>
                     <CircularProgress size={16} sx={{ mr: 1 }} />
-                    切り替え中...
+                    {switchingStep ? `切り替え中 (${switchingStep})...` : '切り替え中...'}
                   </>
                 ) : (
                   '切り替え'
@@ -239,6 +298,24 @@ export const ProcessPanel = () => {
               </Button>
             </Box>
 
+            {/* Rollback (staging mode only) */}
+            {stagingEnabled && previousVersion && (
+              <Box sx={{ display: 'flex', alignItems: 'center', gap: 2 }}>
+                <Typography variant="body2" color="text.secondary" sx={{ minWidth: '80px' }}>
+                  直前のバージョン:
+                </Typography>
+                <Button
+                  variant="outlined"
+                  size="small"
+                  onClick={handleRollback}
+                  disabled={isSwitchingVersion}
+                  sx={{ textTransform: 'none' }}
+                >
+                  {previousVersion} に戻す
+                </Button>
+              </Box>
+            )}
+
             {!comfyuiVersion && availableVersions.length === 0 && (
               <Typography variant="body2" color="text.secondary">
                 バージョン情報を取得できませんでした
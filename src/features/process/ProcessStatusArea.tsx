@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { Box, Stack, Typography } from '@mui/material';
 import LoadingButton from '@mui/lab/LoadingButton';
 import PlayArrowIcon from '@mui/icons-material/PlayArrow';
@@ -6,9 +6,21 @@ import StopIcon from '@mui/icons-material/Stop';
 import ReplayIcon from '@mui/icons-material/Replay';
 import { ProcessStatus } from '../../hooks/useProcess';
 
+const formatUptime = (elapsedSeconds: number): string => {
+  const elapsed = Math.max(0, Math.floor(elapsedSeconds));
+  const hours = Math.floor(elapsed / 3600);
+  const minutes = Math.floor((elapsed % 3600) / 60);
+  const seconds = elapsed % 60;
+  return `${hours}:${String(minutes).padStart(2, '0')}:${String(seconds).padStart(2, '0')}`;
+};
+
 interface ProcessStatusAreaProps {
   status: ProcessStatus['status'];
   message: string;
+  pid?: number | null;
+  startTime?: number | null;
+  ready?: boolean | null;
+  readyMessage?: string;
   onStart: () => void;
   onStop: () => void;
   onRestart: () => void;
@@ -21,6 +33,10 @@ interface ProcessStatusAreaProps {
 export const ProcessStatusArea: React.FC<ProcessStatusAreaProps> = ({
   status,
   message,
+  pid: pidValue = null,
+  startTime = null,
+  ready = null,
+  readyMessage = '',
   onStart,
   onStop,
   onRestart,
@@ -29,12 +45,25 @@ export const ProcessStatusArea: React.FC<ProcessStatusAreaProps> = ({
   isRestartPending,
   disabled = false,
 }) => {
+  // 起動時刻がわかる場合は、ストリームの更新を待たずに毎秒Uptimeを進める
+  const [now, setNow] = useState(() => Date.now());
+  useEffect(() => {
+    if (status !== 'running' || !startTime) {
+      return;
+    }
+    const timer = window.setInterval(() => setNow(Date.now()), 1000);
+    return () => window.clearInterval(timer);
+  }, [status, startTime]);
+
   // Extract PID and Uptime from message if possible
   // message example: "comfyui RUNNING   pid 12345, uptime 0:00:10"
   const pidMatch = message.match(/pid (\d+)/);
   const uptimeMatch = message.match(/uptime ([\d:]+)/);
-  const pid = pidMatch ? pidMatch[1] : '-';
-  const uptime = uptimeMatch ? uptimeMatch[1] : '-';
+  const pid = pidValue !== null ? String(pidValue) : pidMatch ? pidMatch[1] : '-';
+  const uptime = startTime ? formatUptime(now / 1000 - startTime) : uptimeMatch ? uptimeMatch[1] : '-';
+
+  // supervisord 上は RUNNING だが、ComfyUI の HTTP API がまだ応答しない
+  const isLoadingNodes = status === 'running' && ready === false;
 
   const isStartLoading = isStartPending || status === 'starting';
   const isAnyPending = isStartPending || isStopPending || isRestartPending || status === 'starting';
@@ -49,11 +78,25 @@ export const ProcessStatusArea: React.FC<ProcessStatusAreaProps> = ({
               height: 8,
               borderRadius: '50%',
               backgroundColor:
-                status === 'running' ? '#4caf50' : status === 'error' ? '#f44336' : status === 'starting' ? '#ff9800' : '#9e9e9e',
+                status === 'running' && !isLoadingNodes
+                  ? '#4caf50'
+                  : status === 'error'
+                    ? '#f44336'
+                    : status === 'starting' || isLoadingNodes
+                      ? '#ff9800'
+                      : '#9e9e9e',
             }}
           />
-          <Typography variant="body1">
-            {status === 'running' ? '稼働' : status === 'error' ? 'エラー' : status === 'starting' ? '起動中' : '停止'}
+          <Typography variant="body1" title={isLoadingNodes ? readyMessage : undefined}>
+            {isLoadingNodes
+              ? '読み込み中'
+              : status === 'running'
+                ? '稼働'
+                : status === 'error'
+                  ? 'エラー'
+                  : status === 'starting'
+                    ? '起動中'
+                    : '停止'}
           </Typography>
         </Stack>
         {status === 'running' && <Typography variant="body1">Uptime: {uptime}</Typography>}
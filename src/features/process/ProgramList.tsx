@@ -0,0 +1,94 @@
+import React, { useState } from 'react';
+import { Box, Chip, Divider, IconButton, Stack, Tooltip, Typography } from '@mui/material';
+import PlayArrowIcon from '@mui/icons-material/PlayArrow';
+import StopIcon from '@mui/icons-material/Stop';
+import ReplayIcon from '@mui/icons-material/Replay';
+import { ProcessAction, ProgramStatus } from '../../hooks/useProcess';
+
+const STATUS_LABELS: Record<ProgramStatus['status'], string> = {
+  running: '稼働',
+  stopped: '停止',
+  starting: '起動中',
+  error: 'エラー',
+};
+
+const STATUS_COLORS: Record<ProgramStatus['status'], 'success' | 'default' | 'warning' | 'error'> = {
+  running: 'success',
+  stopped: 'default',
+  starting: 'warning',
+  error: 'error',
+};
+
+interface ProgramListProps {
+  programs: ProgramStatus[];
+  onAction: (action: ProcessAction, targets?: string[]) => Promise<void>;
+  disabled?: boolean;
+}
+
+/**
+ * 複数のプログラムの状態を一覧表示し、個別または一括で操作する
+ */
+export const ProgramList: React.FC<ProgramListProps> = ({ programs, onAction, disabled = false }) => {
+  const [pending, setPending] = useState<string | null>(null);
+
+  const run = async (key: string, action: ProcessAction, targets?: string[]) => {
+    setPending(key);
+    try {
+      await onAction(action, targets);
+    } catch (error) {
+      console.error(`Error ${action}ing ${targets ? targets.join(', ') : 'all programs'}:`, error);
+    } finally {
+      setPending(null);
+    }
+  };
+
+  const isDisabled = disabled || pending !== null;
+
+  return (
+    <>
+      <Divider sx={{ my: 2 }} />
+      <Stack spacing={1}>
+        <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between' }}>
+          <Typography variant="subtitle2" color="text.secondary" sx={{ fontWeight: 'bold' }}>
+            プログラム ({programs.filter((program) => program.status === 'running').length}/{programs.length} 稼働)
+          </Typography>
+          <Tooltip title="すべて再起動">
+            <span>
+              <IconButton size="small" onClick={() => run('*', 'restart')} disabled={isDisabled}>
+                <ReplayIcon fontSize="small" />
+              </IconButton>
+            </span>
+          </Tooltip>
+        </Box>
+        {programs.map((program) => (
+          <Box key={program.name} sx={{ display: 'flex', alignItems: 'center', gap: 1 }}>
+            <Typography variant="body2" sx={{ flexGrow: 1, fontFamily: 'monospace' }}>
+              {program.name}
+            </Typography>
+            <Chip
+              label={STATUS_LABELS[program.status]}
+              color={STATUS_COLORS[program.status]}
+              size="small"
+              sx={{ height: '20px', fontSize: '0.7rem' }}
+            />
+            <Typography variant="caption" color="text.secondary" sx={{ minWidth: '64px' }}>
+              {program.pid ? `pid ${program.pid}` : '-'}
+            </Typography>
+            {program.status === 'running' ? (
+              <IconButton size="small" onClick={() => run(program.name, 'stop', [program.name])} disabled={isDisabled}>
+                <StopIcon fontSize="small" />
+              </IconButton>
+            ) : (
+              <IconButton size="small" onClick={() => run(program.name, 'start', [program.name])} disabled={isDisabled}>
+                <PlayArrowIcon fontSize="small" />
+              </IconButton>
+            )}
+            <IconButton size="small" onClick={() => run(program.name, 'restart', [program.name])} disabled={isDisabled}>
+              <ReplayIcon fontSize="small" />
+            </IconButton>
+          </Box>
+        ))}
+      </Stack>
+    </>
+  );
+};
@@ -0,0 +1,82 @@
+import React from 'react';
+import { Box, Divider, Stack, Typography } from '@mui/material';
+import { useResources } from '../../hooks/useResources';
+
+const formatBytes = (bytes: number | null): string => {
+  if (bytes === null) {
+    return '-';
+  }
+  if (bytes >= 1024 ** 3) {
+    return `${(bytes / 1024 ** 3).toFixed(2)} GB`;
+  }
+  return `${(bytes / 1024 ** 2).toFixed(0)} MB`;
+};
+
+/**
+ * 値の推移を折れ線で表示する（欠損値は詰めて描く）
+ */
+const Sparkline = ({ values }: { values: Array<number | null> }) => {
+  const points = values.filter((value): value is number => value !== null);
+  if (points.length < 2) {
+    return null;
+  }
+  const max = Math.max(...points);
+  const min = Math.min(...points);
+  const range = max - min || 1;
+  const path = points
+    .map((value, index) => {
+      const x = (index / (points.length - 1)) * 100;
+      const y = 20 - ((value - min) / range) * 20;
+      return `${x.toFixed(1)},${y.toFixed(1)}`;
+    })
+    .join(' ');
+
+  return (
+    <svg viewBox="0 0 100 20" preserveAspectRatio="none" style={{ width: '100%', height: '24px' }}>
+      <polyline points={path} fill="none" stroke="currentColor" strokeWidth="1" vectorEffect="non-scaling-stroke" />
+    </svg>
+  );
+};
+
+const Metric = ({ label, value }: { label: string; value: string }) => (
+  <Box sx={{ minWidth: '72px' }}>
+    <Typography variant="caption" color="text.secondary">
+      {label}
+    </Typography>
+    <Typography variant="body2">{value}</Typography>
+  </Box>
+);
+
+export const ResourceSummary = () => {
+  const { enabled, latest, series } = useResources();
+
+  if (!enabled || !latest) {
+    return null;
+  }
+
+  return (
+    <>
+      <Stack spacing={1}>
+        <Typography variant="subtitle2" color="text.secondary" sx={{ fontWeight: 'bold' }}>
+          リソース使用量
+        </Typography>
+        <Stack direction="row" spacing={2}>
+          <Metric
+            label="CPU"
+            value={latest.cpu_percent !== null ? `${latest.cpu_percent.toFixed(0)}%` : '-'}
+          />
+          <Metric label="メモリ" value={formatBytes(latest.rss)} />
+          <Metric label="スレッド" value={latest.threads !== null ? String(latest.threads) : '-'} />
+          <Metric label="FD" value={latest.fds !== null ? String(latest.fds) : '-'} />
+        </Stack>
+        <Box sx={{ color: 'primary.main' }}>
+          <Typography variant="caption" color="text.secondary">
+            メモリ（直近1時間の最大値）
+          </Typography>
+          <Sparkline values={series.rss_max ?? []} />
+        </Box>
+      </Stack>
+      <Divider sx={{ my: 2 }} />
+    </>
+  );
+};
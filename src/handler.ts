@@ -43,3 +43,127 @@ export async function requestAPI<T>(
 
   return data;
 }
+
+/**
+ * Read a Server-Sent Events stream from the API extension
+ *
+ * @param endPoint API REST end point for the extension
+ * @param onEvent Callback invoked with each event name and its JSON data
+ * @param signal Signal used to close the stream
+ * @returns A promise resolved when the server closes the stream
+ */
+export async function streamAPI(
+  endPoint: string,
+  onEvent: (event: string, data: any) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const settings = ServerConnection.makeSettings();
+  const requestUrl = URLExt.join(
+    settings.baseUrl,
+    'comfyui-cockpit', // API Namespace
+    endPoint
+  );
+
+  let response: Response;
+  try {
+    response = await ServerConnection.makeRequest(requestUrl, { signal }, settings);
+  } catch (error) {
+    throw new ServerConnection.NetworkError(error as any);
+  }
+
+  if (!response.ok || !response.body) {
+    throw new ServerConnection.ResponseError(response);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) {
+      return;
+    }
+    buffer += decoder.decode(value, { stream: true });
+
+    // イベントは空行で区切られる
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary >= 0) {
+      const chunk = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      const dataLines: string[] = [];
+      for (const line of chunk.split('\n')) {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trimStart());
+        }
+      }
+      if (dataLines.length > 0) {
+        onEvent(event, JSON.parse(dataLines.join('\n')));
+      }
+    }
+  }
+}
+
+// 条件付きリクエストで最後に受け取った ETag と本文（エンドポイントごと）
+const conditionalCache = new Map<string, { etag: string; data: unknown }>();
+
+/**
+ * Call the API extension with a conditional GET request
+ *
+ * The ETag of the last response is sent as If-None-Match, and the cached
+ * body is returned when the server answers 304 Not Modified.
+ *
+ * @param endPoint API REST end point for the extension
+ * @returns The response body interpreted as JSON
+ */
+export async function requestConditionalAPI<T>(endPoint: string): Promise<T> {
+  const settings = ServerConnection.makeSettings();
+  const requestUrl = URLExt.join(
+    settings.baseUrl,
+    'comfyui-cockpit', // API Namespace
+    endPoint
+  );
+
+  const cached = conditionalCache.get(endPoint);
+  const init: RequestInit = cached
+    ? { headers: { 'If-None-Match': cached.etag } }
+    : {};
+
+  let response: Response;
+  try {
+    response = await ServerConnection.makeRequest(requestUrl, init, settings);
+  } catch (error) {
+    throw new ServerConnection.NetworkError(error as any);
+  }
+
+  if (response.status === 304 && cached) {
+    return cached.data as T;
+  }
+
+  let data: any = await response.text();
+
+  if (data.length > 0) {
+    try {
+      data = JSON.parse(data);
+    } catch (error) {
+      console.log('Not a JSON response body.', response);
+    }
+  }
+
+  if (!response.ok) {
+    throw new ServerConnection.ResponseError(response, data.message || data);
+  }
+
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    conditionalCache.set(endPoint, { etag, data });
+  } else {
+    conditionalCache.delete(endPoint);
+  }
+  return data;
+}
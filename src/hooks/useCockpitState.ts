@@ -0,0 +1,28 @@
+import useSWR, { SWRConfiguration } from 'swr';
+import { requestConditionalAPI } from '../handler';
+import type { ProcessStatus } from './useProcess';
+import type { VersionInfo } from './useVersion';
+
+/**
+ * パネルが使う状態をまとめて返す /state の応答
+ */
+export interface CockpitState {
+  process: ProcessStatus;
+  version: VersionInfo;
+  available_versions: string[];
+}
+
+// プロセスの状態とバージョン情報で共有する SWR のキー
+export const STATE_KEY = 'state';
+
+// 変化がなければ 304 が返り、前回の本文がそのまま使われる
+const fetcher = (endPoint: string) => requestConditionalAPI<CockpitState>(endPoint);
+
+/**
+ * プロセスの状態・現在のバージョン・利用可能なバージョンを1回のリクエストで取得する
+ *
+ * 同じキーを使うフックどうしでリクエストは1つにまとめられる
+ */
+export function useCockpitState(options: SWRConfiguration<CockpitState> = {}) {
+  return useSWR<CockpitState>(STATE_KEY, fetcher, options);
+}
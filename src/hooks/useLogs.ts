@@ -0,0 +1,88 @@
+import { useEffect, useState } from 'react';
+import { streamAPI } from '../handler';
+
+export type LogStreamName = 'stdout' | 'stderr';
+
+export interface LogChunk {
+  offset: number;
+  next_offset: number;
+  size: number;
+  data: string;
+  reset: boolean;
+}
+
+// 画面に保持するログの上限（これを超えた古い行は捨てる）
+const MAX_LOG_CHARS = 200000;
+const STREAM_RETRY_INTERVAL = 3000;
+
+const trimLog = (text: string): string => {
+  if (text.length <= MAX_LOG_CHARS) {
+    return text;
+  }
+  const start = text.indexOf('\n', text.length - MAX_LOG_CHARS);
+  return start >= 0 ? text.slice(start + 1) : text.slice(-MAX_LOG_CHARS);
+};
+
+/**
+ * ログファイルへの追記をストリームで受け取る
+ *
+ * 再接続時は最後に受け取った位置から続きだけを取得する
+ */
+export function useLogStream(stream: LogStreamName) {
+  const [text, setText] = useState('');
+  const [isStreaming, setIsStreaming] = useState(false);
+  const [isWaiting, setIsWaiting] = useState(false);
+
+  useEffect(() => {
+    const controller = new AbortController();
+    let retryTimer: number | undefined;
+    let nextOffset: number | null = null;
+    setText('');
+
+    const handleChunk = (chunk: LogChunk) => {
+      const replace = chunk.reset || nextOffset === null;
+      // サーバー側で読み飛ばされた範囲があれば印を付ける
+      const gap = !replace && nextOffset !== null && chunk.offset > nextOffset;
+      nextOffset = chunk.next_offset;
+      setText((prev) => trimLog((replace ? '' : prev) + (gap ? '…\n' : '') + chunk.data));
+    };
+
+    const connect = async () => {
+      const query = nextOffset !== null ? `?offset=${nextOffset}` : '';
+      try {
+        await streamAPI(
+          `logs/${stream}/stream${query}`,
+          (event, data) => {
+            setIsStreaming(true);
+            if (event === 'chunk') {
+              setIsWaiting(false);
+              handleChunk(data as LogChunk);
+            } else if (event === 'reset') {
+              nextOffset = null;
+            } else if (event === 'waiting') {
+              setIsWaiting(true);
+            }
+          },
+          controller.signal
+        );
+      } catch (error) {
+        if (!controller.signal.aborted) {
+          console.warn('Log stream disconnected:', error);
+        }
+      }
+      if (controller.signal.aborted) {
+        return;
+      }
+      setIsStreaming(false);
+      retryTimer = window.setTimeout(connect, STREAM_RETRY_INTERVAL);
+    };
+
+    connect();
+    return () => {
+      controller.abort();
+      window.clearTimeout(retryTimer);
+    };
+  }, [stream]);
+
+  return { text, isStreaming, isWaiting };
+}
@@ -1,32 +1,105 @@
-import useSWR from 'swr';
+import { useEffect, useState } from 'react';
 import { mutate } from 'swr';
-import { requestAPI } from '../handler';
+import { requestAPI, streamAPI } from '../handler';
+import { CockpitState, STATE_KEY, useCockpitState } from './useCockpitState';
 
-export interface ProcessStatus {
+export interface ProgramStatus {
+  name: string;
   status: 'running' | 'stopped' | 'starting' | 'error';
   message: string;
+  state?: string;
+  pid?: number | null;
+  start?: number | null;
+  exitstatus?: number | null;
 }
 
-const fetcher = (endPoint: string) => requestAPI<ProcessStatus>(endPoint);
+export interface ProcessStatus extends Omit<ProgramStatus, 'name'> {
+  // ComfyUI の HTTP API が応答するか（RUNNING でもカスタムノードの読み込み中は false）
+  ready?: boolean;
+  ready_message?: string;
+  // COMFYUI_COCKPIT_PROGRAMS に設定した全プログラムの状態（先頭はトップレベルと同じ）
+  programs?: ProgramStatus[];
+}
+
+export type ProcessAction = 'start' | 'stop' | 'restart';
+
+const STREAM_RETRY_MIN = 1000;
+const STREAM_RETRY_MAX = 30000;
+
+/**
+ * プロセス状態のストリームを購読し、受信した状態をSWRのキャッシュへ反映する
+ *
+ * @returns ストリームが接続中かどうか
+ */
+function useProcessStream(): boolean {
+  const [isStreaming, setIsStreaming] = useState(false);
+
+  useEffect(() => {
+    const controller = new AbortController();
+    let retryTimer: number | undefined;
+    let retryDelay = STREAM_RETRY_MIN;
+
+    const connect = async () => {
+      try {
+        await streamAPI(
+          'process/stream',
+          (event, payload) => {
+            if (event !== 'status') {
+              return;
+            }
+            setIsStreaming(true);
+            retryDelay = STREAM_RETRY_MIN;
+            mutate<CockpitState>(
+              STATE_KEY,
+              (current) => current && { ...current, process: payload as ProcessStatus },
+              false
+            );
+          },
+          controller.signal
+        );
+      } catch (error) {
+        if (!controller.signal.aborted) {
+          console.warn('Process status stream disconnected:', error);
+        }
+      }
+      if (controller.signal.aborted) {
+        return;
+      }
+      // ストリームが切れている間はポーリングに戻し、間隔を空けて再接続する
+      setIsStreaming(false);
+      retryTimer = window.setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, STREAM_RETRY_MAX);
+    };
+
+    connect();
+    return () => {
+      controller.abort();
+      window.clearTimeout(retryTimer);
+    };
+  }, []);
+
+  return isStreaming;
+}
 
 export function useProcessStatus() {
-  const { data, error, isLoading } = useSWR<ProcessStatus>(
-    'process',
-    fetcher,
-    {
-      refreshInterval: 5000, // 5秒ごとにポーリング
-      revalidateOnFocus: true, // ウィンドウフォーカス時に再検証
-    }
-  );
+  const isStreaming = useProcessStream();
+  const { data: state, error, isLoading } = useCockpitState({
+    refreshInterval: isStreaming ? 0 : 5000, // ストリーム切断時のみ5秒ごとにポーリング（変化がなければ 304）
+    revalidateOnFocus: !isStreaming, // ウィンドウフォーカス時に再検証
+  });
+  const data = state?.process;
 
-  const controlProcess = async (action: 'start' | 'stop' | 'restart') => {
+  /**
+   * プロセスを操作する（targets を省略すると設定された全プログラムが対象）
+   */
+  const controlProcess = async (action: ProcessAction, targets?: string[]) => {
     try {
       await requestAPI<{ status: string; message: string }>('process', {
         method: 'POST',
-        body: JSON.stringify({ action }),
+        body: JSON.stringify(targets ? { action, targets } : { action }),
       });
       // アクション実行後、即座にステータスを再取得
-      mutate('process');
+      mutate(STATE_KEY);
     } catch (error) {
       console.error(`Error ${action}ing process:`, error);
       throw error;
@@ -36,10 +109,16 @@ export function useProcessStatus() {
   return {
     status: data?.status || 'stopped',
     message: data?.message || '',
+    pid: data?.pid ?? null,
+    startTime: data?.start ?? null,
+    ready: data?.ready ?? null,
+    readyMessage: data?.ready_message || '',
+    programs: data?.programs ?? [],
     isLoading,
     error,
     start: () => controlProcess('start'),
     stop: () => controlProcess('stop'),
     restart: () => controlProcess('restart'),
+    controlPrograms: controlProcess,
   };
 }
@@ -0,0 +1,49 @@
+import useSWR from 'swr';
+import { requestAPI } from '../handler';
+
+export interface ResourceSample {
+  t: number;
+  cpu_percent: number | null;
+  rss: number | null;
+  threads: number | null;
+  fds: number | null;
+  read_rate: number | null;
+  write_rate: number | null;
+  processes: number | null;
+}
+
+export interface ResourceInfo {
+  enabled: boolean;
+  interval: number;
+  pid: number | null;
+  latest: ResourceSample | null;
+  window: number;
+  series: Record<string, Array<number | null>>;
+}
+
+const fetcher = (endPoint: string) => requestAPI<ResourceInfo>(endPoint);
+
+/**
+ * ComfyUIプロセスの資源使用量を取得する
+ *
+ * @param window 時系列を取得する期間（秒）
+ * @param points 時系列の点数
+ */
+export function useResources(window = 3600, points = 60) {
+  const { data, error, isLoading } = useSWR<ResourceInfo>(
+    `process/resources?window=${window}&points=${points}`,
+    fetcher,
+    {
+      refreshInterval: 10000, // 10秒ごとに更新
+      revalidateOnFocus: false,
+    }
+  );
+
+  return {
+    enabled: data?.enabled ?? false,
+    latest: data?.latest ?? null,
+    series: data?.series ?? {},
+    isLoading,
+    error,
+  };
+}
@@ -0,0 +1,52 @@
+import useSWR from 'swr';
+import { requestAPI } from '../handler';
+
+export interface LatencySummary {
+  count: number;
+  mean: number | null;
+  min: number | null;
+  max: number | null;
+  last: number | null;
+  p50: number | null;
+  p90: number | null;
+  p99: number | null;
+  buckets: Array<{ le: number | null; count: number }>;
+}
+
+export interface LifecycleRecord {
+  kind: string;
+  at: number;
+  outcome: 'success' | 'failed' | 'timeout';
+  phases: Record<string, number>;
+  version?: string;
+}
+
+export interface LifecycleTimings {
+  // 操作の種類（start / restart / switch など）→ 段階 → 所要時間の分布
+  histograms: Record<string, Record<string, LatencySummary>>;
+  history: LifecycleRecord[];
+}
+
+const fetcher = (endPoint: string) => requestAPI<LifecycleTimings>(endPoint);
+
+/**
+ * 起動・再起動・バージョン切り替えの段階ごとの所要時間を取得する
+ */
+export function useTimings(history = 10) {
+  const { data, error, isLoading, mutate } = useSWR<LifecycleTimings>(
+    `process/timings?history=${history}`,
+    fetcher,
+    {
+      refreshInterval: 30000, // 30秒ごとに更新
+      revalidateOnFocus: false,
+    }
+  );
+
+  return {
+    histograms: data?.histograms ?? {},
+    history: data?.history ?? [],
+    isLoading,
+    error,
+    mutate,
+  };
+}
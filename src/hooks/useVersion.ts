@@ -1,5 +1,6 @@
 import useSWR from 'swr';
-import { requestAPI } from '../handler';
+import { requestAPI, streamAPI } from '../handler';
+import { useCockpitState } from './useCockpitState';
 
 export interface VersionInfo {
   comfyui_version: string | null;
@@ -13,23 +14,88 @@ export interface VersionSwitchResult {
   success: boolean;
   message: string;
   version: string | null;
+  job_id?: string;
 }
 
-const fetcher = (endPoint: string) => requestAPI<VersionInfo>(endPoint);
-const versionListFetcher = (endPoint: string) => requestAPI<VersionListInfo>(endPoint);
+export interface VersionJobStep {
+  name: string;
+  status: 'pending' | 'running' | 'success' | 'warning' | 'failed' | 'skipped';
+  message: string;
+  duration: number | null;
+}
+
+export interface StagedVersion {
+  version: string | null;
+  path: string;
+  active: boolean;
+  previous: boolean;
+}
+
+export interface StagingInfo {
+  enabled: boolean;
+  current: string | null;
+  previous: string | null;
+  staged: StagedVersion[];
+}
+
+export interface VersionJob {
+  id: string;
+  kind: 'switch' | 'stage' | 'rollback';
+  target_version: string;
+  status: 'queued' | 'running' | 'success' | 'failed';
+  message: string;
+  steps: VersionJobStep[];
+  result: VersionSwitchResult | null;
+}
+
+const JOB_POLL_INTERVAL = 2000;
+
+const isJobFinished = (job: VersionJob | null): boolean =>
+  job !== null && (job.status === 'success' || job.status === 'failed');
+
+/**
+ * バージョン切り替えジョブの完了を待つ
+ *
+ * 進捗はストリームで受け取り、ストリームが途中で切れた場合はポーリングで待つ
+ */
+async function waitForVersionJob(
+  jobId: string,
+  onProgress?: (job: VersionJob) => void
+): Promise<VersionJob> {
+  const latest: { job: VersionJob | null } = { job: null };
+
+  try {
+    await streamAPI(`version/jobs/${jobId}/stream`, (event, data) => {
+      if (event === 'job') {
+        latest.job = data as VersionJob;
+        onProgress?.(latest.job);
+      }
+    });
+  } catch (error) {
+    console.warn('Version job stream disconnected:', error);
+  }
+
+  while (!isJobFinished(latest.job)) {
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL));
+    latest.job = await requestAPI<VersionJob>(`version/jobs/${jobId}`);
+    onProgress?.(latest.job);
+  }
+  return latest.job as VersionJob;
+}
+
+const stagingFetcher = (endPoint: string) => requestAPI<StagingInfo>(endPoint);
+
+// バージョン情報はプロセスの状態と同じ /state から受け取る（ポーリングは useProcessStatus が行う）
+const VERSION_STATE_OPTIONS = {
+  refreshInterval: 0,
+  revalidateOnFocus: false,
+};
 
 export function useVersion() {
-  const { data, error, isLoading, mutate } = useSWR<VersionInfo>(
-    'version',
-    fetcher,
-    {
-      refreshInterval: 0, // バージョン情報は変更されないので、一度だけ取得
-      revalidateOnFocus: false, // フォーカス時も再取得しない
-    }
-  );
+  const { data, error, isLoading, mutate } = useCockpitState(VERSION_STATE_OPTIONS);
 
   return {
-    comfyuiVersion: data?.comfyui_version || null,
+    comfyuiVersion: data?.version.comfyui_version || null,
     isLoading,
     error,
     mutate, // バージョン変更後に再取得用
@@ -37,32 +103,62 @@ export function useVersion() {
 }
 
 export function useVersionList() {
-  const { data, error, isLoading } = useSWR<VersionListInfo>(
-    'version?action=list',
-    versionListFetcher,
+  const { data, error, isLoading } = useCockpitState(VERSION_STATE_OPTIONS);
+
+  return {
+    availableVersions: data?.available_versions || [],
+    isLoading,
+    error,
+  };
+}
+
+export function useVersionStaging() {
+  const { data, error, isLoading, mutate } = useSWR<StagingInfo>(
+    'version/staging',
+    stagingFetcher,
     {
-      refreshInterval: 0, // 一度だけ取得
+      refreshInterval: 0, // 切り替え後に mutate で再取得
       revalidateOnFocus: false,
     }
   );
 
   return {
-    availableVersions: data?.available_versions || [],
+    stagingEnabled: data?.enabled ?? false,
+    previousVersion: data?.previous ?? null,
+    stagedVersions: data?.staged || [],
     isLoading,
     error,
+    mutate,
   };
 }
 
-export async function switchVersion(targetVersion: string): Promise<VersionSwitchResult> {
+/**
+ * バージョン関連のジョブを開始し、完了まで待つ
+ */
+async function runVersionJob(
+  endPoint: string,
+  body: Record<string, string>,
+  onProgress?: (job: VersionJob) => void
+): Promise<VersionSwitchResult> {
   try {
-    const result = await requestAPI<VersionSwitchResult>('version', {
+    const accepted = await requestAPI<VersionSwitchResult>(endPoint, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ version: targetVersion }),
+      body: JSON.stringify(body),
     });
-    return result;
+    if (!accepted.success || !accepted.job_id) {
+      return accepted;
+    }
+
+    // 切り替えはバックグラウンドジョブとして実行されるので完了を待つ
+    const job = await waitForVersionJob(accepted.job_id, onProgress);
+    return job.result ?? {
+      success: job.status === 'success',
+      message: job.message,
+      version: null,
+    };
   } catch (error) {
     console.error('Error switching version:', error);
     return {
@@ -74,3 +170,19 @@ export async function switchVersion(targetVersion: string): Promise<VersionSwitc
 }
 
 
+
+export function switchVersion(
+  targetVersion: string,
+  onProgress?: (job: VersionJob) => void
+): Promise<VersionSwitchResult> {
+  return runVersionJob('version', { version: targetVersion }, onProgress);
+}
+
+/**
+ * 直前のバージョンへ戻す（ステージングモードのみ）
+ */
+export function rollbackVersion(
+  onProgress?: (job: VersionJob) => void
+): Promise<VersionSwitchResult> {
+  return runVersionJob('version/staging', { action: 'rollback' }, onProgress);
+}
@@ -1,8 +1,11 @@
-import React from 'react';
+import React, { useState } from 'react';
 import { ReactWidget } from '@jupyterlab/apputils';
 import { IThemeManager } from '@jupyterlab/apputils';
+import { Box, Tab, Tabs } from '@mui/material';
 import { ComfyUIThemeProvider } from './theme-provider';
+import { TabPanel } from './components/common/TabPanel';
 import { ProcessPanel } from './features/process/ProcessPanel';
+import { LogPanel } from './features/logs/LogPanel';
 
 /**
  * ComfyUI Cockpitのメインコンポーネント
@@ -14,10 +17,26 @@ interface ComfyUICockpitComponentProps {
 const ComfyUICockpitComponent = ({
   themeManager
 }: ComfyUICockpitComponentProps) => {
+  const [tab, setTab] = useState(0);
+
   return (
     <ComfyUIThemeProvider themeManager={themeManager}>
       <div className="jp-ComfyUI-Cockpit-content">
-        <ProcessPanel />
+        <Box sx={{ height: '100%', display: 'flex', flexDirection: 'column' }}>
+          <Tabs value={tab} onChange={(_, value) => setTab(value)} variant="fullWidth">
+            <Tab label="プロセス" id="comfyui-tab-0" aria-controls="comfyui-tabpanel-0" />
+            <Tab label="ログ" id="comfyui-tab-1" aria-controls="comfyui-tabpanel-1" />
+          </Tabs>
+          <Box sx={{ flex: 1, minHeight: 0 }}>
+            <TabPanel value={tab} index={0}>
+              <ProcessPanel />
+            </TabPanel>
+            {/* ログのストリームは表示中のタブでだけ購読する */}
+            <TabPanel value={tab} index={1}>
+              <LogPanel />
+            </TabPanel>
+          </Box>
+        </Box>
       </div>
     </ComfyUIThemeProvider>
   );
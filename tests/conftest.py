@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep state files written by the services (timings, requirements state) out of the real cache."""
+    monkeypatch.setenv("COMFYUI_COCKPIT_CACHE_DIR", str(tmp_path / "cockpit-cache"))
@@ -0,0 +1,160 @@
+import asyncio
+
+from jupyterlab_comfyui_cockpit.services.actions import ProcessActionScheduler, process_actions
+from jupyterlab_comfyui_cockpit.services.version_jobs import (
+    StepFailed,
+    VersionJobManager,
+    restart_programs,
+)
+
+
+class GatedSupervisor:
+    """Records actions and blocks each one until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def perform_action(self, action, name):
+        self.calls.append((action, name))
+        await self.release.wait()
+        return True, f"{name}: {action} #{len(self.calls)}"
+
+
+class RestartingSwitcher:
+    """Restarts through the job's reservation after 'deps' is released."""
+
+    def __init__(self, supervisor, names, fail_deps=False):
+        self.supervisor = supervisor
+        self.service_names = names
+        self.fail_deps = fail_deps
+        self.release = asyncio.Event()
+
+    async def run(self, job):
+        async with job.step("checkout"):
+            pass
+        async with job.step("deps"):
+            await self.release.wait()
+            if self.fail_deps:
+                raise StepFailed("deps failed")
+        async with job.step("restart"):
+            for _, _, message in await restart_programs(job, self.supervisor, self.service_names):
+                job.log(message)
+        return {"success": True, "message": "switched", "version": job.target_version}
+
+
+async def _shared(supervisor, action):
+    """Requests an action through the scheduler that version jobs reserve slots in."""
+    return await process_actions.perform(supervisor, action, ["comfyui"])
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_identical_actions_run_once():
+    async def run():
+        scheduler = ProcessActionScheduler()
+        supervisor = GatedSupervisor()
+        requests = [asyncio.ensure_future(scheduler.perform(supervisor, "restart", ["comfyui"])) for _ in range(5)]
+        # 実行中の restart には start も合流する
+        requests.append(asyncio.ensure_future(scheduler.perform(supervisor, "start", ["comfyui"])))
+        await _settle()
+        supervisor.release.set()
+        return supervisor, await asyncio.gather(*requests), scheduler
+
+    supervisor, results, scheduler = asyncio.run(run())
+
+    assert supervisor.calls == [("restart", "comfyui")]
+    assert all(result == [("comfyui", True, "comfyui: restart #1")] for result in results)
+    assert scheduler.pending("comfyui") == []
+
+
+def test_conflicting_actions_run_in_request_order():
+    async def run():
+        scheduler = ProcessActionScheduler()
+        supervisor = GatedSupervisor()
+        first = asyncio.ensure_future(scheduler.perform(supervisor, "restart", ["comfyui"]))
+        await _settle()
+        stops = [asyncio.ensure_future(scheduler.perform(supervisor, "stop", ["comfyui"])) for _ in range(2)]
+        start = asyncio.ensure_future(scheduler.perform(supervisor, "start", ["comfyui"]))
+        await _settle()
+        pending = scheduler.pending("comfyui")
+        supervisor.release.set()
+        await asyncio.gather(first, *stops, start)
+        return supervisor, pending
+
+    supervisor, pending = asyncio.run(run())
+
+    assert pending == ["restart", "stop", "start"]
+    assert supervisor.calls == [("restart", "comfyui"), ("stop", "comfyui"), ("start", "comfyui")]
+
+
+def test_programs_are_operated_in_parallel():
+    async def run():
+        scheduler = ProcessActionScheduler()
+        supervisor = GatedSupervisor()
+        request = asyncio.ensure_future(scheduler.perform(supervisor, "restart", ["comfyui", "worker"]))
+        await _settle()
+        calls = list(supervisor.calls)
+        supervisor.release.set()
+        await request
+        return calls
+
+    assert asyncio.run(run()) == [("restart", "comfyui"), ("restart", "worker")]
+
+
+def test_restart_during_version_switch_joins_the_switch_restart():
+    async def run():
+        manager = VersionJobManager()
+        supervisor = GatedSupervisor()
+        supervisor.release.set()
+        switcher = RestartingSwitcher(supervisor, ["comfyui"])
+        job = manager.submit("v1.0.0", switcher)
+        await _settle()
+
+        # 切り替え中に押された restart は切り替えの再起動に合流し、stop はその後に実行される
+        restarts = [asyncio.ensure_future(_shared(supervisor, "restart")) for _ in range(3)]
+        stop = asyncio.ensure_future(_shared(supervisor, "stop"))
+        await _settle()
+        assert supervisor.calls == []
+
+        switcher.release.set()
+        await manager.wait(job.id)
+        return job, supervisor, await asyncio.gather(*restarts), await stop
+
+    job, supervisor, restarts, stop = asyncio.run(run())
+
+    assert job.status == "success"
+    assert supervisor.calls == [("restart", "comfyui"), ("stop", "comfyui")]
+    assert all(result == [("comfyui", True, "comfyui: restart #1")] for result in restarts)
+    assert stop == [("comfyui", True, "comfyui: stop #2")]
+
+
+def test_failed_switch_still_restarts_for_joined_callers():
+    async def run():
+        manager = VersionJobManager()
+        supervisor = GatedSupervisor()
+        supervisor.release.set()
+
+        lone = RestartingSwitcher(supervisor, ["comfyui"], fail_deps=True)
+        lone.release.set()
+        await manager.wait(manager.submit("v1.0.0", lone).id)
+        await _settle()
+        calls_without_joiners = list(supervisor.calls)
+
+        joined = RestartingSwitcher(supervisor, ["comfyui"], fail_deps=True)
+        job = manager.submit("v1.1.0", joined)
+        request = asyncio.ensure_future(_shared(supervisor, "restart"))
+        await _settle()
+        joined.release.set()
+        await manager.wait(job.id)
+        return job, calls_without_joiners, supervisor.calls, await request
+
+    job, calls_without_joiners, calls, result = asyncio.run(run())
+
+    assert job.status == "failed"
+    assert calls_without_joiners == []
+    assert calls == [("restart", "comfyui")]
+    assert result == [("comfyui", True, "comfyui: restart #1")]
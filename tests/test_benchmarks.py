@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from jupyterlab_comfyui_cockpit.services.supervisor import parse_status_line
+
+BENCHMARKS = Path(__file__).resolve().parent.parent / "benchmarks"
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("cockpit_load", BENCHMARKS / "load.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_summary_reports_rate_and_percentiles_in_milliseconds():
+    load = _load_module()
+    summary = load.summarize([i / 1000 for i in range(1, 101)], errors=2, elapsed=2.0)
+
+    assert summary["requests"] == 100
+    assert summary["errors"] == 2
+    assert summary["rps"] == 50.0
+    assert summary["latency_ms"]["p50"] == 50.0
+    assert summary["latency_ms"]["p99"] == 99.0
+    assert summary["latency_ms"]["max"] == 100.0
+
+
+def test_subprocess_counts_are_read_from_metrics_output():
+    load = _load_module()
+    text = 'comfyui_cockpit_subprocess_total{command="supervisorctl"} 12\ncomfyui_cockpit_subprocess_total{command="git"} 1\n'
+    assert load.parse_subprocess_counts(text) == {"supervisorctl": 12.0, "git": 1.0}
+
+
+def test_fake_supervisorctl_output_parses_like_the_real_one():
+    env = {**os.environ, "FAKE_SUPERVISORCTL_LATENCY": "0"}
+    result = subprocess.run(
+        [sys.executable, str(BENCHMARKS / "fakebin" / "supervisorctl"), "status", "comfyui", "gpu1"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    infos = [parse_status_line(line) for line in result.stdout.splitlines()]
+    assert [(info.name, info.status, info.pid) for info in infos] == [("comfyui", "running", 1000), ("gpu1", "running", 1001)]
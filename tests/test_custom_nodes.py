@@ -0,0 +1,138 @@
+import asyncio
+import os
+import subprocess
+import time
+
+from jupyterlab_comfyui_cockpit.services import custom_nodes
+from jupyterlab_comfyui_cockpit.services.commands import CommandResult
+from jupyterlab_comfyui_cockpit.services.custom_nodes import CustomNodeInventory, parse_import_times
+from jupyterlab_comfyui_cockpit.services.git_refs import GitRepository
+
+
+def _git(path, *args):
+    subprocess.run(["git", "-C", str(path), *args], check=True, capture_output=True)
+
+
+def _repo(path):
+    path.mkdir(parents=True)
+    _git(path, "init", "-q", "-b", "main")
+    _git(path, "config", "user.email", "test@example.com")
+    _git(path, "config", "user.name", "test")
+    _git(path, "remote", "add", "origin", "https://github.com/example/node.git")
+    (path / "__init__.py").write_text("NODE_CLASS_MAPPINGS = {}\n")
+    (path / "requirements.txt").write_text("numpy\n")
+    _git(path, "add", ".")
+    _git(path, "commit", "-q", "-m", "init")
+
+
+def test_remote_and_branch_are_read_from_git_files(tmp_path):
+    _repo(tmp_path / "node")
+    repo = GitRepository(tmp_path / "node")
+    assert repo.branch() == "main"
+    assert repo.remote_url() == "https://github.com/example/node.git"
+    assert repo.remote_url("upstream") == "https://github.com/example/node.git"
+
+
+def test_inventory_reports_git_state_dependencies_and_disabled_nodes(tmp_path):
+    root = tmp_path / "custom_nodes"
+    _repo(root / "ComfyUI-Impact-Pack")
+    (root / "plain-node").mkdir()
+    (root / "plain-node" / "install.py").write_text("")
+    (root / "websocket_image_save.py").write_text("")
+    (root / ".disabled").mkdir()
+    (root / ".disabled" / "old-node").mkdir()
+    (root / "__pycache__").mkdir()
+
+    inventory = CustomNodeInventory(root, workers=2)
+    nodes = {node.name: node for node in asyncio.run(inventory.collect())}
+
+    assert set(nodes) == {"ComfyUI-Impact-Pack", "plain-node", "websocket_image_save.py", "old-node"}
+    impact = nodes["ComfyUI-Impact-Pack"]
+    assert impact.git and impact.branch == "main" and impact.dirty is False
+    assert impact.remote == "https://github.com/example/node.git"
+    assert len(impact.commit) == 40
+    assert impact.dependencies == ["requirements.txt"]
+    assert impact.size > 0
+    assert nodes["plain-node"].dependencies == ["install.py"]
+    assert nodes["plain-node"].git is False
+    assert nodes["websocket_image_save.py"].kind == "file"
+    assert nodes["old-node"].enabled is False
+
+    (root / "ComfyUI-Impact-Pack" / "__init__.py").write_text("changed\n")
+    assert asyncio.run(inventory.collect(force=True))[0].dirty is True
+
+
+def test_warm_inventory_of_150_nodes_runs_no_git(tmp_path, monkeypatch):
+    root = tmp_path / "custom_nodes"
+    for i in range(150):
+        git_dir = root / f"node-{i:03d}" / ".git"
+        (git_dir / "refs" / "heads").mkdir(parents=True)
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        (git_dir / "refs" / "heads" / "main").write_text(f"{i:040x}\n")
+        (git_dir / "config").write_text('[remote "origin"]\n\turl = https://example.com/node.git\n')
+
+    calls = []
+
+    async def fake_run_command(cmd, timeout=None, on_line=None):
+        calls.append(cmd)
+        return CommandResult(0, "", "")
+
+    monkeypatch.setattr(custom_nodes, "run_command", fake_run_command)
+    inventory = CustomNodeInventory(root)
+
+    cold = asyncio.run(inventory.collect())
+    assert len(cold) == 150 and len(calls) == 150
+
+    started = time.monotonic()
+    warm = asyncio.run(inventory.collect())
+    assert time.monotonic() - started < 1.0
+    assert len(calls) == 150
+    assert [node.commit for node in warm] == [node.commit for node in cold]
+
+    ref = root / "node-007" / ".git" / "refs" / "heads" / "main"
+    ref.write_text(f"{999:040x}\n")
+    os.utime(ref, ns=(0, ref.stat().st_mtime_ns + 1_000_000_000))
+    refreshed = {node.name: node for node in asyncio.run(inventory.collect())}
+    assert refreshed["node-007"].commit == f"{999:040x}"
+    assert len(calls) == 151
+
+
+def test_forced_collect_does_not_join_a_cached_collection(tmp_path, monkeypatch):
+    root = tmp_path / "custom_nodes"
+    for i in range(3):
+        git_dir = root / f"node-{i}" / ".git"
+        git_dir.mkdir(parents=True)
+        (git_dir / "HEAD").write_text(f"{i:040x}\n")
+
+    calls = []
+
+    async def fake_run_command(cmd, timeout=None, on_line=None):
+        calls.append(cmd)
+        return CommandResult(0, "", "")
+
+    monkeypatch.setattr(custom_nodes, "run_command", fake_run_command)
+    inventory = CustomNodeInventory(root)
+    asyncio.run(inventory.collect())
+    assert len(calls) == 3
+
+    async def run():
+        return await asyncio.gather(inventory.collect(), inventory.collect(force=True), inventory.collect(force=True))
+
+    cached, forced, joined = asyncio.run(run())
+    assert len(calls) == 6
+    assert forced is joined
+    assert [node.name for node in cached] == [node.name for node in forced]
+
+
+def test_import_times_are_parsed_from_the_startup_log():
+    log = """
+Import times for custom nodes:
+   0.0 seconds: /opt/app/ComfyUI/custom_nodes/websocket_image_save.py
+   0.4 seconds (IMPORT FAILED): /opt/app/ComfyUI/custom_nodes/broken-node
+  12.7 seconds: /opt/app/ComfyUI/custom_nodes/ComfyUI-Impact-Pack
+"""
+    assert parse_import_times(log) == {
+        "websocket_image_save.py": (0.0, False),
+        "broken-node": (0.4, True),
+        "ComfyUI-Impact-Pack": (12.7, False),
+    }
@@ -1,6 +1,15 @@
+import asyncio
 import re
 
-from jupyterlab_comfyui_cockpit.handlers._dummy.dummy_process import DummyProcessState
+from jupyterlab_comfyui_cockpit.handlers._dummy import (
+    DummyProcessState,
+    DummySettings,
+    DummySupervisor,
+    DummyVersions,
+    DummyVersionSwitcher,
+)
+from jupyterlab_comfyui_cockpit.services.supervisor import perform_actions
+from jupyterlab_comfyui_cockpit.services.version_jobs import VersionJobManager
 
 
 class FakeIOLoop:
@@ -77,3 +86,93 @@ def test_restart_cancels_previous_pending_transition_and_reschedules():
     assert s.get_status_payload()["status"] == "running"
 
 
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_ready_follows_the_injected_clock():
+    loop = FakeIOLoop()
+    clock = FakeClock()
+    s = DummyProcessState(settings=DummySettings(load_seconds=5.0), clock=clock)
+
+    s.restart(loop)
+    loop.run_next()
+    first = s.get_status_payload()
+    assert first["status"] == "running"
+    assert first["ready"] is False
+
+    clock.now += 5.0
+    assert s.get_status_payload()["ready"] is True
+    assert "uptime 0:00:05" in s.get_status_payload()["message"]
+
+
+def test_failed_starts_back_off_then_become_fatal():
+    loop = FakeIOLoop()
+    lines = []
+    s = DummyProcessState(settings=DummySettings(start_failure_rate=1.0, start_retries=2), log=lines.append)
+
+    s.restart(loop)
+    delays = []
+    for _ in range(5):
+        _, delay = loop.run_next()
+        delays.append(delay)
+
+    payload = s.get_status_payload()
+    assert payload["state"] == "FATAL"
+    assert payload["status"] == "error"
+    assert payload["exitstatus"] == 1
+    # attempt, backoff 1s, attempt, backoff 2s, final attempt
+    assert delays == [1.0, 1.0, 1.0, 2.0, 1.0]
+    assert not loop._scheduled
+    assert "FATAL" in lines[-1]
+
+    s.start(loop)
+    assert s.get_status_payload()["state"] == "STARTING"
+
+
+def test_crash_restarts_with_a_new_pid():
+    loop = FakeIOLoop()
+    s = DummyProcessState(settings=DummySettings(crash_interval=60.0, seed=1))
+
+    s.restart(loop)
+    loop.run_next()
+    pid = s.get_status_payload()["pid"]
+    assert len(loop._scheduled) == 1
+
+    loop.run_next()
+    assert s.get_status_payload()["state"] == "STARTING"
+    loop.run_next()
+    payload = s.get_status_payload()
+    assert payload["status"] == "running"
+    assert payload["pid"] != pid
+
+
+def test_dummy_supervisor_runs_each_program_and_switches_versions():
+    async def run():
+        settings = DummySettings(start_seconds=0.0, tags=["v2", "v1"])
+        supervisor = DummySupervisor(["comfyui", "worker"], settings)
+        versions = DummyVersions(supervisor)
+        assert versions.current == "v2"
+
+        results = await perform_actions(supervisor, "stop", ["comfyui", "worker", "missing"])
+        assert [ok for _, ok, _ in results] == [True, True, False]
+        assert supervisor.get_status_payload()["status"] == "stopped"
+
+        manager = VersionJobManager()
+        job = manager.submit("v1", DummyVersionSwitcher(versions, supervisor))
+        await manager.wait(job.id)
+        await asyncio.sleep(0.01)
+        return job, versions, supervisor.get_status_payload()
+
+    job, versions, payload = asyncio.run(run())
+    assert job.status == "success"
+    assert versions.current == "v1"
+    assert [p["name"] for p in payload["programs"]] == ["comfyui", "worker"]
+    assert all(p["status"] == "running" for p in payload["programs"])
+    assert payload["programs"][0]["pid"] != payload["programs"][1]["pid"]
@@ -0,0 +1,97 @@
+import asyncio
+import os
+
+from jupyterlab_comfyui_cockpit.services.environment import (
+    EnvironmentInventory,
+    check_requirements,
+    read_metadata_headers,
+    summarize_checks,
+)
+from jupyterlab_comfyui_cockpit.services.requirements import RequirementSet
+
+
+def install(site, name, version, kind="dist-info"):
+    if kind == "dist-info":
+        path = site / f"{name.replace('-', '_')}-{version}.dist-info"
+        path.mkdir(parents=True)
+        (path / "METADATA").write_text(
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n\nName: not-a-header\n"
+        )
+    else:
+        site.mkdir(parents=True, exist_ok=True)
+        (site / f"{name}-{version}.egg-info").write_text(f"Metadata-Version: 1.0\nName: {name}\nVersion: {version}\n")
+    return site
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class CountingInventory(EnvironmentInventory):
+    scans = 0
+
+    def scan(self):
+        self.scans += 1
+        return super().scan()
+
+
+def test_reads_dist_info_and_egg_info(tmp_path):
+    site = tmp_path / "site-packages"
+    install(site, "Pillow", "10.2.0")
+    install(site, "legacy_pkg", "0.1", kind="egg-info")
+
+    packages = asyncio.run(EnvironmentInventory([site]).get())
+
+    assert {name: package.version for name, package in packages.items()} == {"pillow": "10.2.0", "legacy-pkg": "0.1"}
+    assert packages["pillow"].name == "Pillow"
+    assert read_metadata_headers(site / "missing.dist-info") is None
+
+
+def test_earlier_site_directory_takes_precedence(tmp_path):
+    first = install(tmp_path / "venv", "torch", "2.3.0")
+    second = install(tmp_path / "system", "torch", "2.1.0")
+
+    packages = asyncio.run(EnvironmentInventory([first, second, tmp_path / "missing"]).get())
+
+    assert packages["torch"].version == "2.3.0"
+    assert packages["torch"].location == str(first)
+
+
+def test_inventory_is_cached_until_site_packages_changes(tmp_path):
+    site = install(tmp_path / "site-packages", "numpy", "1.26.4")
+    inventory = CountingInventory([site])
+
+    async def run():
+        shared = await asyncio.gather(*(inventory.get() for _ in range(3)))
+        cached = await inventory.get()
+        install(site, "safetensors", "0.4.2")
+        bump_mtime(site)
+        updated = await inventory.get()
+        return shared, cached, updated
+
+    shared, cached, updated = asyncio.run(run())
+
+    assert inventory.scans == 2
+    assert all(packages is shared[0] for packages in shared + [cached])
+    assert set(updated) == {"numpy", "safetensors"}
+
+
+def test_check_requirements_reports_each_requirement(tmp_path):
+    site = tmp_path / "site-packages"
+    for name, version in [("torch", "2.1.0"), ("numpy", "1.26.4"), ("Pillow", "10.2.0")]:
+        install(site, name, version)
+    packages = asyncio.run(EnvironmentInventory([site]).get())
+    requirements = RequirementSet.parse(
+        "torch>=2.0\nnumpy<1.25\npillow\nkornia>=0.7.1\n"
+        "pywin32; sys_platform == 'nonexistent'\n--extra-index-url https://example.com\n"
+    )
+
+    results = {result["name"]: result for result in check_requirements(packages, requirements)}
+
+    assert results["torch"]["status"] == "ok"
+    assert results["numpy"] == {"requirement": "numpy<1.25", "name": "numpy", "installed": "1.26.4", "status": "mismatch"}
+    assert results["pillow"]["status"] == "ok"
+    assert results["kornia"]["status"] == "missing"
+    assert results["pywin32"]["status"] == "skipped"
+    assert summarize_checks(list(results.values())) == {"ok": 2, "mismatch": 1, "missing": 1, "skipped": 1, "unknown": 0}
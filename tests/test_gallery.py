@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.gallery import OutputIndex, ThumbnailCache, media_kind
+
+
+def _write(path, data=b"x", mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _fake_render(calls):
+    def render(source, destination, size):
+        calls.append(os.path.basename(source))
+        destination.write_bytes(b"t" * 100)
+    return render
+
+
+def test_output_index_lists_newest_first(tmp_path):
+    root = tmp_path / "output"
+    _write(root / "ComfyUI_00001_.png", mtime=1_000)
+    _write(root / "ComfyUI_00002_.png", mtime=3_000)
+    _write(root / "video" / "clip_00001.mp4", mtime=2_000)
+    _write(root / "workflow.json", mtime=4_000)
+    index = OutputIndex(root, tmp_path / "output.sqlite3")
+
+    index.scan()
+    page = index.query(sort="-mtime")
+
+    assert [m["path"] for m in page["models"]] == [
+        "ComfyUI_00002_.png",
+        "video/clip_00001.mp4",
+        "ComfyUI_00001_.png",
+    ]
+    assert [media_kind(m["name"]) for m in page["models"]] == ["image", "video", "image"]
+
+
+def test_thumbnail_cache_reuses_and_evicts_least_recently_used(tmp_path):
+    calls = []
+    cache = ThumbnailCache(tmp_path / "thumbnails", max_bytes=250, render=_fake_render(calls))
+    sources = []
+    for i in range(3):
+        source = tmp_path / f"{i}.png"
+        _write(source)
+        sources.append(source)
+
+    async def run():
+        first = await cache.get(sources[0], "0.png")
+        second = await cache.get(sources[1], "1.png")
+        assert await cache.get(sources[0], "0.png") == first
+        # 0.png を使ったばかりなので、3つ目を入れると 1.png が追い出される
+        third = await cache.get(sources[2], "2.png")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert calls == ["0.png", "1.png", "2.png"]
+    assert sorted(os.listdir(tmp_path / "thumbnails")) == sorted([first, third])
+    assert cache.total_bytes == 200
+
+
+def test_thumbnail_cache_restores_lru_order_from_disk(tmp_path):
+    directory = tmp_path / "thumbnails"
+    _write(directory / "old.webp", b"t" * 100, mtime=1_000)
+    _write(directory / "new.webp", b"t" * 100, mtime=2_000)
+    cache = ThumbnailCache(directory, max_bytes=250, render=_fake_render([]))
+    source = tmp_path / "a.png"
+    _write(source)
+
+    asyncio.run(cache.get(source, "a.png"))
+
+    assert not (directory / "old.webp").exists()
+    assert (directory / "new.webp").exists()
+
+
+def test_thumbnail_cache_renders_concurrent_requests_once(tmp_path):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def render(source, destination, size):
+        calls.append(source)
+        started.set()
+        release.wait(5)
+        destination.write_bytes(b"t")
+
+    cache = ThumbnailCache(tmp_path / "thumbnails", max_bytes=1024, render=render)
+    source = tmp_path / "a.png"
+    _write(source)
+
+    async def run():
+        tasks = [asyncio.ensure_future(cache.get(source, "a.png")) for _ in range(5)]
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    names = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert len(set(names)) == 1
+
+
+def test_thumbnail_key_changes_with_source(tmp_path):
+    cache = ThumbnailCache(tmp_path, max_bytes=1024, render=_fake_render([]))
+
+    assert cache.key("a.png", 10, 1.0) == cache.key("a.png", 10, 1.0)
+    assert cache.key("a.png", 10, 1.0) != cache.key("a.png", 10, 2.0)
+    assert not cache.supported("clip.mp4")
+    assert not ThumbnailCache(tmp_path, max_bytes=1024, render=None).supported("a.png")
+
+
+def test_render_thumbnail_creates_small_webp(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    from jupyterlab_comfyui_cockpit.services.gallery import render_thumbnail
+
+    source = tmp_path / "large.png"
+    Image.new("RGB", (1024, 512), "red").save(source)
+    destination = tmp_path / "thumb.webp"
+
+    render_thumbnail(source, destination, 128)
+
+    with Image.open(destination) as thumbnail:
+        assert thumbnail.format == "WEBP"
+        assert thumbnail.size == (128, 64)
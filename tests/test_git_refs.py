@@ -0,0 +1,111 @@
+import asyncio
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.git_refs import GitRepository, VersionMetadata
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def git(repo, *args):
+    result = subprocess.run(["git", "-C", str(repo), *args], capture_output=True, text=True, env=GIT_ENV, check=True)
+    return result.stdout.strip()
+
+
+def commit(repo, message):
+    (repo / "file.txt").write_text(message)
+    git(repo, "add", "file.txt")
+    git(repo, "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "ComfyUI"
+    path.mkdir()
+    git(path, "init", "-q")
+    commit(path, "first")
+    git(path, "tag", "v0.2.0")
+    commit(path, "second")
+    git(path, "tag", "-a", "v0.10.0", "-m", "annotated")
+    commit(path, "third")
+    git(path, "tag", "v0.9.1")
+    return path
+
+
+def test_tags_match_git_version_sort(repo):
+    expected = git(repo, "tag", "--sort=-version:refname").splitlines()
+    assert VersionMetadata(repo).available_versions() == expected
+
+    git(repo, "pack-refs", "--all")
+    assert VersionMetadata(repo).available_versions() == expected
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_current_version_resolves_tags_in_process(repo, packed):
+    if packed:
+        git(repo, "pack-refs", "--all")
+    git(repo, "checkout", "-q", "v0.10.0")
+
+    metadata = VersionMetadata(repo)
+    assert metadata.head_tag() == "v0.10.0"
+    assert asyncio.run(metadata.current_version()) == git(repo, "describe", "--tags", "--always")
+
+
+def test_head_between_tags_falls_back_to_describe(repo):
+    commit(repo, "untagged")
+    metadata = VersionMetadata(repo)
+    assert metadata.head_tag() is None
+    assert asyncio.run(metadata.current_version()) == git(repo, "describe", "--tags", "--always")
+
+
+def test_cache_is_invalidated_by_external_git_changes(repo):
+    metadata = VersionMetadata(repo)
+    assert not metadata.tag_exists("v1.0.0")
+    assert asyncio.run(metadata.current_version()) == "v0.9.1"
+
+    git(repo, "tag", "v1.0.0")
+    assert metadata.tag_exists("v1.0.0")
+    assert metadata.available_versions(limit=1) == ["v1.0.0"]
+
+    git(repo, "checkout", "-q", "v0.2.0")
+    assert asyncio.run(metadata.current_version()) == "v0.2.0"
+
+
+def test_version_file_takes_precedence(repo):
+    (repo / "comfyui_version.py").write_text('__version__ = "0.3.7"\n')
+    assert asyncio.run(VersionMetadata(repo).current_version()) == "0.3.7"
+
+
+def test_worktree_reads_shared_refs(repo, tmp_path):
+    worktree = tmp_path / "staged"
+    git(repo, "worktree", "add", "-q", "--detach", str(worktree), "v0.10.0")
+
+    worktree_repo = GitRepository(worktree)
+    assert worktree_repo.head() == git(worktree, "rev-parse", "HEAD")
+    assert VersionMetadata(worktree).head_tag() == "v0.10.0"
+
+
+def test_missing_repository_is_empty(tmp_path):
+    metadata = VersionMetadata(tmp_path)
+    assert metadata.available_versions() == []
+    assert asyncio.run(metadata.current_version()) is None
+
+
+def test_read_file_returns_content_at_tag(repo):
+    metadata = VersionMetadata(repo)
+
+    assert asyncio.run(metadata.read_file("v0.2.0", "file.txt")) == "first"
+    assert asyncio.run(metadata.read_file("v0.10.0", "file.txt")) == "second"
+    assert asyncio.run(metadata.read_file("v0.2.0", "missing.txt")) is None
+    assert asyncio.run(metadata.read_file("v9.9.9", "file.txt")) is None
@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+from jupyterlab_comfyui_cockpit.services import logs
+from jupyterlab_comfyui_cockpit.services.logs import LogRingBuffer, LogTailer, read_chunk
+
+
+def test_read_chunk_returns_incremental_ranges(tmp_path):
+    path = tmp_path / "comfyui.log"
+    path.write_bytes(b"line1\nline2\nline3\n")
+
+    first = read_chunk(path, 0, limit=6)
+    assert (first.offset, first.next_offset, first.data) == (0, 6, "line1\n")
+
+    rest = read_chunk(path, first.next_offset)
+    assert rest.data == "line2\nline3\n"
+    assert rest.next_offset == rest.size == 18
+
+    assert read_chunk(path, rest.next_offset).data == ""
+
+
+def test_read_chunk_tail_starts_at_line_boundary(tmp_path):
+    path = tmp_path / "comfyui.log"
+    path.write_bytes(b"first line\nsecond\nthird\n")
+
+    chunk = read_chunk(path, -10)
+    assert chunk.data == "third\n"
+    assert chunk.offset == 18
+
+
+def test_read_chunk_does_not_split_multibyte_characters(tmp_path):
+    path = tmp_path / "comfyui.log"
+    path.write_bytes("ログ\n".encode("utf-8"))
+
+    chunk = read_chunk(path, 0, limit=4)
+    assert chunk.data == "ロ"
+    assert chunk.next_offset == 3
+    assert read_chunk(path, chunk.next_offset).data == "グ\n"
+
+
+def test_read_chunk_restarts_when_file_was_truncated(tmp_path):
+    path = tmp_path / "comfyui.log"
+    path.write_bytes(b"new\n")
+
+    chunk = read_chunk(path, 100)
+    assert chunk.reset
+    assert chunk.data == "new\n"
+
+
+def test_ring_buffer_keeps_only_recent_bytes():
+    buffer = LogRingBuffer(capacity=8)
+    buffer.append(0, b"aaaa")
+    buffer.append(4, b"bbbb")
+    buffer.append(8, b"cccc")
+
+    assert buffer.start_offset == 4
+    assert buffer.end_offset == 12
+    assert buffer.read_from(6) == b"bbcccc"
+    assert buffer.read_from(0) is None
+
+
+def test_tailer_sends_catch_up_then_only_appended_bytes(tmp_path):
+    path = tmp_path / "comfyui.log"
+    path.write_bytes(b"old line\n")
+
+    async def run():
+        tailer = LogTailer(path, interval=0.01, buffer_size=1024)
+        subscription = tailer.subscribe(0)
+        events = [await subscription.get()]
+
+        with open(path, "ab") as f:
+            f.write(b"new line\n")
+        events.append(await asyncio.wait_for(subscription.get(), 1))
+
+        # ファイルが置き換えられたら reset を送り、先頭から読み直す
+        replacement = tmp_path / "replacement.log"
+        replacement.write_bytes(b"rotated\n")
+        os.replace(replacement, path)
+        events.append(await asyncio.wait_for(subscription.get(), 1))
+        events.append(await asyncio.wait_for(subscription.get(), 1))
+
+        subscription.close()
+        await asyncio.sleep(0.05)
+        return tailer, events
+
+    tailer, events = asyncio.run(run())
+    assert events[0] == {
+        "event": "chunk",
+        "data": {"offset": 0, "next_offset": 9, "size": 9, "data": "old line\n", "reset": False},
+    }
+    assert events[1]["data"]["offset"] == 9
+    assert events[1]["data"]["data"] == "new line\n"
+    assert events[2]["event"] == "reset"
+    assert events[3]["data"]["offset"] == 0
+    assert events[3]["data"]["data"] == "rotated\n"
+    assert tailer.subscriber_count == 0
+
+
+def test_tailer_serves_late_subscribers_from_buffer(tmp_path, monkeypatch):
+    path = tmp_path / "comfyui.log"
+    path.write_bytes(b"a\nb\nc\n")
+
+    def fail_read(*args):
+        raise AssertionError("catch-up should be served from the ring buffer")
+
+    async def run():
+        tailer = LogTailer(path, interval=0.01, buffer_size=1024)
+        first = tailer.subscribe(0)
+        await first.get()
+        monkeypatch.setattr(logs, "read_chunk", fail_read)
+        second = tailer.subscribe(2)
+        event = await second.get()
+        first.close()
+        second.close()
+        return event
+
+    event = asyncio.run(run())
+    assert event["data"]["data"] == "b\nc\n"
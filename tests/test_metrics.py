@@ -0,0 +1,107 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.commands import command_label, run_command
+from jupyterlab_comfyui_cockpit.services.metrics import MetricsRegistry, metrics
+from jupyterlab_comfyui_cockpit.services.pool import ConnectionPool
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("handler", "code"))
+    latency = registry.histogram("latency_seconds", "Latency.", ("handler",), buckets=(0.1, 1.0))
+    requests.inc("process", "200")
+    requests.inc("process", "200")
+    latency.observe(0.05, "process")
+    latency.observe(0.5, "process")
+    latency.observe(5, "process")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{handler="process",code="200"} 2' in lines
+    assert 'latency_seconds_bucket{handler="process",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{handler="process",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{handler="process",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{handler="process"} 5.55' in lines
+    assert 'latency_seconds_count{handler="process"} 3' in lines
+
+
+def test_registering_the_same_metric_twice_returns_it():
+    registry = MetricsRegistry()
+    first = registry.counter("total", "Total.", ("a",))
+    assert registry.counter("total", "Total.", ("a",)) is first
+    with pytest.raises(ValueError):
+        registry.histogram("total", "Total.", ("a",))
+
+
+def test_counters_do_not_lose_concurrent_increments():
+    counter = MetricsRegistry().counter("hits_total", "Hits.", ("cache",))
+
+    def work():
+        for _ in range(10000):
+            counter.inc("status")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value("status") == 80000
+
+
+def test_command_label_unwraps_python_modules():
+    assert command_label(["/usr/bin/supervisorctl", "status"]) == "supervisorctl"
+    assert command_label([sys.executable, "-m", "pip", "install"]) == "pip"
+    assert command_label(["git", "-C", "/x", "checkout"]) == "git"
+
+
+def test_run_command_counts_forks_failures_and_timeouts():
+    python = command_label([sys.executable])
+    total = metrics.counter("comfyui_cockpit_subprocess_total", "", ("command",))
+    failures = metrics.counter("comfyui_cockpit_subprocess_failures_total", "", ("command",))
+    timeouts = metrics.counter("comfyui_cockpit_subprocess_timeouts_total", "", ("command",))
+    duration = metrics.histogram("comfyui_cockpit_subprocess_duration_seconds", "", ("command",))
+    before = (total.value(python), failures.value(python), timeouts.value(python), duration.count(python))
+
+    async def run():
+        await run_command([sys.executable, "-c", "pass"])
+        await run_command([sys.executable, "-c", "raise SystemExit(1)"])
+        with pytest.raises(subprocess.TimeoutExpired):
+            await run_command([sys.executable, "-c", "import time; time.sleep(5)"], timeout=0.2)
+
+    asyncio.run(run())
+    after = (total.value(python), failures.value(python), timeouts.value(python), duration.count(python))
+    assert [b - a for a, b in zip(before, after)] == [3, 1, 1, 3]
+
+
+def test_run_command_kills_the_child_when_cancelled():
+    script = "import os, time; print(os.getpid(), flush=True); time.sleep(30)"
+    lines = []
+
+    async def run():
+        task = asyncio.ensure_future(run_command([sys.executable, "-c", script], on_line=lines.append))
+        while not lines:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    # killed and reaped, so not even a zombie is left
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(lines[0]), 0)
+
+
+def test_connection_pool_reports_reuse_as_cache_hits():
+    hits = metrics.counter("comfyui_cockpit_cache_requests_total", "", ("cache", "result"))
+    pool = ConnectionPool(object, maxsize=1, name="test_pool")
+    for _ in range(3):
+        with pool.connection():
+            pass
+    assert hits.value("test_pool", "miss") == 1
+    assert hits.value("test_pool", "hit") == 2
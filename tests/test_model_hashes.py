@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import os
+
+from jupyterlab_comfyui_cockpit.services.model_hashes import ModelHasher, RateLimiter, sha256_file
+from jupyterlab_comfyui_cockpit.services.models import ModelIndex
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def test_chunked_hash_matches_hashlib(tmp_path):
+    path = tmp_path / "model.safetensors"
+    content = os.urandom(100_000)
+    path.write_bytes(content)
+    read = []
+
+    assert sha256_file(path, chunk_size=4096, on_read=read.append) == hashlib.sha256(content).hexdigest()
+    assert sum(read) == len(content)
+
+
+def test_rate_limiter_sleeps_for_the_deficit():
+    now = [0.0]
+    slept = []
+    limiter = RateLimiter(100.0, clock=lambda: now[0], sleep=slept.append)
+
+    limiter.acquire(100)  # the initial one-second burst
+    limiter.acquire(50)
+    assert slept == [0.5]
+
+    now[0] = 10.0
+    limiter.acquire(100)
+    assert slept == [0.5]
+
+
+def _hasher(tmp_path, root):
+    return ModelHasher(ModelIndex(root, tmp_path / "index.sqlite3"), workers=3)
+
+
+def test_duplicates_are_grouped_and_hardlinks_are_not_reclaimable(tmp_path):
+    root = tmp_path / "models"
+    same = b"a" * 1000
+    _write(root / "checkpoints" / "v1.safetensors", same)
+    _write(root / "checkpoints" / "copy.safetensors", same)
+    os.link(root / "checkpoints" / "v1.safetensors", root / "checkpoints" / "link.safetensors")
+    _write(root / "loras" / "same-size.safetensors", b"b" * 1000)
+    _write(root / "loras" / "unique.safetensors", b"c" * 10)
+    hasher = _hasher(tmp_path, root)
+
+    async def run():
+        hasher.start()
+        return await hasher.wait()
+
+    progress = asyncio.run(run())
+    assert progress.status == "done"
+    # the unique size is never read; the hardlinked pair is read once
+    assert progress.files_done == 3
+    assert progress.bytes_done == 3000
+
+    report = hasher.duplicates()
+    assert report["reclaimable"] == 1000
+    [group] = report["groups"]
+    assert group["sha256"] == hashlib.sha256(same).hexdigest()
+    assert [f["path"] for f in group["files"]] == [
+        "checkpoints/copy.safetensors",
+        "checkpoints/link.safetensors",
+        "checkpoints/v1.safetensors",
+    ]
+    assert group["files"][2]["hardlink_of"] == "checkpoints/link.safetensors"
+
+
+def test_hashes_are_reused_until_the_file_changes(tmp_path):
+    root = tmp_path / "models"
+    _write(root / "vae" / "a.safetensors", b"x" * 100)
+    _write(root / "vae" / "b.safetensors", b"y" * 100)
+    hasher = _hasher(tmp_path, root)
+    hasher.index.scan()
+
+    assert hasher.hash_all().files_done == 2
+
+    progress = hasher.hash_all()
+    assert (progress.files_done, progress.files_cached) == (0, 2)
+    assert hasher.duplicates()["groups"] == []
+
+    _write(root / "vae" / "b.safetensors", b"x" * 100)
+    stat = os.stat(root / "vae" / "b.safetensors")
+    os.utime(root / "vae" / "b.safetensors", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    hasher.index.scan(full=True)
+    progress = hasher.hash_all()
+    assert (progress.files_done, progress.files_cached) == (1, 1)
+    assert hasher.duplicates()["reclaimable"] == 100
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import shutil
+import threading
+
+from jupyterlab_comfyui_cockpit.services.models import ModelIndex
+
+
+def _write(path, size=1):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def _tree(root):
+    _write(root / "checkpoints" / "sd15.safetensors", 10)
+    _write(root / "checkpoints" / "sdxl" / "base_1.0.safetensors", 30)
+    _write(root / "loras" / "style.safetensors", 5)
+    _write(root / "loras" / "put_loras_here")
+    _write(root / "loras" / ".hidden.safetensors")
+    _write(root / "vae" / "ae.sft", 7)
+
+
+def test_scan_indexes_model_files_by_folder(tmp_path):
+    root = tmp_path / "models"
+    _tree(root)
+    index = ModelIndex(root, tmp_path / "index.sqlite3")
+
+    result = index.scan()
+    page = index.query()
+
+    assert result.rescanned == 5
+    assert [m["path"] for m in page["models"]] == [
+        "vae/ae.sft",
+        "checkpoints/sdxl/base_1.0.safetensors",
+        "checkpoints/sd15.safetensors",
+        "loras/style.safetensors",
+    ]
+    assert page["models"][1]["folder"] == "checkpoints"
+    assert page["models"][1]["size"] == 30
+    assert {f["folder"]: (f["count"], f["size"]) for f in page["folders"]} == {
+        "checkpoints": (2, 40),
+        "loras": (1, 5),
+        "vae": (1, 7),
+    }
+
+
+def test_rescan_only_reads_changed_directories(tmp_path):
+    root = tmp_path / "models"
+    _tree(root)
+    index = ModelIndex(root, tmp_path / "index.sqlite3")
+    index.scan()
+
+    unchanged = index.scan()
+    assert (unchanged.rescanned, unchanged.unchanged) == (0, 5)
+
+    _write(root / "checkpoints" / "sdxl" / "refiner.safetensors", 3)
+    # make sure the directory mtime differs even on coarse-grained filesystems
+    stat = os.stat(root / "checkpoints" / "sdxl")
+    os.utime(root / "checkpoints" / "sdxl", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    shutil.rmtree(root / "vae")
+
+    result = index.scan()
+    assert result.rescanned == 2  # models/ (vae removed) and checkpoints/sdxl
+    assert result.removed == 1
+    paths = [m["path"] for m in index.query(sort="path")["models"]]
+    assert "checkpoints/sdxl/refiner.safetensors" in paths
+    assert "vae/ae.sft" not in paths
+
+
+def test_full_refresh_does_not_join_an_incremental_scan(tmp_path):
+    root = tmp_path / "models"
+    _tree(root)
+    index = ModelIndex(root, tmp_path / "index.sqlite3")
+    index.scan()
+
+    entered = threading.Event()
+    gate = threading.Event()
+    scan = index.scan
+
+    def gated_scan(full=False):
+        if not full:
+            entered.set()
+            gate.wait(5)
+        return scan(full)
+
+    index.scan = gated_scan
+
+    async def run():
+        incremental = asyncio.ensure_future(index.refresh())
+        while not entered.is_set():
+            await asyncio.sleep(0.01)
+        # rewriting an existing file changes its size but not the directory mtime
+        _write(root / "loras" / "style.safetensors", 50)
+        full = asyncio.ensure_future(index.refresh(full=True))
+        joined = asyncio.ensure_future(index.refresh(full=True))
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(incremental, full, joined)
+
+    incremental, full, joined = asyncio.run(run())
+
+    assert incremental.rescanned == 0
+    assert full is joined
+    assert full.rescanned == 5
+    sizes = {m["path"]: m["size"] for m in index.query()["models"]}
+    assert sizes["loras/style.safetensors"] == 50
+
+
+def test_query_filters_sorts_and_paginates(tmp_path):
+    root = tmp_path / "models"
+    for i in range(25):
+        _write(root / "loras" / f"lora_{i:02d}.safetensors", i + 1)
+    _write(root / "loras" / "lora%x.safetensors")
+    _write(root / "checkpoints" / "lora_in_checkpoints.ckpt")
+    index = ModelIndex(root, tmp_path / "index.sqlite3")
+    index.scan()
+
+    page = index.query(folder="loras", sort="-size", offset=10, limit=5)
+    assert page["total"] == 26
+    assert [m["name"] for m in page["models"]] == [f"lora_{i:02d}.safetensors" for i in range(14, 9, -1)]
+
+    assert index.query(search="lora%")["total"] == 1
+    assert index.query(search="in_check")["total"] == 1
+
+
+def test_index_is_persisted_and_reset_for_another_root(tmp_path):
+    root = tmp_path / "models"
+    _tree(root)
+    db = tmp_path / "index.sqlite3"
+    ModelIndex(root, db).scan()
+
+    async def run(index):
+        return await index.list()
+
+    restored = ModelIndex(root, db, scan_interval=3600)
+    payload = asyncio.run(run(restored))
+    assert payload["total"] == 4
+    assert payload["scanned_at"] is not None
+    assert payload["last_scan"] is None  # served from the saved index without scanning
+
+    other = tmp_path / "other"
+    _write(other / "unet" / "flux.gguf")
+    payload = asyncio.run(run(ModelIndex(other, db)))
+    assert [m["path"] for m in payload["models"]] == ["unet/flux.gguf"]
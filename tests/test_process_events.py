@@ -0,0 +1,155 @@
+import asyncio
+import io
+import os
+import sys
+import tempfile
+
+from jupyterlab_comfyui_cockpit.eventlistener import run
+from jupyterlab_comfyui_cockpit.services.events import EventSocketServer, ProcessEventStore
+
+
+def _event(eventname, payload, serial=1):
+    body = payload.encode()
+    header = f"ver:3.0 server:supervisor serial:{serial} pool:cockpit poolserial:{serial} eventname:{eventname} len:{len(body)}\n"
+    return header.encode() + body
+
+
+class RecordingForwarder:
+    def __init__(self):
+        self.events = []
+
+    def send(self, event):
+        self.events.append(event)
+        return True
+
+
+def test_listener_speaks_the_eventlistener_protocol():
+    stdin = io.BytesIO(
+        _event("PROCESS_STATE_STARTING", "processname:comfyui groupname:comfyui from_state:STOPPED tries:0", 1)
+        + _event("TICK_60", "when:1700000000", 2)
+        + _event("PROCESS_STATE_RUNNING", "processname:comfyui groupname:comfyui from_state:STARTING pid:321", 3)
+    )
+    stdout = io.BytesIO()
+    forwarder = RecordingForwarder()
+
+    run(stdin, stdout, forwarder)
+
+    assert stdout.getvalue() == b"READY\nRESULT 2\nOK" * 3 + b"READY\n"
+    assert [e["eventname"] for e in forwarder.events] == ["PROCESS_STATE_STARTING", "PROCESS_STATE_RUNNING"]
+    assert forwarder.events[1]["pid"] == 321
+    assert forwarder.events[1]["from_state"] == "STARTING"
+
+
+def test_store_answers_from_events_and_records_crash_loop():
+    clock = [1000.0]
+    store = ProcessEventStore(clock=lambda: clock[0])
+    store.connection_opened()
+
+    assert store.payload("comfyui") is None
+
+    for at, eventname, from_state in [
+        (1000.0, "PROCESS_STATE_STARTING", "STOPPED"),
+        (1001.0, "PROCESS_STATE_BACKOFF", "STARTING"),
+        (1002.0, "PROCESS_STATE_STARTING", "BACKOFF"),
+        (1003.0, "PROCESS_STATE_BACKOFF", "STARTING"),
+        (1004.0, "PROCESS_STATE_FATAL", "BACKOFF"),
+    ]:
+        store.apply({"eventname": eventname, "processname": "comfyui", "from_state": from_state, "at": at})
+
+    payload = store.payload("comfyui")
+    assert payload["status"] == "error"
+    assert payload["state"] == "FATAL"
+    assert payload["since"] == 1004.0
+    assert [t["to"] for t in payload["transitions"]] == ["STARTING", "BACKOFF", "STARTING", "BACKOFF", "FATAL"]
+    assert [t["at"] for t in payload["transitions"]] == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+
+
+def test_running_payload_reports_pid_and_uptime():
+    clock = [2000.0]
+    store = ProcessEventStore(clock=lambda: clock[0])
+    store.connection_opened()
+    store.apply({"eventname": "PROCESS_STATE_RUNNING", "processname": "comfyui", "pid": 42, "at": 1990.0})
+
+    payload = store.payload("comfyui")
+    assert payload["status"] == "running"
+    assert payload["pid"] == 42
+    assert payload["start"] == 1990.0
+    assert "pid 42, uptime 0:00:10" in payload["message"]
+
+
+def test_store_is_not_authoritative_without_listener_connection():
+    store = ProcessEventStore()
+    store.seed("comfyui", {"state": "STOPPED"})
+    assert store.payload("comfyui") is None
+
+    store.connection_opened()
+    store.seed("comfyui", {"state": "STOPPED"})
+    assert store.payload("comfyui")["state"] == "STOPPED"
+    store.apply({"eventname": "PROCESS_STATE_RUNNING", "processname": "comfyui", "pid": 1})
+    assert store.payload("comfyui")["state"] == "RUNNING"
+
+    store.connection_closed()
+    store.connection_opened()
+    assert store.payload("comfyui") is None
+
+
+def test_listener_process_forwards_events_to_socket_server():
+    async def scenario(socket_path):
+        store = ProcessEventStore()
+        changed = asyncio.Event()
+        store.add_listener(lambda name: changed.set())
+        server = EventSocketServer(store, socket_path)
+        await server.start()
+
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "jupyterlab_comfyui_cockpit.eventlistener", "--socket", socket_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            assert await asyncio.wait_for(proc.stdout.readline(), 10) == b"READY\n"
+            proc.stdin.write(_event("PROCESS_STATE_RUNNING", "processname:comfyui groupname:comfyui from_state:STARTING pid:99"))
+            await proc.stdin.drain()
+            assert await asyncio.wait_for(proc.stdout.readexactly(len(b"RESULT 2\nOK")), 10) == b"RESULT 2\nOK"
+            await asyncio.wait_for(changed.wait(), 10)
+            return store.payload("comfyui")
+        finally:
+            proc.stdin.close()
+            await proc.wait()
+            await server.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = asyncio.run(scenario(os.path.join(tmp, "events.sock")))
+
+    assert payload["state"] == "RUNNING"
+    assert payload["pid"] == 99
+
+
+def test_socket_server_is_private_and_replaces_only_its_own_sockets(tmp_path):
+    async def scenario():
+        socket_path = str(tmp_path / "run" / "events.sock")
+        first = EventSocketServer(ProcessEventStore(), socket_path)
+        await first.start()
+        mode = os.stat(socket_path).st_mode & 0o777
+        await first.stop()
+
+        # A stale socket left by a previous server is replaced
+        second = EventSocketServer(ProcessEventStore(), socket_path)
+        await second.start()
+        await second.stop()
+
+        regular = tmp_path / "not-a-socket"
+        regular.write_text("keep me")
+        try:
+            await EventSocketServer(ProcessEventStore(), str(regular)).start()
+        except PermissionError:
+            refused = True
+        else:
+            refused = False
+        return mode, refused, regular.read_text()
+
+    mode, refused, content = asyncio.run(scenario())
+
+    assert mode == 0o600
+    assert refused
+    assert content == "keep me"
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import stat
+import time
+
+from jupyterlab_comfyui_cockpit.services import status
+from jupyterlab_comfyui_cockpit.services.events import ProcessEventStore
+from jupyterlab_comfyui_cockpit.services.status import ProcessStatusCache, combine_payloads
+from jupyterlab_comfyui_cockpit.services.supervisor import (
+    ProcessInfo,
+    SupervisorctlSupervisor,
+    SupervisorError,
+    perform_actions,
+)
+
+FAKE_SUPERVISORCTL = """#!/bin/sh
+echo "$@" >> "$(dirname "$0")/calls"
+echo "comfyui-0                        RUNNING   pid 100, uptime 0:01:00"
+echo "comfyui-1                        STOPPED   Not started"
+echo "missing: ERROR (no such process)"
+"""
+
+
+def test_supervisorctl_status_is_one_command_for_all_programs(tmp_path, monkeypatch):
+    script = tmp_path / "supervisorctl"
+    script.write_text(FAKE_SUPERVISORCTL)
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    infos = asyncio.run(SupervisorctlSupervisor().get_all_process_info(["comfyui-0", "comfyui-1", "missing"]))
+
+    assert (tmp_path / "calls").read_text() == "status comfyui-0 comfyui-1 missing\n"
+    assert infos["comfyui-0"].status == "running"
+    assert infos["comfyui-0"].pid == 100
+    assert infos["comfyui-1"].status == "stopped"
+    assert infos["missing"].message == "missing: ERROR (no such process)"
+
+
+class SlowSupervisor:
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def perform_action(self, action, name):
+        await asyncio.sleep(self.delay)
+        if name == "broken":
+            raise SupervisorError("connection refused")
+        return True, f"{name}: {action}ed"
+
+
+def test_actions_run_concurrently_and_report_each_program():
+    names = [f"comfyui-{i}" for i in range(8)] + ["broken"]
+
+    started = time.monotonic()
+    results = asyncio.run(perform_actions(SlowSupervisor(0.2), "restart", names))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.2 * 3
+    assert [name for name, _, _ in results] == names
+    assert all(ok for _, ok, _ in results[:-1])
+    assert results[-1] == ("broken", False, "broken: ERROR (connection refused)")
+
+
+class BatchSupervisor:
+    def __init__(self):
+        self.calls = []
+
+    async def get_all_process_info(self, names):
+        self.calls.append(list(names))
+        return {
+            name: ProcessInfo(name=name, statename="RUNNING", description="pid 1, uptime 0:00:01", pid=1)
+            for name in names
+        }
+
+
+def test_cache_collects_all_programs_in_one_batch(monkeypatch):
+    supervisor = BatchSupervisor()
+    monkeypatch.setattr(status, "get_supervisor", lambda: supervisor)
+    monkeypatch.setattr(status, "process_event_store", ProcessEventStore())
+    cache = ProcessStatusCache(programs=["comfyui", "comfyui-1"], ttl=60)
+
+    payload = asyncio.run(cache.get())
+
+    assert supervisor.calls == [["comfyui", "comfyui-1"]]
+    assert payload["status"] == "running"
+    assert [program["name"] for program in payload["programs"]] == ["comfyui", "comfyui-1"]
+
+
+def test_combined_payload_keeps_primary_program_at_top_level():
+    payload = combine_payloads([
+        {"name": "comfyui", "status": "running", "pid": 1},
+        {"name": "helper", "status": "stopped", "pid": None},
+    ])
+    assert payload["status"] == "running"
+    assert payload["pid"] == 1
+    assert "name" not in payload
+    assert len(payload["programs"]) == 2
+
+
+def test_event_store_keys_grouped_processes_like_supervisorctl():
+    store = ProcessEventStore(clock=lambda: 1000.0)
+    store.connection_opened()
+    store.apply({
+        "eventname": "PROCESS_STATE_RUNNING",
+        "processname": "gpu1",
+        "groupname": "workers",
+        "from_state": "STARTING",
+        "pid": 7,
+        "at": 1000.0,
+    })
+
+    assert store.payload("gpu1") is None
+    assert store.payload("workers:gpu1")["status"] == "running"
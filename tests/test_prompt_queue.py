@@ -0,0 +1,230 @@
+import asyncio
+import json
+
+import tornado.httpserver
+import tornado.testing
+import tornado.web
+import tornado.websocket
+
+from jupyterlab_comfyui_cockpit.services.prompt_queue import (
+    PromptQueueMonitor,
+    summarize_history_entry,
+    summarize_queue_item,
+)
+
+
+def _history_entry(number, started_ms, finished_ms, filename):
+    return {
+        "prompt": [number, f"p{number}", {"1": {}, "2": {}}, {}, ["2"]],
+        "outputs": {"2": {"images": [
+            {"filename": filename, "subfolder": "", "type": "output"},
+            {"filename": "preview.png", "subfolder": "", "type": "temp"},
+        ]}},
+        "status": {
+            "status_str": "success",
+            "completed": True,
+            "messages": [
+                ["execution_start", {"prompt_id": f"p{number}", "timestamp": started_ms}],
+                ["execution_cached", {"nodes": [], "prompt_id": f"p{number}", "timestamp": started_ms}],
+                ["execution_success", {"prompt_id": f"p{number}", "timestamp": finished_ms}],
+            ],
+        },
+    }
+
+
+class FakeComfyUI:
+    """Stand-in for the ComfyUI queue, history and websocket APIs."""
+
+    def __init__(self):
+        self.running = []
+        self.pending = []
+        self.history = {}
+        self.requests = []
+        self.sockets = []
+        self.connections = 0
+
+    def queue_item(self, number):
+        return [number, f"p{number}", {"1": {}, "2": {}, "3": {}}, {"client_id": "lab"}, ["3"]]
+
+    def app(self):
+        fake = self
+
+        class QueueHandler(tornado.web.RequestHandler):
+            def get(self):
+                fake.requests.append("queue")
+                self.write({"queue_running": fake.running, "queue_pending": fake.pending})
+
+        class HistoryHandler(tornado.web.RequestHandler):
+            def get(self):
+                fake.requests.append(f"history?max_items={self.get_argument('max_items')}")
+                self.write(fake.history)
+
+        class SocketHandler(tornado.websocket.WebSocketHandler):
+            def open(self):
+                fake.connections += 1
+                fake.sockets.append(self)
+                self.write_message(json.dumps({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": 0}}}}))
+
+            def on_close(self):
+                fake.sockets.remove(self)
+
+        return tornado.web.Application([
+            (r"/queue", QueueHandler),
+            (r"/history", HistoryHandler),
+            (r"/ws", SocketHandler),
+        ])
+
+    def start(self):
+        sock, port = tornado.testing.bind_unused_port()
+        self.server = tornado.httpserver.HTTPServer(self.app())
+        self.server.add_sockets([sock])
+        return f"http://127.0.0.1:{port}"
+
+    def send(self, kind, **data):
+        for socket in self.sockets:
+            socket.write_message(json.dumps({"type": kind, "data": data}))
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def _next_event(subscription, kind, predicate=lambda data: True):
+    while True:
+        event, data = await asyncio.wait_for(subscription.get(), 5)
+        if event == kind and predicate(data):
+            return data
+
+
+def test_summarize_history_entry_computes_duration_and_outputs():
+    summary = summarize_history_entry("p7", _history_entry(7, 1_000_000, 1_012_500, "ComfyUI_00001_.png"))
+
+    assert summary["number"] == 7
+    assert summary["status"] == "success"
+    assert summary["started_at"] == 1_000.0
+    assert summary["duration"] == 12.5
+    assert summary["outputs"] == ["ComfyUI_00001_.png"]
+    assert summarize_queue_item([3, "p3", {"1": {}}, {"client_id": "lab"}, []]) == {
+        "number": 3, "prompt_id": "p3", "nodes": 1, "client_id": "lab",
+    }
+
+
+def test_get_shares_polled_state_between_clients():
+    fake = FakeComfyUI()
+    fake.running = [fake.queue_item(2)]
+    fake.pending = [fake.queue_item(4), fake.queue_item(3)]
+    fake.history = {"p1": _history_entry(1, 1_000_000, 1_004_000, "a.png")}
+
+    async def run():
+        monitor = PromptQueueMonitor(fake.start(), interval=60, history_size=10)
+        snapshots = await asyncio.gather(*(monitor.get() for _ in range(5)))
+        cached = await monitor.get()
+        return snapshots, cached
+
+    snapshots, cached = asyncio.run(run())
+
+    assert fake.requests == ["queue", "history?max_items=10"]
+    assert snapshots[0]["connected"] is True
+    assert snapshots[0]["queue_remaining"] == 3
+    assert [item["prompt_id"] for item in snapshots[0]["pending"]] == ["p3", "p4"]
+    assert snapshots[0]["history"][0]["duration"] == 4.0
+    assert cached == snapshots[0]
+
+
+def test_get_reports_unreachable_comfyui():
+    async def run():
+        sock, port = tornado.testing.bind_unused_port()
+        sock.close()
+        monitor = PromptQueueMonitor(f"http://127.0.0.1:{port}", timeout=1)
+        return await monitor.get()
+
+    snapshot = asyncio.run(run())
+
+    assert snapshot["connected"] is False
+    assert snapshot["error"]
+    assert snapshot["running"] == []
+
+
+def test_subscribers_share_one_websocket_and_receive_progress():
+    fake = FakeComfyUI()
+
+    async def run():
+        monitor = PromptQueueMonitor(fake.start(), interval=60, history_size=2)
+        subscriptions = [monitor.subscribe() for _ in range(3)]
+        initial = await _next_event(subscriptions[0], "queue")
+
+        fake.running = [fake.queue_item(5)]
+        fake.send("execution_start", prompt_id="p5")
+        running = await _next_event(subscriptions[1], "queue", lambda data: data["running"] and data["running"][0]["started_at"])
+
+        fake.send("progress", prompt_id="p5", node="3", value=4, max=20)
+        progress = await _next_event(subscriptions[2], "progress")
+
+        fake.running = []
+        fake.history = {"p5": _history_entry(5, 2_000_000, 2_030_000, "b.png")}
+        fake.send("execution_success", prompt_id="p5")
+        finished = await _next_event(subscriptions[0], "queue", lambda data: data["history"])
+
+        for subscription in subscriptions:
+            subscription.close()
+        await _wait_for(lambda: not fake.sockets and not monitor.watching)
+        return initial, running, progress, finished
+
+    initial, running, progress, finished = asyncio.run(run())
+
+    assert fake.connections == 1
+    assert initial["mode"] == "websocket"
+    assert running["running"][0]["prompt_id"] == "p5"
+    assert progress == {"prompt_id": "p5", "node": "3", "value": 4, "max": 20}
+    assert finished["running"] == []
+    assert finished["history"][0]["prompt_id"] == "p5"
+    assert finished["history"][0]["duration"] == 30.0
+    assert finished["history"][0]["outputs"] == ["b.png"]
+
+
+def test_history_is_bounded():
+    fake = FakeComfyUI()
+    fake.history = {f"p{n}": _history_entry(n, 0, 1_000, f"{n}.png") for n in range(1, 6)}
+
+    async def run():
+        monitor = PromptQueueMonitor(fake.start(), history_size=3)
+        return await monitor.get()
+
+    snapshot = asyncio.run(run())
+
+    assert [entry["prompt_id"] for entry in snapshot["history"]] == ["p5", "p4", "p3"]
+
+
+def test_observed_executions_are_bounded():
+    monitor = PromptQueueMonitor(history_size=3, clock=lambda: 1.0)
+    for n in range(1, 11):
+        monitor._handle({"type": "execution_start", "data": {"prompt_id": f"p{n}"}})
+        monitor._handle({"type": "execution_success", "data": {"prompt_id": f"p{n}"}})
+
+    assert list(monitor._executions) == ["p8", "p9", "p10"]
+    assert monitor._executions["p10"] == {"started_at": 1.0, "finished_at": 1.0}
+
+
+def test_falls_back_to_polling_without_websocket():
+    fake = FakeComfyUI()
+    fake.pending = [fake.queue_item(1)]
+
+    async def run():
+        monitor = PromptQueueMonitor(fake.start(), interval=0.05, websocket=False)
+        subscription = monitor.subscribe()
+        first = await _next_event(subscription, "queue")
+        fake.pending = []
+        second = await _next_event(subscription, "queue", lambda data: not data["pending"])
+        subscription.close()
+        await _wait_for(lambda: not monitor.watching)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first["mode"] == "polling"
+    assert first["queue_remaining"] == 1
+    assert second["queue_remaining"] == 0
+    assert fake.connections == 0
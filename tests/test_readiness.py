@@ -0,0 +1,156 @@
+import asyncio
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.readiness import ReadinessProber, add_readiness
+
+
+class FakeComfyUIHandler(BaseHTTPRequestHandler):
+    """Stand-in for ComfyUI: answers 503 while "loading", then 200."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        ready = len(self.server.requests) > self.server.loading_requests
+        body = b'{"system": {}}' if ready else b"loading"
+        self.send_response(200 if ready else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeComfyUIServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, loading_requests=0):
+        super().__init__(("127.0.0.1", 0), FakeComfyUIHandler)
+        self.loading_requests = loading_requests
+        self.requests = []
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+@pytest.fixture
+def comfyui():
+    servers = []
+
+    def start(loading_requests=0):
+        server = FakeComfyUIServer(loading_requests)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        host, port = server.server_address
+        return server, f"http://{host}:{port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_probes_reuse_one_keep_alive_connection(comfyui):
+    server, url = comfyui()
+    clock = FakeClock()
+    prober = ReadinessProber(url, ttl=1.0, clock=clock)
+
+    async def run():
+        results = []
+        for _ in range(3):
+            results.append(await prober.check(1))
+            clock.now += 1.0
+        return results
+
+    results = asyncio.run(run())
+    assert all(result.ready for result in results)
+    assert server.requests == ["/system_stats"] * 3
+    assert server.connections == 1
+    prober.close()
+
+
+def test_not_ready_until_api_answers_and_backs_off(comfyui):
+    server, url = comfyui(loading_requests=2)
+    clock = FakeClock()
+    prober = ReadinessProber(url, min_backoff=1.0, max_backoff=4.0, clock=clock)
+
+    async def run():
+        first = await prober.check(1)
+        assert not first.ready and "HTTP 503" in first.message
+        # バックオフ中はキャッシュした結果を返す
+        clock.now = 0.9
+        assert await prober.check(1) is first
+        assert len(server.requests) == 1
+
+        clock.now = 1.0
+        assert not (await prober.check(1)).ready
+        # 2回目の失敗でバックオフが倍になる
+        clock.now = 2.5
+        await prober.check(1)
+        assert len(server.requests) == 2
+        clock.now = 3.0
+        return await prober.check(1)
+
+    assert asyncio.run(run()).ready
+    assert len(server.requests) == 3
+
+
+def test_new_process_instance_discards_cached_result(comfyui):
+    server, url = comfyui()
+    prober = ReadinessProber(url, ttl=60.0, clock=FakeClock())
+
+    async def run():
+        await prober.check(1)
+        await prober.check(1)
+        await prober.check(2)
+
+    asyncio.run(run())
+    assert len(server.requests) == 2
+
+
+def test_concurrent_checks_share_one_probe(comfyui):
+    server, url = comfyui()
+    prober = ReadinessProber(url, clock=FakeClock())
+
+    async def run():
+        return await asyncio.gather(*(prober.check(1) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert len(server.requests) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_unreachable_api_is_reported_as_not_ready():
+    prober = ReadinessProber("http://127.0.0.1:1", timeout=1.0)
+    result = asyncio.run(prober.check(1))
+    assert not result.ready
+    assert result.latency is None
+    assert "127.0.0.1:1" in result.message
+
+
+def test_add_readiness_skips_probe_when_not_running(comfyui):
+    server, url = comfyui()
+    prober = ReadinessProber(url)
+
+    stopped = asyncio.run(add_readiness({"status": "stopped", "pid": None}, prober))
+    running = asyncio.run(add_readiness({"status": "running", "pid": 10}, prober))
+
+    assert stopped["ready"] is False
+    assert running["ready"] is True
+    assert len(server.requests) == 1
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import sys
+
+from jupyterlab_comfyui_cockpit.services.requirements import (
+    PipInstaller,
+    RequirementSet,
+    RequirementsState,
+    diff_requirements,
+)
+
+FAKE_PIP = """
+import json, os, re, sys
+args = sys.argv[1:]
+with open(os.environ["FAKE_PIP_LOG"], "a") as f:
+    f.write(json.dumps(args) + "\\n")
+wheelhouse = os.environ["FAKE_PIP_WHEELHOUSE"]
+specs = [arg for arg in args[args.index("--find-links") + 2:] if not arg.startswith("-")] if "--find-links" in args else []
+wheels = [re.sub(r"[^A-Za-z0-9.]", "_", spec) + ".whl" for spec in specs]
+have = os.listdir(wheelhouse) if os.path.isdir(wheelhouse) else []
+if "--no-index" in args:
+    sys.exit(0 if all(wheel in have for wheel in wheels) else 1)
+if args[0] == "wheel":
+    os.makedirs(wheelhouse, exist_ok=True)
+    for wheel in wheels:
+        open(os.path.join(wheelhouse, wheel), "w").close()
+sys.exit(0)
+"""
+
+
+def test_equivalent_requirement_files_have_same_digest():
+    a = RequirementSet.parse("torch>=2.0\nPillow\n# comment\n\nnumpy  # pinned elsewhere\n")
+    b = RequirementSet.parse("numpy\npillow\nTorch >= 2.0\n")
+    assert a.digest == b.digest
+    assert RequirementSet.parse("torch>=2.1\npillow\nnumpy").digest != a.digest
+
+
+def test_diff_reports_changed_and_removed_specifiers():
+    current = RequirementSet.parse("torch>=2.0\npillow\nnumpy\nkornia")
+    target = RequirementSet.parse("torch>=2.1\npillow\nnumpy\nspandrel")
+    diff = diff_requirements(current, target)
+    assert diff.changed == ["spandrel", "torch>=2.1"]
+    assert diff.removed == ["kornia"]
+    assert not diff.options_changed
+
+
+def _installer(tmp_path, monkeypatch):
+    script = tmp_path / "fake_pip.py"
+    script.write_text(FAKE_PIP)
+    log = tmp_path / "pip.log"
+    wheelhouse = tmp_path / "wheelhouse"
+    monkeypatch.setenv("FAKE_PIP_LOG", str(log))
+    monkeypatch.setenv("FAKE_PIP_WHEELHOUSE", str(wheelhouse))
+    installer = PipInstaller([sys.executable, str(script)], wheelhouse, RequirementsState(tmp_path / "state.json"))
+    return installer, log
+
+
+def _calls(log):
+    if not log.exists():
+        return []
+    return [json.loads(line) for line in log.read_text().splitlines()]
+
+
+def test_unchanged_requirements_skip_pip(tmp_path, monkeypatch):
+    installer, log = _installer(tmp_path, monkeypatch)
+    reqs = RequirementSet.parse("torch\npillow")
+
+    result = asyncio.run(installer.sync(reqs, RequirementSet.parse("Pillow\ntorch")))
+
+    assert result.success
+    assert result.installed == []
+    assert _calls(log) == []
+
+
+def test_only_changed_specifiers_are_installed_and_cached_in_wheelhouse(tmp_path, monkeypatch):
+    installer, log = _installer(tmp_path, monkeypatch)
+    old = RequirementSet.parse("torch\npillow==9.0")
+    new = RequirementSet.parse("torch\npillow==10.0\nspandrel")
+
+    result = asyncio.run(installer.sync(old, new))
+    assert result.success
+    assert result.installed == ["pillow==10.0", "spandrel"]
+    calls = _calls(log)
+    # 置き換えられる pillow==9.0 の wheel を残してから、変更された要件だけをインストールする
+    assert [c[0] for c in calls] == ["wheel", "wheel", "install", "wheel", "install"]
+    assert calls[1][-1] == "pillow==9.0"
+    assert all("torch" not in c for c in calls)
+
+
+def test_switching_back_installs_only_from_wheelhouse(tmp_path, monkeypatch):
+    installer, log = _installer(tmp_path, monkeypatch)
+    a = RequirementSet.parse("torch\npillow==9.0\nkornia")
+    b = RequirementSet.parse("torch\npillow==10.0\nspandrel")
+    installer.state.save(a)
+
+    assert asyncio.run(installer.sync(a, b)).success
+    log.unlink()
+    result = asyncio.run(installer.sync(b, a))
+
+    assert result.success
+    assert result.installed == ["kornia", "pillow==9.0"]
+    calls = _calls(log)
+    assert calls and all("--no-index" in call for call in calls)
+    assert [c[0] for c in calls] == ["wheel", "install"]
+
+
+def test_recorded_state_is_trusted_over_working_tree(tmp_path, monkeypatch):
+    installer, log = _installer(tmp_path, monkeypatch)
+    target = RequirementSet.parse("torch\npillow")
+    installer.state.save(target)
+
+    result = asyncio.run(installer.sync(RequirementSet.parse("torch"), target))
+    assert result.installed == []
+    assert _calls(log) == []
+
+
+def test_prefetch_fills_wheelhouse_so_switch_installs_offline(tmp_path, monkeypatch):
+    installer, log = _installer(tmp_path, monkeypatch)
+    installed = RequirementSet.parse("torch\npillow==9.0")
+    installer.state.save(installed)
+    target = RequirementSet.parse("torch\npillow==10.0")
+
+    result = asyncio.run(installer.prefetch(target))
+    assert result.success
+    assert result.installed == ["pillow==10.0"]
+    assert {c[0] for c in _calls(log)} == {"wheel"}
+    # prefetch ではインストール済みの記録は変わらない
+    assert installer.state.load().digest == installed.digest
+
+    log.unlink()
+    result = asyncio.run(installer.sync(installed, target))
+    assert result.success
+    calls = _calls(log)
+    assert [c[0] for c in calls] == ["wheel", "install"]
+    assert all("--no-index" in call for call in calls)
@@ -0,0 +1,84 @@
+import math
+import os
+import subprocess
+import sys
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.resources import (
+    ResourceSampler,
+    SampleRingBuffer,
+    process_tree,
+    read_proc_stat,
+)
+
+linux_only = pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="/proc is not available")
+
+
+def test_ring_buffer_overwrites_oldest_samples():
+    buffer = SampleRingBuffer(("rss",), capacity=3)
+    for t in range(5):
+        buffer.append(float(t), {"rss": t * 10})
+
+    assert len(buffer) == 3
+    assert buffer.latest() == {"t": 4.0, "rss": 40.0}
+    series = buffer.downsample(0, 5, points=5)
+    assert series["t"] == [2.5, 3.5, 4.5]
+    assert series["rss"] == [20.0, 30.0, 40.0]
+
+
+def test_downsample_averages_buckets_and_keeps_peaks():
+    buffer = SampleRingBuffer(("cpu_percent", "fds"), capacity=100)
+    for t in range(10):
+        buffer.append(float(t), {"cpu_percent": 100.0 if t == 3 else 10.0, "fds": None})
+
+    series = buffer.downsample(0, 10, points=2)
+    assert series["t"] == [2.5, 7.5]
+    assert series["cpu_percent"] == [28.0, 10.0]
+    assert series["cpu_percent_max"] == [100.0, 10.0]
+    # 読めなかった値は None として返す
+    assert series["fds"] == [None, None]
+
+
+@linux_only
+def test_reads_own_process_and_children():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        assert child.pid in process_tree(os.getpid())
+        stat = read_proc_stat(os.getpid())
+        assert stat.rss > 0
+        assert stat.threads >= 1
+        assert stat.fds is None or stat.fds > 0
+    finally:
+        child.kill()
+        child.wait()
+
+
+@linux_only
+def test_sampler_derives_rates_from_consecutive_samples():
+    times = iter([100.0, 102.0])
+
+    async def fetch_pid():
+        return os.getpid()
+
+    sampler = ResourceSampler(fetch_pid, interval=1, capacity=10, clock=lambda: next(times))
+    first = sampler.sample(os.getpid())
+    assert first["cpu_percent"] is None
+    sum(i * i for i in range(200000))
+    second = sampler.sample(os.getpid())
+
+    assert second["cpu_percent"] is not None and second["cpu_percent"] >= 0
+    assert second["processes"] >= 1
+    latest = sampler.buffer.latest()
+    assert latest["t"] == 102.0
+    assert not math.isnan(latest["rss"])
+
+
+@linux_only
+def test_sampler_raises_for_missing_process():
+    async def fetch_pid():
+        return None
+
+    sampler = ResourceSampler(fetch_pid, interval=1, capacity=10)
+    with pytest.raises(ProcessLookupError):
+        sampler.sample(2 ** 22 + 12345)
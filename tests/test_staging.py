@@ -0,0 +1,160 @@
+import asyncio
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services import version_jobs
+from jupyterlab_comfyui_cockpit.services.requirements import InstallResult
+from jupyterlab_comfyui_cockpit.services.staging import (
+    StagePreparer,
+    StagedVersionSwitcher,
+    StagingArea,
+)
+from jupyterlab_comfyui_cockpit.services.version_jobs import VersionJobManager
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def git(repo, *args):
+    result = subprocess.run(["git", "-C", str(repo), *args], capture_output=True, text=True, env=GIT_ENV, check=True)
+    return result.stdout.strip()
+
+
+def commit(repo, requirements):
+    (repo / "requirements.txt").write_text(requirements)
+    git(repo, "add", "requirements.txt")
+    git(repo, "commit", "-q", "-m", requirements)
+
+
+class FakeInstaller:
+    def __init__(self):
+        self.calls = []
+
+    async def sync(self, current, target, on_line=None):
+        self.calls.append(("sync", target.requirements))
+        return InstallResult(True, "installed", target.requirements)
+
+    async def prefetch(self, target, on_line=None):
+        self.calls.append(("prefetch", target.requirements))
+        return InstallResult(True, "prefetched", target.requirements)
+
+
+class FakeSupervisor:
+    def __init__(self, staging):
+        self.staging = staging
+        self.restarted_with = []
+
+    async def perform_action(self, action, name):
+        # 再起動の時点でリンクが張り替わっていることを記録する
+        self.restarted_with.append(self.staging.current_target())
+        return True, f"{name}: started"
+
+
+@pytest.fixture
+def staging(tmp_path, monkeypatch):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    git(origin, "init", "-q")
+    commit(origin, "torch==2.0\n")
+    git(origin, "tag", "v1.0.0")
+    commit(origin, "torch==2.1\n")
+    git(origin, "tag", "-a", "v1.1.0", "-m", "release")
+
+    area = StagingArea(tmp_path / "ComfyUI", tmp_path / "versions")
+    git(origin, "worktree", "add", "-q", "--detach", str(area.worktree_path("v1.0.0")), "v1.0.0")
+    os.symlink(area.worktree_path("v1.0.0"), area.comfyui_path)
+
+    supervisor = FakeSupervisor(area)
+    monkeypatch.setattr(version_jobs, "get_supervisor", lambda: supervisor)
+    return area, supervisor
+
+
+def run_job(target, switcher):
+    async def run():
+        manager = VersionJobManager()
+        job = manager.submit(target, switcher)
+        await manager.wait(job.id)
+        return job
+
+    return asyncio.run(run())
+
+
+def test_stage_prepares_worktree_and_wheels_without_touching_active_link(staging):
+    area, supervisor = staging
+    installer = FakeInstaller()
+
+    job = run_job("v1.1.0", StagePreparer(area, installer))
+
+    assert job.status == "success", job.message
+    assert job.kind == "stage"
+    assert (area.worktree_path("v1.1.0") / "requirements.txt").read_text() == "torch==2.1\n"
+    assert installer.calls == [("prefetch", ["torch==2.1"])]
+    assert area.current_target() == area.worktree_path("v1.0.0")
+    assert supervisor.restarted_with == []
+
+    staged = {item.version: item for item in area.staged()}
+    assert set(staged) == {"v1.0.0", "v1.1.0"}
+    assert staged["v1.0.0"].active
+
+    # 2回目は既存の worktree を再利用する
+    job = run_job("v1.1.0", StagePreparer(area, installer))
+    assert any("Reusing staged worktree" in line for line in job.to_dict(include_log=True)["log"])
+
+
+def test_switch_flips_symlink_before_single_restart_and_rollback_returns(staging):
+    area, supervisor = staging
+    installer = FakeInstaller()
+
+    job = run_job("v1.1.0", StagedVersionSwitcher(area, installer))
+
+    assert job.status == "success", job.message
+    assert [step.name for step in job.steps] == ["stage", "swap", "deps", "restart"]
+    assert area.current_target() == area.worktree_path("v1.1.0")
+    assert supervisor.restarted_with == [area.worktree_path("v1.1.0")]
+    assert installer.calls == [("sync", ["torch==2.1"])]
+    assert area.previous_target() == area.worktree_path("v1.0.0")
+    assert (area.comfyui_path / "requirements.txt").read_text() == "torch==2.1\n"
+
+    rollback = StagedVersionSwitcher(area, installer, target_path=area.previous_target())
+    job = run_job("v1.0.0", rollback)
+
+    assert job.status == "success", job.message
+    assert job.kind == "rollback"
+    assert area.current_target() == area.worktree_path("v1.0.0")
+    assert area.previous_target() == area.worktree_path("v1.1.0")
+    assert len(supervisor.restarted_with) == 2
+
+
+def test_active_and_rollback_worktrees_are_not_removed(staging):
+    area, _ = staging
+    run_job("v1.1.0", StagedVersionSwitcher(area, FakeInstaller()))
+
+    removed, message = asyncio.run(area.remove("v1.0.0"))
+    assert not removed
+    assert "rollback" in message
+
+    run_job("v1.0.0", StagedVersionSwitcher(area, FakeInstaller(), target_path=area.previous_target()))
+    assert asyncio.run(area.remove("v1.1.0"))[0] is False
+
+    area._save_previous(area.staging_dir / "missing")
+    removed, _ = asyncio.run(area.remove("v1.1.0"))
+    assert removed
+    assert not area.worktree_path("v1.1.0").exists()
+
+
+def test_unknown_version_fails_stage_step(staging):
+    area, _ = staging
+    job = run_job("v9.9.9", StagePreparer(area, FakeInstaller()))
+    assert job.status == "failed"
+    assert job.get_step("worktree").status == "failed"
+    assert "Unknown version" in job.message
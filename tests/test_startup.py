@@ -0,0 +1,80 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from jupyterlab_comfyui_cockpit.services.startup import LoadProfile
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Budgets for a cold process in which Jupyter Server itself is already imported.
+IMPORT_BUDGET = 0.05
+LOAD_BUDGET = 0.5
+
+LOAD_SCRIPT = """
+import json, logging, sys, time
+import jupyter_server.base.handlers, tornado.web
+
+started = time.perf_counter()
+import jupyterlab_comfyui_cockpit as extension
+imported = time.perf_counter() - started
+import_only = {name: name in sys.modules for name in ("jupyterlab_comfyui_cockpit.handlers", "dotenv")}
+
+class ServerApp:
+    web_app = tornado.web.Application(base_url="/")
+    log = logging.getLogger("test")
+
+started = time.perf_counter()
+extension._load_jupyter_server_extension(ServerApp)
+loaded = time.perf_counter() - started
+
+from jupyterlab_comfyui_cockpit.handlers.resources import resource_sampler
+rules = [rule.matcher.regex.pattern for rule in ServerApp.web_app.default_router.rules[0].target.rules]
+print(json.dumps({
+    "import": imported,
+    "load": loaded,
+    "import_only": import_only,
+    "phases": extension.load_profile.to_dict(),
+    "dotenv": "dotenv" in sys.modules,
+    "pillow": "PIL" in sys.modules,
+    "sampling": resource_sampler.running,
+    "rules": rules,
+}))
+"""
+
+
+def _load_in_fresh_interpreter():
+    result = subprocess.run(
+        [sys.executable, "-c", LOAD_SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True, timeout=60,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_load_profile_summarizes_phases():
+    ticks = iter([0.0, 0.5, 0.5, 0.75, 0.75, 1.0])
+    profile = LoadProfile(clock=lambda: next(ticks))
+    for name in ("import", "handlers", "schedule"):
+        with profile.phase(name):
+            pass
+
+    assert profile.to_dict() == {"import": 0.5, "handlers": 0.25, "schedule": 0.25}
+    assert profile.summary() == "1000.0 ms (import 500.0 ms, handlers 250.0 ms, schedule 250.0 ms)"
+
+
+def test_extension_import_and_registration_fit_the_budget():
+    report = _load_in_fresh_interpreter()
+
+    # Importing the package (e.g. to list extensions) neither pulls in handlers nor reads .env
+    assert report["import_only"] == {"jupyterlab_comfyui_cockpit.handlers": False, "dotenv": False}
+    assert report["import"] < IMPORT_BUDGET
+    assert report["load"] < LOAD_BUDGET
+    assert set(report["phases"]) == {"import", "handlers", "schedule"}
+    assert any(pattern.startswith("/comfyui-cockpit/state") for pattern in report["rules"])
+
+
+def test_registration_defers_config_and_background_work():
+    report = _load_in_fresh_interpreter()
+
+    assert report["dotenv"] is False
+    assert report["pillow"] is False
+    assert report["sampling"] is False
@@ -0,0 +1,37 @@
+from jupyterlab_comfyui_cockpit.services.status import combine_payloads, state_etag
+
+
+def _state(message, state="RUNNING", start=1_700_000_000, versions=("v0.3.10", "v0.3.9")):
+    program = {
+        "name": "comfyui",
+        "status": "running" if state == "RUNNING" else "stopped",
+        "message": message,
+        "state": state,
+        "start": start if state == "RUNNING" else None,
+        "ready": state == "RUNNING",
+    }
+    return {
+        "process": combine_payloads([program]),
+        "version": {"comfyui_version": "v0.3.10"},
+        "available_versions": list(versions),
+    }
+
+
+def test_etag_ignores_uptime_text_of_running_programs():
+    first = state_etag(_state("comfyui RUNNING pid 10, uptime 0:00:05"))
+    second = state_etag(_state("comfyui RUNNING pid 10, uptime 0:00:10"))
+
+    assert first == second
+    assert first.startswith('"') and first.endswith('"')
+
+
+def test_etag_changes_when_state_changes():
+    running = state_etag(_state("comfyui RUNNING pid 10, uptime 0:00:05"))
+
+    assert state_etag(_state("comfyui STOPPED", state="STOPPED")) != running
+    assert state_etag(_state("comfyui RUNNING pid 10, uptime 0:00:05", start=1_700_000_100)) != running
+    assert state_etag(_state("comfyui RUNNING pid 10, uptime 0:00:05", versions=("v0.3.11",))) != running
+
+
+def test_etag_keeps_message_of_stopped_programs():
+    assert state_etag(_state("Exited too quickly", state="STOPPED")) != state_etag(_state("Not started", state="STOPPED"))
@@ -0,0 +1,63 @@
+import asyncio
+
+from jupyterlab_comfyui_cockpit.services.status import ProcessStatusCache
+
+
+class CountingStatusCache(ProcessStatusCache):
+    """ProcessStatusCache whose collection step is counted instead of forking."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    async def _collect(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"status": "running", "message": f"call {self.calls}"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_gets_share_one_collection():
+    cache = CountingStatusCache(ttl=1.0, clock=FakeClock())
+
+    async def run():
+        return await asyncio.gather(*(cache.get() for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert cache.calls == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_cached_payload_expires_after_ttl():
+    clock = FakeClock()
+    cache = CountingStatusCache(ttl=1.0, clock=clock)
+
+    async def run():
+        await cache.get()
+        clock.now = 0.5
+        await cache.get()
+        assert cache.calls == 1
+        clock.now = 1.6
+        await cache.get()
+        assert cache.calls == 2
+
+    asyncio.run(run())
+
+
+def test_invalidate_forces_fresh_collection():
+    cache = CountingStatusCache(ttl=60.0, clock=FakeClock())
+
+    async def run():
+        await cache.get()
+        cache.invalidate()
+        payload = await cache.get()
+        assert payload["message"] == "call 2"
+
+    asyncio.run(run())
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from xmlrpc.server import SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.supervisor import (
+    FallbackSupervisor,
+    ProcessInfo,
+    SupervisorUnavailable,
+    XmlRpcSupervisor,
+    parse_status_line,
+)
+
+
+class FakeSupervisorNamespace:
+    """Implements the subset of supervisord's XML-RPC API used by the cockpit."""
+
+    def __init__(self):
+        self.state = "RUNNING"
+        self.pid = 4242
+        self.started = int(time.time()) - 10
+        self.calls = []
+
+    def getProcessInfo(self, name):
+        self.calls.append(("getProcessInfo", name))
+        if name != "comfyui":
+            raise xmlrpc.client.Fault(10, "BAD_NAME: " + name)
+        running = self.state == "RUNNING"
+        return {
+            "name": name,
+            "group": name,
+            "statename": self.state,
+            "pid": self.pid if running else 0,
+            "start": self.started,
+            "now": int(time.time()),
+            "exitstatus": 0,
+            "description": f"pid {self.pid}, uptime 0:00:10" if running else "Not started",
+        }
+
+    def getAllProcessInfo(self):
+        self.calls.append(("getAllProcessInfo",))
+        comfyui = self.getProcessInfo("comfyui")
+        worker = dict(comfyui, name="gpu1", group="workers", pid=4343)
+        return [comfyui, worker]
+
+    def startProcess(self, name, wait=True):
+        self.calls.append(("startProcess", name))
+        if self.state == "RUNNING":
+            raise xmlrpc.client.Fault(60, "ALREADY_STARTED: " + name)
+        self.state = "RUNNING"
+        return True
+
+    def stopProcess(self, name, wait=True):
+        self.calls.append(("stopProcess", name))
+        if self.state != "RUNNING":
+            raise xmlrpc.client.Fault(70, "NOT_RUNNING: " + name)
+        self.state = "STOPPED"
+        return True
+
+
+class FakeSupervisorRPC:
+    def __init__(self):
+        self.supervisor = FakeSupervisorNamespace()
+
+
+class KeepAliveHandler(SimpleXMLRPCRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        return "fake"
+
+
+class UnixKeepAliveHandler(KeepAliveHandler):
+    disable_nagle_algorithm = False
+
+
+class CountingXMLRPCServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+class UnixXMLRPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer, SimpleXMLRPCDispatcher):
+    daemon_threads = True
+
+    def __init__(self, path):
+        SimpleXMLRPCDispatcher.__init__(self, allow_none=True)
+        self.logRequests = False
+        socketserver.UnixStreamServer.__init__(self, path, UnixKeepAliveHandler)
+
+
+def _serve(server):
+    rpc = FakeSupervisorRPC()
+    server.register_instance(rpc, allow_dotted_names=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return rpc
+
+
+@pytest.fixture
+def tcp_server():
+    server = CountingXMLRPCServer(("127.0.0.1", 0), requestHandler=KeepAliveHandler, logRequests=False, allow_none=True)
+    rpc = _serve(server)
+    host, port = server.server_address
+    yield server, rpc, f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_process_info_returns_structured_state(tcp_server):
+    _, rpc, url = tcp_server
+    client = XmlRpcSupervisor(url)
+
+    info = asyncio.run(client.get_process_info("comfyui"))
+
+    assert info.statename == "RUNNING"
+    assert info.pid == 4242
+    assert info.start == rpc.supervisor.started
+    payload = info.to_payload()
+    assert payload["status"] == "running"
+    assert "pid 4242" in payload["message"]
+
+
+def test_connections_are_reused_across_calls(tcp_server):
+    server, _, url = tcp_server
+    client = XmlRpcSupervisor(url, pool_size=1)
+
+    async def run():
+        for _ in range(5):
+            await client.get_process_info("comfyui")
+
+    asyncio.run(run())
+    assert server.connections == 1
+    client.close()
+
+
+def test_actions_map_faults_to_supervisorctl_messages(tcp_server):
+    _, rpc, url = tcp_server
+    client = XmlRpcSupervisor(url)
+
+    # Like supervisorctl, starting a running program and stopping a stopped one succeed
+    ok, message = asyncio.run(client.perform_action("start", "comfyui"))
+    assert ok
+    assert message == "comfyui: ERROR (already started)"
+
+    ok, message = asyncio.run(client.perform_action("restart", "comfyui"))
+    assert ok
+    assert message == "comfyui: stopped\ncomfyui: started"
+    assert [c[0] for c in rpc.supervisor.calls[-2:]] == ["stopProcess", "startProcess"]
+
+    assert asyncio.run(client.perform_action("stop", "comfyui")) == (True, "comfyui: stopped")
+    assert asyncio.run(client.perform_action("stop", "comfyui")) == (True, "comfyui: ERROR (not running)")
+
+
+def test_unknown_program_is_reported_without_raising(tcp_server):
+    _, _, url = tcp_server
+    info = asyncio.run(XmlRpcSupervisor(url).get_process_info("missing"))
+    assert info.status == "stopped"
+    assert info.message == "missing: ERROR (no such process)"
+
+
+def test_all_process_info_is_fetched_in_one_call(tcp_server):
+    _, rpc, url = tcp_server
+    client = XmlRpcSupervisor(url)
+
+    infos = asyncio.run(client.get_all_process_info(["comfyui", "workers:gpu1", "missing"]))
+
+    assert infos["comfyui"].pid == 4242
+    assert infos["workers:gpu1"].pid == 4343
+    assert infos["missing"].message == "missing: ERROR (no such process)"
+    assert [c[0] for c in rpc.supervisor.calls] == ["getAllProcessInfo", "getProcessInfo"]
+
+
+def test_unix_socket_transport():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "supervisor.sock")
+        server = UnixXMLRPCServer(path)
+        _serve(server)
+        try:
+            info = asyncio.run(XmlRpcSupervisor(f"unix://{path}").get_process_info("comfyui"))
+            assert info.statename == "RUNNING"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class StaticSupervisor:
+    def __init__(self, info):
+        self.info = info
+
+    async def get_process_info(self, name):
+        return self.info
+
+
+def test_fallback_is_used_when_supervisord_is_unreachable():
+    primary = XmlRpcSupervisor("http://127.0.0.1:1", timeout=1.0)
+    fallback = StaticSupervisor(ProcessInfo(name="comfyui", statename="STOPPED"))
+    backend = FallbackSupervisor(primary, fallback)
+
+    info = asyncio.run(backend.get_process_info("comfyui"))
+    assert info.statename == "STOPPED"
+
+    with pytest.raises(SupervisorUnavailable):
+        asyncio.run(primary.get_process_info("comfyui"))
+
+
+def test_parse_status_line():
+    info = parse_status_line("comfyui                          RUNNING   pid 1, uptime 1 day, 0:00:10")
+    assert info.status == "running"
+    assert info.pid == 1
+    assert time.time() - info.start == pytest.approx(86410, abs=5)
+    assert parse_status_line("comfyui STARTING").status == "starting"
+    assert parse_status_line("comfyui BACKOFF   Exited too quickly").status == "error"
+    assert parse_status_line("comfyui FATAL     Exited too quickly").status == "error"
+    assert parse_status_line("comfyui STOPPED   Dec 05 12:00 PM").status == "stopped"
+    assert parse_status_line("unix:///var/run/supervisor.sock no such file").status == "stopped"
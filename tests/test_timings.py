@@ -0,0 +1,99 @@
+import asyncio
+
+from jupyterlab_comfyui_cockpit.services.timings import LatencyHistogram, LifecycleTimings, StartupTracker
+
+
+def test_histogram_estimates_quantiles_within_buckets():
+    histogram = LatencyHistogram(bounds=(1.0, 10.0, 100.0))
+    for value in [2.0] * 9 + [50.0]:
+        histogram.observe(value)
+
+    summary = histogram.to_dict()
+    assert summary["count"] == 10
+    assert summary["min"] == 2.0 and summary["max"] == 50.0
+    assert [bucket["count"] for bucket in summary["buckets"]] == [0, 9, 1, 0]
+    assert 2.0 <= summary["p50"] <= 10.0
+    assert summary["p99"] > 10.0
+
+
+def test_history_is_persisted_and_rebuilds_histograms(tmp_path):
+    path = tmp_path / "timings.json"
+    timings = LifecycleTimings(path, history_size=3)
+    for seconds in (10.0, 20.0, 30.0, 40.0):
+        timings.record("restart", {"running": 1.0, "ready": seconds})
+    timings.record("restart", {"running": 1.0}, outcome="timeout")
+
+    reloaded = LifecycleTimings(path, history_size=3).summary()
+    assert [record["phases"].get("ready") for record in reloaded["history"]] == [None, 40.0, 30.0]
+    # 失敗した記録は分布に含めない
+    assert reloaded["histograms"]["restart"]["ready"]["count"] == 2
+    assert reloaded["histograms"]["restart"]["running"]["count"] == 2
+
+
+def test_tracker_records_each_phase_of_a_restart(tmp_path):
+    clock = [0.0]
+    # 再起動前の RUNNING（同じ pid）→ STARTING → RUNNING（読み込み中）→ ready
+    states = iter([
+        {"status": "running", "pid": 1, "ready": True},
+        {"status": "running", "pid": 1, "ready": True},
+        {"status": "starting", "pid": None},
+        {"status": "running", "pid": 2, "ready": False},
+        {"status": "running", "pid": 2, "ready": False},
+        {"status": "running", "pid": 2, "ready": True},
+    ])
+
+    async def fetch():
+        clock[0] += 1.0
+        return next(states)
+
+    timings = LifecycleTimings(tmp_path / "timings.json")
+    tracker = StartupTracker(timings, interval=0, timeout=60, clock=lambda: clock[0])
+
+    async def run():
+        task = await tracker.begin("restart", fetch)
+        return await task
+
+    record = asyncio.run(run())
+    assert record["outcome"] == "success"
+    assert record["milestones"] == {"starting": 2.0, "running": 3.0, "ready": 5.0}
+    assert record["phases"] == {"starting": 2.0, "running": 1.0, "ready": 2.0, "total": 5.0}
+
+
+def test_tracker_reports_crash_during_startup(tmp_path):
+    states = iter([
+        {"status": "stopped", "pid": None},
+        {"status": "starting", "pid": None},
+        {"status": "error", "pid": None},
+    ])
+
+    async def fetch():
+        return next(states)
+
+    timings = LifecycleTimings(tmp_path / "timings.json")
+    tracker = StartupTracker(timings, interval=0, timeout=60)
+
+    async def run():
+        return await (await tracker.begin("start", fetch))
+
+    record = asyncio.run(run())
+    assert record["outcome"] == "failed"
+    assert "total" not in record["phases"]
+    assert "start" not in timings.summary()["histograms"]
+
+
+def test_tracker_ignores_start_of_running_program(tmp_path):
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        return {"status": "running", "pid": 7, "ready": True}
+
+    timings = LifecycleTimings(tmp_path / "timings.json")
+    tracker = StartupTracker(timings, interval=0, timeout=60)
+
+    task = asyncio.run(tracker.begin("start", fetch))
+
+    assert task is None
+    assert len(fetches) == 1
+    assert timings.summary()["history"] == []
+    assert not (tmp_path / "timings.json").exists()
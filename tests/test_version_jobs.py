@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from jupyterlab_comfyui_cockpit.services.timings import lifecycle_timings
+from jupyterlab_comfyui_cockpit.services.version_jobs import (
+    JobConflict,
+    StepFailed,
+    VersionJobManager,
+)
+
+
+class GatedSwitcher:
+    """Runs the three switch steps, pausing in 'deps' until released."""
+
+    def __init__(self, fail_restart=False):
+        self.release = asyncio.Event()
+        self.fail_restart = fail_restart
+
+    async def run(self, job):
+        async with job.step("checkout"):
+            job.log("checked out")
+        async with job.step("deps"):
+            await self.release.wait()
+        async with job.step("restart"):
+            if self.fail_restart:
+                raise StepFailed("Failed to restart ComfyUI: boom", version=job.target_version)
+        return {"success": True, "message": "switched", "version": job.target_version}
+
+
+def test_submit_returns_immediately_and_records_step_timings():
+    async def run():
+        manager = VersionJobManager()
+        switcher = GatedSwitcher()
+        job = manager.submit("v1.0.0", switcher)
+        await asyncio.sleep(0.01)
+
+        assert job.status == "running"
+        assert [s.status for s in job.steps] == ["success", "running", "pending"]
+
+        switcher.release.set()
+        await manager.wait(job.id)
+        return job
+
+    job = asyncio.run(run())
+    data = job.to_dict(include_log=True)
+    assert data["status"] == "success"
+    assert data["result"] == {"success": True, "message": "switched", "version": "v1.0.0"}
+    assert all(step["duration"] is not None for step in data["steps"])
+    assert "checked out" in data["log"]
+
+    record = lifecycle_timings.summary(history=1)["history"][0]
+    assert record["kind"] == "switch"
+    assert record["version"] == "v1.0.0"
+    assert set(record["phases"]) == {"checkout", "deps", "restart", "total"}
+
+
+def test_conflicting_switch_is_rejected_and_same_target_is_shared():
+    async def run():
+        manager = VersionJobManager()
+        switcher = GatedSwitcher()
+        job = manager.submit("v1.0.0", switcher)
+
+        assert manager.submit("v1.0.0", GatedSwitcher()) is job
+        with pytest.raises(JobConflict) as excinfo:
+            manager.submit("v0.9.0", GatedSwitcher())
+        assert excinfo.value.active is job
+
+        switcher.release.set()
+        await manager.wait(job.id)
+        # 完了後は新しい切り替えを受け付ける
+        next_switcher = GatedSwitcher()
+        next_switcher.release.set()
+        next_job = manager.submit("v0.9.0", next_switcher)
+        await manager.wait(next_job.id)
+        return next_job
+
+    assert asyncio.run(run()).status == "success"
+
+
+def test_failed_step_marks_job_failed_and_streams_progress():
+    async def run():
+        manager = VersionJobManager()
+        switcher = GatedSwitcher(fail_restart=True)
+        job = manager.submit("v1.0.0", switcher)
+        subscription = job.subscribe()
+        switcher.release.set()
+
+        events = []
+        while True:
+            item = await asyncio.wait_for(subscription.get(), 1.0)
+            if item is None:
+                break
+            events.append(item)
+        return job, events
+
+    job, events = asyncio.run(run())
+    assert job.status == "failed"
+    assert job.result["version"] == "v1.0.0"
+    assert [s.status for s in job.steps] == ["success", "success", "failed"]
+    snapshots = [e["data"] for e in events if e["event"] == "job"]
+    assert snapshots[-1]["status"] == "failed"
+    assert any(e["event"] == "log" for e in events)
@@ -0,0 +1,69 @@
+import asyncio
+
+from jupyterlab_comfyui_cockpit.services.watcher import ProcessStatusWatcher
+
+
+class ScriptedFetch:
+    """Returns a scripted sequence of payloads, repeating the last one."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return {"status": status, "message": status}
+
+
+async def _collect(subscription, count):
+    return [(await asyncio.wait_for(subscription.get(), 1.0))["status"] for _ in range(count)]
+
+
+def test_only_transitions_are_published_to_all_subscribers():
+    fetch = ScriptedFetch(["running", "running", "starting", "starting", "running"])
+    watcher = ProcessStatusWatcher(fetch, interval=0.001)
+
+    async def run():
+        first = watcher.subscribe()
+        second = watcher.subscribe()
+        received = await asyncio.gather(_collect(first, 3), _collect(second, 3))
+        first.close()
+        second.close()
+        return received
+
+    first, second = asyncio.run(run())
+    assert first == ["running", "starting", "running"]
+    assert second == first
+
+
+def test_late_subscriber_receives_latest_state_immediately():
+    watcher = ProcessStatusWatcher(ScriptedFetch(["stopped"]), interval=0.001)
+
+    async def run():
+        first = watcher.subscribe()
+        await _collect(first, 1)
+        late = watcher.subscribe()
+        received = await _collect(late, 1)
+        first.close()
+        late.close()
+        return received
+
+    assert asyncio.run(run()) == ["stopped"]
+
+
+def test_watcher_stops_fetching_without_subscribers():
+    fetch = ScriptedFetch(["running"])
+    watcher = ProcessStatusWatcher(fetch, interval=0.001)
+
+    async def run():
+        subscription = watcher.subscribe()
+        await _collect(subscription, 1)
+        subscription.close()
+        await asyncio.sleep(0.05)
+        calls = fetch.calls
+        await asyncio.sleep(0.05)
+        return calls
+
+    calls = asyncio.run(run())
+    assert fetch.calls == calls